@@ -0,0 +1,63 @@
+'''
+Compare decoding paths of a large json_extended response.
+
+    python benchmarks/bench_decode.py [count]
+'''
+import os
+import sys
+import json
+import timeit
+
+# the checkout comes before an installed rarbgapi
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from rarbgapi.rarbgapi import json_hook, decode_torrents
+from rarbgapi.jsonbackend import BACKENDS, get_loads
+
+
+def make_body(count):
+    torrents = [{
+        'title': f'Some.Movie.{index}.2017.1080p.BluRay.x264-GROUP',
+        'category': 'Movies/x264/1080',
+        'download': f'magnet:?xt=urn:btih:{index:040x}&dn=Some.Movie',
+        'seeders': index % 500,
+        'leechers': index % 70,
+        'size': 1234567890 + index,
+        'pubdate': '2017-05-21 02:13:49 +0000',
+        'episode_info': {
+            'imdb': f'tt{index:07d}',
+            'tvrage': None,
+            'tvdb': None,
+            'themoviedb': str(index),
+        },
+        'ranked': 1,
+        'info_page': f'https://torrentapi.org/redirect_to_info.php?p={index}',
+    } for index in range(count)]
+    return json.dumps({'torrent_results': torrents}).encode('utf-8')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    number = max(1, 100000 // count)
+    content = make_body(count)
+    cases = {
+        'object_hook': lambda: json.loads(content, object_hook=json_hook),
+    }
+    for backend in BACKENDS:
+        try:
+            loads = get_loads(backend)
+        except ImportError:
+            continue
+        cases[f'fast[{backend}]'] = \
+            lambda loads=loads: decode_torrents(content, loads)
+
+    print(f'{count} torrents, {len(content)} bytes, {number} runs')
+    for name, func in cases.items():
+        best = min(timeit.repeat(func, number=number, repeat=5)) / number
+        print(f'{name:>14}: {best * 1e6:10.1f} us/response '
+              f'{best * 1e6 / count:6.2f} us/torrent')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+'''
+Local stand-in for torrentapi.org/pubapi_v2.php.
+
+    with MockServer(latency=0.05, min_interval=0.5) as server:
+        client = RarbgAPI(endpoint=server.url)
+'''
+import json
+import time
+import random
+import threading
+import urllib.parse
+import http.server
+
+
+def make_torrent(index, extended=True):
+    title = f'Some.Show.S{index % 20:02d}E{index % 30:02d}.1080p.WEB.x264-GRP'
+    download = f'magnet:?xt=urn:btih:{index:040x}&dn={title}'
+    if not extended:
+        return {
+            'filename': title,
+            'category': 'TV HD Episodes',
+            'download': download,
+        }
+    return {
+        'title': title,
+        'category': 'TV HD Episodes',
+        'download': download,
+        'seeders': index % 500,
+        'leechers': index % 70,
+        'size': 1234567890 + index,
+        'pubdate': time.strftime(
+            '%Y-%m-%d %H:%M:%S +0000', time.gmtime(1600000000 - index)),
+        'episode_info': {
+            'imdb': f'tt{index:07d}',
+            'tvrage': None,
+            'tvdb': str(index),
+            'themoviedb': str(index),
+        },
+        'ranked': 1,
+        'info_page': f'https://torrentapi.org/redirect_to_info.php?p={index}',
+    }
+
+
+class MockServer(object):
+    '''
+    :param latency: seconds every response is delayed
+    :param min_interval: requests closer than this get error_code 5
+    :param throttle_ratio: fraction of queries randomly answered with
+            error_code 5
+    :param token_ttl: seconds a token is accepted, then error_code 4
+    :param results: torrents returned when the query has no limit
+    '''
+    def __init__(self, latency=0.0, min_interval=0.0, throttle_ratio=0.0,
+                 token_ttl=None, results=25, seed=0):
+        # pylint: disable=too-many-arguments
+        self.latency = latency
+        self.min_interval = min_interval
+        self.throttle_ratio = throttle_ratio
+        self.token_ttl = token_ttl
+        self.results = results
+        self.stats = {'requests': 0, 'throttled': 0, 'tokens': 0,
+                      'expired': 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._last_request = None
+        self._payloads = {}
+        self._server = http.server.ThreadingHTTPServer(
+            ('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}/pubapi_v2.php'
+
+    def __enter__(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def _payload(self, count, extended):
+        key = (count, extended)
+        if key not in self._payloads:
+            self._payloads[key] = json.dumps({
+                'torrent_results': [
+                    make_torrent(index, extended) for index in range(count)
+                ]
+            }).encode('utf-8')
+        return self._payloads[key]
+
+    def handle(self, query):
+        '''
+        :returns: response body as bytes
+        '''
+        with self._lock:  # pylint: disable=not-context-manager
+            self.stats['requests'] += 1
+            now = time.monotonic()
+            throttled = self._last_request is not None and \
+                now - self._last_request < self.min_interval
+            self._last_request = now
+
+            if 'get_token' in query:
+                self.stats['tokens'] += 1
+                token = f'token{self.stats["tokens"]}'
+                self._tokens[token] = now
+                return json.dumps({'token': token}).encode('utf-8')
+
+            if throttled or self._random.random() < self.throttle_ratio:
+                self.stats['throttled'] += 1
+                return b'{"error_code": 5, "error": "Too many requests"}'
+
+            issued = self._tokens.get(query.get('token'))
+            if issued is None:
+                return b'{"error_code": 2, "error": "Invalid token"}'
+            if self.token_ttl is not None and now - issued > self.token_ttl:
+                self.stats['expired'] += 1
+                return b'{"error_code": 4, "error": "Token expired"}'
+
+        count = int(query.get('limit', self.results))
+        return self._payload(count, query.get('format') == 'json_extended')
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                query = dict(urllib.parse.parse_qsl(
+                    urllib.parse.urlsplit(self.path).query))
+                if server.latency:
+                    time.sleep(server.latency)
+                body = server.handle(query)
+                self.send_response(200)
+                self.send_header('content-type', 'application/json')
+                self.send_header('content-length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        return Handler
@@ -0,0 +1,253 @@
+'''
+Benchmark the client against a local mock torrentapi, from a checkout
+without installing the package.
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --baseline benchmarks/baseline.json
+
+baseline.json holds the results of the commit it came with, regenerate it
+with --output when comparing on another machine.
+
+Metrics ending with _per_s are better when higher, every other metric is
+better when lower. With --baseline the run fails when a metric is worse
+than the baseline by more than the tolerance, differences below the noise
+floor of the metric's unit are ignored.
+'''
+import gc
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+
+# the checkout comes before an installed rarbgapi
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from rarbgapi import RarbgAPI
+from rarbgapi.rarbgapi import json_hook, decode_torrents
+from rarbgapi.leakybucket import LeakyBucket
+from rarbgapi.tokenstore import MemoryTokenStore
+from rarbgapi.metrics import MetricsCollector
+from rarbgapi.jsonbackend import get_loads
+from rarbgapi.transport import FakeTransport
+
+from mockserver import MockServer, make_torrent
+
+
+NOISE = {'_ms': 1.0, '_us': 0.5, '_pct': 1.0}
+
+
+def make_client(server, rate=1e6, **options):
+    return RarbgAPI(
+        endpoint=server.url, rate_limiter=LeakyBucket(rate, capacity=1),
+        token_store=MemoryTokenStore(), **options)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def timed_calls(client, count, **kwargs):
+    durations = []
+    started = time.perf_counter()
+    for _ in range(count):
+        call_started = time.perf_counter()
+        client.list(**kwargs)
+        durations.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    return {
+        'calls_per_s': count / elapsed,
+        'latency_p50_ms': percentile(durations, 0.5) * 1e3,
+        'latency_p95_ms': percentile(durations, 0.95) * 1e3,
+    }
+
+
+def bench_end_to_end(count):
+    results = {}
+    with MockServer() as server:
+        # the mock answers identical bodies, fingerprints would skip
+        # decoding every call after the first
+        for name, options in (('end_to_end', {}),
+                              ('end_to_end_fast', {'fast_decode': True})):
+            with make_client(server, fingerprints=0, **options) as client:
+                client.list()
+                results[name] = timed_calls(
+                    client, count, limit=100, extended_response=True)
+    with MockServer(latency=0.02) as server:
+        with make_client(server, fingerprints=0) as client:
+            client.list()
+            results['end_to_end_latency_20ms'] = timed_calls(
+                client, max(10, count // 10), limit=100,
+                extended_response=True)
+    return results
+
+
+def bench_client_overhead(count):
+    '''
+    Calls answered by FakeTransport, what is left is the client's own
+    cost: parameters, limiter, retries, decoding and hooks.
+    '''
+    results = {}
+    transport = FakeTransport(make_torrent(index) for index in range(100))
+    for name, options in (('overhead', {}),
+                          ('overhead_fast', {'fast_decode': True})):
+        client = RarbgAPI(
+            transport=transport, rate_limiter=LeakyBucket(1e9, capacity=1),
+            token_store=MemoryTokenStore(), fingerprints=0, **options)
+        client.list(limit=100, extended_response=True)
+        started = time.perf_counter()
+        for _ in range(count):
+            client.list(limit=100, extended_response=True)
+        results[f'{name}_call_us'] = \
+            (time.perf_counter() - started) / count * 1e6
+    return {'client_overhead': results}
+
+
+def bench_limiter(count, rate=20.0):
+    bucket = LeakyBucket(rate, capacity=1)
+    bucket.acquire(1)
+    stamps = []
+    for _ in range(count):
+        bucket.acquire(1)
+        stamps.append(time.perf_counter())
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    return {'limiter': {
+        'rate_error_pct':
+            abs((len(gaps) / (stamps[-1] - stamps[0])) - rate) / rate * 100,
+        'gap_error_max_ms': max(abs(gap - 1 / rate) for gap in gaps) * 1e3,
+    }}
+
+
+def bench_token_refresh(count):
+    metrics = MetricsCollector()
+    with MockServer(token_ttl=0.2) as server:
+        with make_client(server) as client:
+            metrics.install(client)
+            for _ in range(count):
+                client.list()
+                time.sleep(0.25)
+    # no histogram when the token never expired
+    histogram = metrics.histograms.get('token_refresh')
+    refreshes = histogram.count if histogram is not None else 0
+    return {'token_refresh': {
+        'refresh_mean_ms':
+            histogram.sum / refreshes * 1e3 if refreshes else 0.0,
+        'refreshes_per_call': refreshes / count,
+    }}
+
+
+def bench_throttle(count):
+    metrics = MetricsCollector()
+    with MockServer(throttle_ratio=0.2) as server:
+        with make_client(server) as client:
+            metrics.install(client)
+            client.list()
+            metrics.reset()
+            result = timed_calls(client, count)
+    result['throttles_per_call'] = \
+        metrics.counters.get('throttles', 0) / count
+    return {'throttle': result}
+
+
+def bench_decode(count=100):
+    content = json.dumps({'torrent_results': [
+        make_torrent(index) for index in range(count)
+    ]}).encode('utf-8')
+    runs = max(1, 20000 // count)
+    results = {}
+    cases = {
+        'decode_object_hook_us': lambda: json.loads(
+            content, object_hook=json_hook),
+        'decode_fast_json_us': lambda: decode_torrents(
+            content, get_loads('json')),
+        'decode_fast_auto_us': lambda: decode_torrents(
+            content, get_loads('auto')),
+    }
+    for name, func in cases.items():
+        started = time.perf_counter()
+        for _ in range(runs):
+            func()
+        results[name] = \
+            (time.perf_counter() - started) / runs / count * 1e6
+    return {'decode': results}
+
+
+def bench_memory(count=20000):
+    content = json.dumps({'torrent_results': [
+        make_torrent(index) for index in range(count)
+    ]}).encode('utf-8')
+    gc.collect()
+    tracemalloc.start()
+    body = json.loads(content, object_hook=json_hook)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del body
+    return {'memory': {'torrent_bytes': size / count}}
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for group, metrics in results.items():
+        for name, value in metrics.items():
+            expected = baseline.get(group, {}).get(name)
+            if not expected:
+                continue
+            noise = next((floor for suffix, floor in NOISE.items()
+                          if name.endswith(suffix)), 0)
+            if name.endswith('_per_s'):
+                worse = value < expected * (1 - tolerance)
+            else:
+                worse = value > expected * (1 + tolerance) + noise
+            if worse:
+                regressions.append(
+                    f'{group}.{name}: {value:.3f} vs baseline {expected:.3f}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=200,
+                        help='list calls per end to end scenario')
+    parser.add_argument('--output', help='write results to this json file')
+    parser.add_argument('--baseline', help='compare with this json file')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative regression')
+    args = parser.parse_args()
+
+    results = {}
+    results.update(bench_end_to_end(args.calls))
+    results.update(bench_client_overhead(args.calls))
+    results.update(bench_limiter(40))
+    results.update(bench_token_refresh(10))
+    results.update(bench_throttle(args.calls // 4))
+    results.update(bench_decode())
+    results.update(bench_memory())
+
+    for group, metrics in results.items():
+        for name, value in metrics.items():
+            print(f'{group:>24}.{name:<22} {value:12.3f}')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fobj:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results,
+            }, fobj, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as fobj:
+            baseline = json.load(fobj)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
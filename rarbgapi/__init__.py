@@ -1 +1,29 @@
-from .rarbgapi import Torrent, RarbgAPI
+from typing import TYPE_CHECKING
+
+# the client and its HTTP stack load on first use, so the cli starts fast
+_LAZY = {
+    'Torrent': '.rarbgapi',
+    'RarbgAPI': '.rarbgapi',
+    'AsyncRarbgAPI': '.aio',
+}
+
+__all__ = list(_LAZY)
+
+if TYPE_CHECKING:
+    # __getattr__ provides these, declared for linters and type checkers
+    from .rarbgapi import Torrent, RarbgAPI
+    from .aio import AsyncRarbgAPI
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f'module {__name__} has no attribute {name}')
+    # pylint: disable=import-outside-toplevel
+    import importlib
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -1,24 +1,141 @@
 import sys
+import json
 import logging
 import argparse
+import threading
 
-
-from .rarbgapi import RarbgAPI
+# the HTTP stack is imported by the commands needing it, so --help and
+# --category-table start without loading requests
+# pylint: disable=import-outside-toplevel
+from .categories import Categories
 
 
 def _show_categories():
     prefix = 'CATEGORY_'
-    for name in dir(RarbgAPI):
+    for name in dir(Categories):
         if not name.startswith(prefix):
             continue
 
         category = name.replace(prefix, '')
-        index = getattr(RarbgAPI, name)
+        index = getattr(Categories, name)
         print(f'{category} -> {index}')
 
 
-def main():
-    parser = argparse.ArgumentParser()
+def _read_queries(lines, on_error, **defaults):
+    '''
+    Parse one query per line, a JSON object of Query arguments or a plain
+    search string, blank lines are skipped. on_error(line, error) is called
+    for a line which isn't a query.
+    '''
+    from .batch import Query
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            spec = json.loads(line) if line.startswith('{') else line
+            query = Query.from_spec(spec, **defaults)
+        except (ValueError, TypeError) as exp:
+            on_error(line, exp)
+            continue
+        yield query
+
+
+def _run_batch(client, path, workers, **defaults):
+    '''
+    Run the queries of path, or stdin for -, and print a JSON line per
+    query as it completes. A line which isn't a valid query is printed
+    with its error and the other lines still run.
+
+    :returns: how many queries failed
+    '''
+    if path == '-':
+        return _print_batch(client, sys.stdin, workers, **defaults)
+    with open(path, encoding='utf-8') as lines:
+        return _print_batch(client, lines, workers, **defaults)
+
+
+def _print_batch(client, lines, workers, **defaults):
+    from .batch import BatchScheduler
+
+    failed = 0
+    lock = threading.Lock()
+
+    def emit(query, torrents, error):
+        nonlocal failed
+        with lock:  # pylint: disable=not-context-manager
+            failed += error is not None
+            print(json.dumps({
+                'query': query,
+                'torrents': [t.to_dict() for t in torrents or ()],
+                'error': f'{type(error).__name__}: {error}' if error else None,
+            }), flush=True)
+
+    def rejected(query, error):
+        emit(dict(query.kwargs, mode=query.mode), None, error)
+
+    scheduler = BatchScheduler(client, workers)
+    try:
+        # lines are read by a thread, results are printed as they complete
+        scheduler.feed(
+            _read_queries(lines, lambda line, error: emit(line, None, error),
+                          **defaults),
+            on_error=rejected)
+        for query, torrents, error in scheduler.results():
+            emit(dict(query.kwargs, mode=query.mode), torrents, error)
+    finally:
+        scheduler.close()
+    return failed
+
+
+def _serve(argv):
+    parser = argparse.ArgumentParser(
+        prog='rarbgapi serve',
+        description='Answer list and search over HTTP from one shared client')
+    parser.add_argument('--host', default='127.0.0.1', help='Listen address')
+    parser.add_argument('--port', type=int, default=8080, help='Listen port')
+    parser.add_argument('--cache-path',
+                        help='Keep responses in this SQLite file instead '
+                             'of memory')
+    parser.add_argument('--cache-size', type=int, default=10000,
+                        help='How many responses are cached')
+    parser.add_argument('--rate', type=float, default=0.5,
+                        help='Requests per second sent to torrentapi')
+    parser.add_argument('--adaptive-rate', metavar='STATE_PATH',
+                        help='Learn the rate the server tolerates, starting '
+                             'from --rate, and save it to STATE_PATH')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='verbose')
+    args = parser.parse_args(argv)
+    from .rarbgapi import RarbgAPI
+    from .cache import MemoryCache, SQLiteCache
+    from .leakybucket import LeakyBucket, AdaptiveLeakyBucket
+    from .server import serve
+
+    logging.basicConfig(stream=sys.stdout,
+                        level=logging.DEBUG if args.verbose else logging.INFO)
+
+    if args.cache_path:
+        cache = SQLiteCache(args.cache_path, maxsize=args.cache_size)
+    else:
+        cache = MemoryCache(maxsize=args.cache_size)
+    if args.adaptive_rate:
+        rate_limiter = AdaptiveLeakyBucket(
+            args.rate, state_path=args.adaptive_rate)
+    else:
+        rate_limiter = LeakyBucket(args.rate, capacity=1)
+    serve(RarbgAPI(cache=cache, rate_limiter=rate_limiter),
+          args.host, args.port)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['serve']:
+        return _serve(argv[1:])
+
+    parser = argparse.ArgumentParser(
+        epilog='Run "rarbgapi serve --help" for the HTTP daemon')
     parser.add_argument('--category-table',
                         help='Get a list of category index',
                         action='store_true')
@@ -29,21 +146,49 @@ def main():
     parser.add_argument('--limit', type=int, choices=[25, 50, 100],
                         help='How many torrents will return')
     parser.add_argument('--category', type=int, help='The index of category')
+    parser.add_argument('--batch', metavar='FILE',
+                        help='Run one query per line of FILE, or stdin for '
+                             '-, and print results as JSON lines; a line is '
+                             'a JSON object like {"mode": "list", '
+                             '"categories": [41]} or a search string')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='How many batch queries can be in flight')
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='verbose')
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     if args.category_table:
         _show_categories()
-        return
+        return None
 
     if args.verbose:
-        logging.basicConfig(stream=sys.stdout, level=logging.DEBUG)
+        # stdout carries the batch results
+        logging.basicConfig(stream=sys.stderr if args.batch else sys.stdout,
+                            level=logging.DEBUG)
+
+    from .rarbgapi import RarbgAPI
+
+    if args.batch:
+        from .cache import MemoryCache
+
+        # repeated lines are answered from memory
+        client = RarbgAPI(cache=MemoryCache())
+        defaults = {'sort': args.sort, 'limit': args.limit}
+        if args.category is not None:
+            defaults['categories'] = [args.category]
+        defaults = {k: v for k, v in defaults.items() if v is not None}
+        try:
+            failed = _run_batch(client, args.batch, args.workers, **defaults)
+        finally:
+            client.close()
+        return 1 if failed else 0
 
     client = RarbgAPI()
     torrents = client.search(search_string=args.search_string, sort=args.sort,
                              limit=args.limit, category=args.category)
     for torrent in torrents:
         print(f'{torrent.filename}({torrent.category}) {torrent.download}')
+    return None
 
 
-sys.exit(main())
+if __name__ == '__main__':
+    sys.exit(main())
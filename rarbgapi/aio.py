@@ -0,0 +1,92 @@
+import json
+import asyncio
+import functools
+
+from .leakybucket import AsyncLeakyBucket
+from .transport import AiohttpTransport
+from .coalesce import AsyncCoalescer
+from . import pipeline
+from .pipeline import request
+from .rarbgapi import _RarbgAPIBase
+
+
+class AsyncRarbgAPI(_RarbgAPIBase):
+    '''
+    asyncio flavor of RarbgAPI, list and search are coroutines.
+
+    >>> async with AsyncRarbgAPI() as client:
+    ...     torrents = await client.search(search_string='walking dead')
+    '''
+    RATE_LIMITER = AsyncLeakyBucket
+    COALESCER = AsyncCoalescer
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):  # pylint: disable=invalid-overridden-method
+        await self._transport.close()
+
+    def _create_transport(self):
+        return AiohttpTransport(
+            pool_connections=self._options['pool_connections'],
+            pool_maxsize=self._options['pool_maxsize'],
+            keep_alive=self._options['keep_alive'])
+
+    async def _refresh_token(self, stale, deadline=None):
+        async def fetch():
+            content = await self._get_token(deadline)
+            return self._parse_token(json.loads(content))
+        await self._tokens.refresh_async(self._token_key(), stale, fetch)
+
+    async def _run(self, steps):
+        return await pipeline.run_async(steps, self._perform)
+
+    async def _perform(self, action):
+        '''
+        Do the I/O of a pipeline action, Gather runs its steps
+        concurrently.
+        '''
+        kind = type(action)
+        if kind is pipeline.Send:
+            return await self._query(action.params, action.deadline)
+        if kind is pipeline.Acquire:
+            return await self._bucket.acquire(1, timeout=action.timeout)
+        if kind is pipeline.Sleep:
+            return await asyncio.sleep(action.seconds)
+        if kind is pipeline.RefreshToken:
+            return await self._refresh_token(action.stale, action.deadline)
+        if kind is pipeline.Coalesce:
+            return await self._inflight.run(
+                action.key, functools.partial(self._run, action.steps),
+                action.timeout)
+        if kind is pipeline.Gather:
+            return await asyncio.gather(
+                *[self._run(steps) for steps in action.steps])
+        raise TypeError(f'unsupported action {action}')
+
+    @request
+    def list(self, **kwargs):
+        """
+        List torrents, accepts the same parameters as RarbgAPI.list
+
+        :returns: a list of Torrents
+
+        :raises: ValueError
+        """
+        return self._query_params(
+            'list', **self.backward_compability(kwargs))
+
+    @request
+    def search(self, **kwargs):
+        """
+        Search torrents, accepts the same parameters as RarbgAPI.search
+
+        :returns: a list of Torrents
+
+        :raises: ValueError
+        """
+        return self._query_params(
+            'search', **self.backward_compability(kwargs))
@@ -0,0 +1,220 @@
+import queue
+import heapq
+import itertools
+import threading
+import collections
+
+from .cache import cache_key
+from .filters import apply_hints
+
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 10
+PRIORITY_BACKGROUND = 20
+
+
+BatchResult = collections.namedtuple(
+    'BatchResult', ['query', 'torrents', 'error'])
+
+
+class Query(object):  # pylint: disable=too-few-public-methods
+    '''
+    One list or search call, queries with lower priority run first.
+    '''
+    __slots__ = ('mode', 'priority', 'kwargs')
+
+    def __init__(self, mode='search', priority=PRIORITY_NORMAL, **kwargs):
+        if mode not in ('list', 'search'):
+            raise ValueError(f'unsupported mode {mode}')
+        if not isinstance(priority, int):
+            raise ValueError(f'priority must be an int, not {priority!r}')
+        self.mode = mode
+        self.priority = priority
+        self.kwargs = kwargs
+
+    @classmethod
+    def from_spec(cls, spec, **defaults):
+        '''
+        :param spec: a Query, a dict of Query arguments or a search string
+        '''
+        if isinstance(spec, cls):
+            return spec
+        if isinstance(spec, str):
+            spec = {'search_string': spec}
+        return cls(**dict(defaults, **spec))
+
+    def __repr__(self):
+        return f'Query({self.mode}, {self.priority}, {self.kwargs})'
+
+
+class BatchScheduler(object):  # pylint: disable=too-many-instance-attributes
+    '''
+    Runs queries through a client from a priority queue, identical queries
+    are sent once and their result is delivered to every submitter.
+
+    Queries can be submitted while results are consumed, so interactive
+    queries overtake queued background ones.
+    '''
+    DEFAULT_WINDOW = 16
+
+    def __init__(self, client, workers=1):
+        self._client = client
+        self._workers = workers
+        self._threads = []
+        self._heap = []
+        self._pending = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._results = queue.Queue()
+        self._submitted = 0
+        self._delivered = 0
+        self._feeding = 0
+        self._feed_error = None
+        self._closed = False
+
+    def _key(self, query):
+        # pylint: disable=protected-access
+        kwargs = self._client.backward_compability(dict(query.kwargs))
+        kwargs.pop('timeout', None)
+        predicate = kwargs.pop('where', None)
+        if predicate is not None:
+            apply_hints(predicate, kwargs)
+        fan_out = kwargs.pop('fan_out', False)
+        upgrade = kwargs.pop('upgrade', None)
+        if upgrade is not None:
+            # like list and search, upgrade queries the brief format first
+            kwargs['extended_response'] = False
+        return (cache_key(self._client._query_params(query.mode, **kwargs)),
+                predicate, fan_out, upgrade)
+
+    def submit(self, query):
+        '''
+        :raises: ValueError if the query has unsupported parameters
+        '''
+        key = self._key(query)
+        with self._cond:
+            if self._closed:
+                raise ValueError('scheduler is closed')
+            self._submitted += 1
+            waiting = self._pending.setdefault(key, [])
+            waiting.append(query)
+            if len(waiting) == 1 or \
+                    query.priority < min(q.priority for q in waiting[:-1]):
+                heapq.heappush(
+                    self._heap, (query.priority, next(self._seq), key))
+            self._start()
+            # wake a worker and a consumer waiting in results
+            self._cond.notify_all()
+
+    def feed(self, queries, window=None, on_error=None):
+        '''
+        Submit queries from a thread, so results are delivered while
+        queries, which can be a slow generator, is still being read.
+
+        :param window: (optional) how many queries can be submitted ahead
+                of the results consumed, priorities apply within it
+        :param on_error: (optional) on_error(query, error) is called for a
+                query submit rejects and the following queries are still
+                submitted
+
+        Otherwise an exception raised by queries or submit is raised by
+        results after the queries submitted before it are delivered.
+        '''
+        window = window or max(self.DEFAULT_WINDOW, 4 * self._workers)
+        with self._cond:
+            self._feeding += 1
+        threading.Thread(target=self._feed,
+                         args=(iter(queries), window, on_error),
+                         daemon=True).start()
+
+    def _feed(self, queries, window, on_error):
+        try:
+            for query in queries:
+                with self._cond:
+                    while self._submitted - self._delivered >= window and \
+                            not self._closed:
+                        self._cond.wait()
+                try:
+                    self.submit(query)
+                except ValueError as exp:
+                    if on_error is None or self._closed:
+                        raise
+                    on_error(query, exp)
+        except Exception as exp:  # pylint: disable=broad-except
+            with self._cond:
+                if not self._closed:
+                    self._feed_error = exp
+        finally:
+            with self._cond:
+                self._feeding -= 1
+                self._cond.notify_all()
+
+    def _start(self):
+        while len(self._threads) < self._workers:
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next(self):
+        with self._cond:
+            while True:
+                while not self._heap and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return None, None
+                _, _, key = heapq.heappop(self._heap)
+                queries = self._pending.pop(key, None)
+                if queries:
+                    return key, queries
+
+    def _work(self):
+        while True:
+            _, queries = self._next()
+            if not queries:
+                return
+
+            query = queries[0]
+            torrents = error = None
+            try:
+                func = getattr(self._client, query.mode)
+                torrents = func(**dict(query.kwargs))
+            except Exception as exp:  # pylint: disable=broad-except
+                error = exp
+
+            for waiting in queries:
+                self._results.put(BatchResult(
+                    waiting,
+                    list(torrents) if torrents is not None else None,
+                    error))
+
+    def results(self):
+        '''
+        Yield BatchResult as queries complete until every submitted query
+        is delivered and every feed is exhausted.
+        '''
+        while True:
+            with self._cond:
+                while self._delivered >= self._submitted and self._feeding:
+                    self._cond.wait()
+                if self._delivered >= self._submitted:
+                    error, self._feed_error = self._feed_error, None
+                    if error is not None:
+                        raise error
+                    return
+                self._delivered += 1
+                # let a feeder waiting for its window submit more
+                self._cond.notify_all()
+            yield self._results.get()
+
+    def close(self):
+        '''
+        Drop queued queries and stop workers once in-flight ones finish.
+        '''
+        with self._cond:
+            self._closed = True
+            self._heap = []
+            self._pending.clear()
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
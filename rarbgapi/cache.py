@@ -0,0 +1,215 @@
+import abc
+import json
+import time
+import sqlite3
+import threading
+import collections
+
+
+def cache_key(params):
+    '''
+    Normalize query parameters so equivalent queries share one entry,
+    categories order and the default format don't matter.
+    '''
+    normalized = {
+        key: str(value) for key, value in params.items()
+        if key not in ('token', 'app_id')
+    }
+    normalized.setdefault('format', 'json')
+    if 'category' in normalized:
+        normalized['category'] = ';'.join(
+            sorted(normalized['category'].split(';'), key=_category_order))
+    return json.dumps(normalized, sort_keys=True)
+
+
+def _category_order(category):
+    return (0, int(category), '') if category.isdigit() else (1, 0, category)
+
+
+class ResponseCache(abc.ABC):
+    '''
+    Caches torrents returned by list and search.
+
+    :param ttl: (optional) seconds an entry stays valid, either a number or
+            a dict of mode to seconds like {'list': 60, 'search': 300}
+    :param maxsize: (optional) how many entries are kept, least recently
+            used ones are evicted first
+    '''
+    DEFAULT_TTL = {
+        'list': 60,
+        'search': 300,
+    }
+
+    def __init__(self, ttl=None, maxsize=1024):
+        if ttl is None:
+            ttl = dict(self.DEFAULT_TTL)
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_ttl(self, params):
+        if isinstance(self._ttl, dict):
+            return self._ttl.get(params.get('mode'), 0)
+        return self._ttl
+
+    def get(self, params):
+        '''
+        :returns: a list of torrents or None on miss
+        '''
+        key = cache_key(params)
+        with self._lock:  # pylint: disable=not-context-manager
+            entry = self._load(key)
+            if entry is not None:
+                expires_at, torrents = entry
+                if time.time() < expires_at:
+                    self.hits += 1
+                    return list(torrents)
+                self._delete(key)
+            self.misses += 1
+            return None
+
+    def set(self, params, torrents):
+        ttl = self._get_ttl(params)
+        if ttl <= 0:
+            return
+        key = cache_key(params)
+        with self._lock:  # pylint: disable=not-context-manager
+            self._save(key, time.time() + ttl, list(torrents))
+
+    def clear(self):
+        with self._lock:  # pylint: disable=not-context-manager
+            self._clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+            'size': len(self),
+        }
+
+    @abc.abstractmethod
+    def __len__(self):
+        '''
+        :returns: how many responses are cached, expired ones included
+        '''
+
+    @abc.abstractmethod
+    def _load(self, key):
+        '''
+        :returns: (expires_at, torrents) or None
+        '''
+
+    @abc.abstractmethod
+    def _save(self, key, expires_at, torrents):
+        '''
+        Store torrents under key, replacing what was there.
+        '''
+
+    @abc.abstractmethod
+    def _delete(self, key):
+        '''
+        Drop key, missing keys are ignored.
+        '''
+
+    @abc.abstractmethod
+    def _clear(self):
+        '''
+        Drop every response.
+        '''
+
+
+class MemoryCache(ResponseCache):
+    '''
+    LRU cache in this process.
+    '''
+    def __init__(self, ttl=None, maxsize=1024):
+        super().__init__(ttl, maxsize)
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _save(self, key, expires_at, torrents):
+        self._entries[key] = (expires_at, torrents)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def _delete(self, key):
+        self._entries.pop(key, None)
+
+    def _clear(self):
+        self._entries.clear()
+
+
+class SQLiteCache(ResponseCache):
+    '''
+    LRU cache in a SQLite database, survives restarts and can be shared
+    by processes on the same host. Torrents are stored as json, so a
+    shared file can't make the cache run code.
+    '''
+    def __init__(self, path, ttl=None, maxsize=100000):
+        super().__init__(ttl, maxsize)
+        self._path = path
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, expires_at REAL, accessed_at REAL, '
+            'torrents TEXT)')
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS responses_accessed_at '
+            'ON responses (accessed_at)')
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self):
+        with self._lock:  # pylint: disable=not-context-manager
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def _load(self, key):
+        row = self._conn.execute(
+            'SELECT expires_at, torrents FROM responses WHERE key = ?',
+            (key, )).fetchone()
+        if row is None:
+            return None
+        # pylint: disable=import-outside-toplevel
+        from .rarbgapi import Torrent
+        try:
+            torrents = [Torrent(mapping) for mapping in json.loads(row[1])]
+        except (ValueError, TypeError):
+            # written by an older version or by something else
+            self._delete(key)
+            return None
+        self._conn.execute(
+            'UPDATE responses SET accessed_at = ? WHERE key = ?',
+            (time.time(), key))
+        return row[0], torrents
+
+    def _save(self, key, expires_at, torrents):
+        self._conn.execute(
+            'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)',
+            (key, expires_at, time.time(),
+             json.dumps([torrent.to_dict() for torrent in torrents])))
+        self._conn.execute(
+            'DELETE FROM responses WHERE key IN ('
+            'SELECT key FROM responses ORDER BY accessed_at DESC '
+            'LIMIT -1 OFFSET ?)', (self._maxsize, ))
+
+    def _delete(self, key):
+        self._conn.execute('DELETE FROM responses WHERE key = ?', (key, ))
+
+    def _clear(self):
+        self._conn.execute('DELETE FROM responses')
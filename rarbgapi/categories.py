@@ -0,0 +1,62 @@
+'''
+Category ids, kept apart from the client so they load without the HTTP
+stack.
+'''
+
+
+class Categories(object):  # pylint: disable=too-few-public-methods
+    CATEGORY_ADULT = 4
+    CATEGORY_MOVIE_XVID = 14
+    CATEGORY_MOVIE_XVID_720P = 48
+    CATEGORY_MOVIE_H264 = 17
+    CATEGORY_MOVIE_H264_1080P = 44
+    CATEGORY_MOVIE_H264_720P = 45
+    CATEGORY_MOVIE_H264_3D = 47
+    CATEGORY_MOVIE_H264_4K = 50
+    CATEGORY_MOVIE_H265_4K = 51
+    CATEGORY_MOVIE_H265_4K_HDR = 52
+    CATEGORY_MOVIE_H265_1080P = 54
+    CATEGORY_MOVIE_FULL_BD = 42
+    CATEGORY_MOVIE_BD_REMUX = 46
+    CATEGORY_TV_EPISODES = 18
+    CATEGORY_TV_EPISODES_HD = 41
+    CATEGORY_TV_EPISODES_UHD = 49
+    CATEGORY_MUSIC_MP3 = 23
+    CATEGORY_MUSIC_FLAC = 25
+    CATEGORY_GAMES_PC_ISO = 27
+    CATEGORY_GAMES_PC_RIP = 28
+    CATEGORY_GAMES_PS3 = 40
+    CATEGORY_GAMES_PS4 = 53
+    CATEGORY_GAMES_XBOX = 32
+    CATEGORY_SOFTWARE = 33
+    CATEGORY_EBOOK = 35
+
+
+# category names torrentapi returns for the ids taken by categories
+CATEGORY_NAMES = {
+    4: 'XXX',
+    14: 'Movies/XVID',
+    48: 'Movies/XVID/720',
+    17: 'Movies/x264',
+    44: 'Movies/x264/1080',
+    45: 'Movies/x264/720',
+    47: 'Movies/x264/3D',
+    50: 'Movies/x264/4k',
+    51: 'Movies/x265/4k',
+    52: 'Movs/x265/4k/HDR',
+    54: 'Movies/x265/1080',
+    42: 'Movies/Full BD',
+    46: 'Movies/BD Remux',
+    18: 'TV Episodes',
+    41: 'TV HD Episodes',
+    49: 'TV UHD Episodes',
+    23: 'Music/MP3',
+    25: 'Music/FLAC',
+    27: 'Games/PC ISO',
+    28: 'Games/PC RIP',
+    40: 'Games/PS3',
+    53: 'Games/PS4',
+    32: 'Games/XBOX-360',
+    33: 'Software/PC ISO',
+    35: 'e-Books',
+}
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+
+from .retry import DeadlineExceeded
+
+
+class _Call(object):  # pylint: disable=too-few-public-methods
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self, done):
+        self.done = done
+        self.result = None
+        self.error = None
+
+
+class Coalescer(object):
+    '''
+    Runs one call per key at a time, threads asking for a key already in
+    flight wait for that call and share its result or exception.
+    '''
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    def run(self, key, func, timeout=None):
+        '''
+        :param timeout: (optional) seconds a follower waits for the leader
+
+        :returns: (result of func, True if another thread ran it)
+
+        :raises: what func raised, DeadlineExceeded if a follower times out
+        '''
+        with self._lock:  # pylint: disable=not-context-manager
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call(threading.Event())
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise DeadlineExceeded('deadline exceeded waiting for '
+                                       'an identical request')
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as exp:
+            call.error = exp
+            raise
+        finally:
+            with self._lock:  # pylint: disable=not-context-manager
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class AsyncCoalescer(object):
+    '''
+    Coalescer for coroutines of one event loop.
+    '''
+    def __init__(self):
+        self._calls = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def run(self, key, func, timeout=None):
+        '''
+        :param func: a function returning an awaitable
+
+        When the task running the call is cancelled, the tasks waiting for
+        it are not: one of them runs its own func instead.
+        '''
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        future = self._calls.get(key)
+        while future is not None:
+            remaining = None if deadline is None \
+                else max(0, deadline - loop.time())
+            try:
+                result = await asyncio.wait_for(
+                    asyncio.shield(future), remaining)
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded('deadline exceeded waiting for '
+                                       'an identical request') from None
+            except _LeaderCancelled:
+                # the first follower to wake up leads the next call
+                future = self._calls.get(key)
+                continue
+            return result, True
+
+        future = self._calls[key] = loop.create_future()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except BaseException as exp:
+            future.set_exception(exp)
+            # followers retrieve it, don't log it as never retrieved
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._calls[key]
+        return result, False
+
+
+class _LeaderCancelled(Exception):
+    pass
@@ -0,0 +1,168 @@
+import abc
+import csv
+import json
+import itertools
+
+
+COLUMNS = (
+    'filename', 'category', 'download', 'infohash', 'size', 'pubdate',
+    'seeders', 'leechers', 'ranked', 'info_page',
+    'imdb', 'tvrage', 'tvdb', 'themoviedb',
+)
+
+
+def flatten(torrent):
+    '''
+    :returns: a dict of COLUMNS, episode_info fields are top level and
+            missing fields are None
+    '''
+    episode_info = getattr(torrent, 'episode_info', None)
+    return {
+        'filename': torrent.filename,
+        'category': torrent.category,
+        'download': torrent.download,
+        'infohash': torrent.infohash,
+        'size': torrent.size,
+        'pubdate': torrent.pubdate,
+        'seeders': torrent.seeders,
+        'leechers': torrent.leechers,
+        'ranked': getattr(torrent, 'ranked', None),
+        'info_page': torrent.page,
+        'imdb': episode_info.imdb if episode_info else None,
+        'tvrage': episode_info.tvrage if episode_info else None,
+        'tvdb': episode_info.tvdb if episode_info else None,
+        'themoviedb': episode_info.themoviedb if episode_info else None,
+    }
+
+
+class Exporter(abc.ABC):
+    '''
+    Writes flattened torrents to path a batch at a time.
+    '''
+    def __init__(self, path):
+        self._path = path
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, torrents):
+        rows = [flatten(torrent) for torrent in torrents]
+        if rows:
+            self._write_rows(rows)
+            self.count += len(rows)
+
+    @abc.abstractmethod
+    def close(self):
+        '''
+        Finish the file, nothing can be written afterwards.
+        '''
+
+    @abc.abstractmethod
+    def _write_rows(self, rows):
+        '''
+        Append rows, a list of flattened torrents.
+        '''
+
+
+class JSONLinesExporter(Exporter):
+
+    def __init__(self, path):
+        super().__init__(path)
+        # pylint: disable=consider-using-with
+        self._fobj = open(path, 'w', encoding='utf-8')
+
+    def close(self):
+        self._fobj.close()
+
+    def _write_rows(self, rows):
+        self._fobj.write(''.join(json.dumps(row) + '\n' for row in rows))
+
+
+class CSVExporter(Exporter):
+
+    def __init__(self, path):
+        super().__init__(path)
+        # pylint: disable=consider-using-with
+        self._fobj = open(path, 'w', encoding='utf-8', newline='')
+        self._writer = csv.DictWriter(self._fobj, COLUMNS)
+        self._writer.writeheader()
+
+    def close(self):
+        self._fobj.close()
+
+    def _write_rows(self, rows):
+        self._writer.writerows(rows)
+
+
+class ParquetExporter(Exporter):
+    '''
+    Every batch becomes a row group, it requires pyarrow.
+
+    :raises: ImportError if pyarrow isn't installed
+    '''
+    def __init__(self, path):
+        # pylint: disable=import-outside-toplevel
+        import pyarrow
+        import pyarrow.parquet
+        super().__init__(path)
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema([
+            (column, pyarrow.int64()
+             if column in ('size', 'seeders', 'leechers', 'ranked')
+             else pyarrow.string())
+            for column in COLUMNS
+        ])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def close(self):
+        self._writer.close()
+
+    def _write_rows(self, rows):
+        self._writer.write_table(
+            self._pyarrow.Table.from_pylist(rows, schema=self._schema))
+
+
+EXPORTERS = {
+    'jsonl': JSONLinesExporter,
+    'csv': CSVExporter,
+    'parquet': ParquetExporter,
+}
+
+
+def export(torrents, path, fmt=None, batch_size=1000):
+    '''
+    Stream torrents to a file, at most batch_size of them are held in
+    memory.
+
+    >>> export(client.iter_list(categories), 'torrents.csv')
+
+    :param torrents: an iterable of Torrents, like a list or search result
+            or the generator of iter_list, iter_search or Feed
+    :param path: output file
+    :param fmt: (optional) 'jsonl', 'csv' or 'parquet', default is taken
+            from the extension of path
+    :param batch_size: (optional) torrents per write
+
+    :returns: how many torrents were written
+
+    :raises: ValueError for unsupported formats, ImportError if parquet is
+            asked without pyarrow
+    '''
+    if fmt is None:
+        fmt = str(path).rsplit('.', 1)[-1].lower()
+        fmt = 'jsonl' if fmt in ('json', 'ndjson') else fmt
+    if fmt not in EXPORTERS:
+        raise ValueError(f'unsupported format {fmt}')
+
+    torrents = iter(torrents)
+    with EXPORTERS[fmt](path) as exporter:
+        while True:
+            batch = list(itertools.islice(torrents, batch_size))
+            if not batch:
+                break
+            exporter.write(batch)
+    return exporter.count
@@ -0,0 +1,45 @@
+import heapq
+
+from .filters import SORT_KEYS
+
+
+# torrentapi returns 25 torrents when the query has no limit
+DEFAULT_LIMIT = 25
+
+
+def split(params, torrents):
+    '''
+    Split a query whose categories together filled the limit, the
+    torrents of some category may have been cut off.
+
+    :returns: params of the two halves of the categories, None if the
+            query isn't saturated or has a single category
+    '''
+    categories = [c for c in str(params.get('category', '')).split(';') if c]
+    limit = int(params.get('limit', DEFAULT_LIMIT))
+    if len(categories) < 2 or len(torrents) < limit:
+        return None
+    middle = len(categories) // 2
+    return [
+        dict(params, category=';'.join(half))
+        for half in (categories[:middle], categories[middle:])
+    ]
+
+
+def merge(results, sort=None):
+    '''
+    k-way merge of results already sorted by the server, a torrent found
+    in several results is kept once.
+
+    :param results: lists of torrents
+    :param sort: (optional) sort of the query, default is 'last'
+    '''
+    seen = set()
+    merged = []
+    key = SORT_KEYS.get(sort, SORT_KEYS['last'])
+    for torrent in heapq.merge(*results, key=key, reverse=True):
+        infohash = torrent.infohash
+        if infohash not in seen:
+            seen.add(infohash)
+            merged.append(torrent)
+    return merged
@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import logging
+
+from .utils import BoundedSet, write_json
+
+
+class Feed(object):  # pylint: disable=too-many-instance-attributes
+    '''
+    Polls list(sort='last') and only returns torrents which weren't seen
+    by a previous poll.
+
+    The cursor is the newest pubdate seen plus the infohashes published at
+    that time, recently seen infohashes are also remembered so brief
+    responses without pubdate work too. With `state_path` the cursor is
+    saved after every poll and restored on start.
+
+    The polling interval adapts to the arrival rate, it shrinks when a poll
+    is close to `limit` new torrents and grows when polls return nothing.
+
+    >>> feed = Feed(client, state_path='feed.json',
+    ...             categories=[RarbgAPI.CATEGORY_MOVIE_H264_1080P])
+    >>> for torrent in feed:
+    ...     print(torrent)
+    '''
+    def __init__(self, client, state_path=None, min_interval=2.0,
+                 max_interval=300.0, seen_size=1000, **kwargs):
+        # pylint: disable=too-many-arguments
+        kwargs.setdefault('sort', 'last')
+        kwargs.setdefault('limit', 100)
+        kwargs.setdefault('extended_response', True)
+        self._client = client
+        self._kwargs = kwargs
+        self._state_path = state_path
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._interval = min_interval
+        self._rate = None
+        self._last_poll = None
+        self._pubdate = None
+        self._seen = BoundedSet(seen_size)
+        self._log = logging.getLogger(__name__)
+        self._load()
+
+    @property
+    def interval(self):
+        '''
+        seconds to wait before the next poll
+        '''
+        return self._interval
+
+    @property
+    def cursor(self):
+        return {
+            'pubdate': self._pubdate,
+            'seen': list(self._seen),
+        }
+
+    def _load(self):
+        if not self._state_path or not os.path.exists(self._state_path):
+            return
+        try:
+            with open(self._state_path, 'r', encoding='utf-8') as fobj:
+                state = json.load(fobj)
+        except (IOError, ValueError) as exp:
+            self._log.warning('Ignore bad feed state %s', exp)
+            return
+        self._pubdate = state.get('pubdate')
+        for infohash in state.get('seen', []):
+            self._seen.add(infohash)
+
+    def _save(self):
+        if not self._state_path:
+            return
+        write_json(self._state_path, self.cursor)
+
+    def _is_new(self, torrent):
+        if torrent.infohash in self._seen:
+            return False
+        if self._pubdate and torrent.pubdate:
+            # pubdate is always '%Y-%m-%d %H:%M:%S +0000'
+            return torrent.pubdate >= self._pubdate
+        return True
+
+    def poll(self):
+        '''
+        :returns: a list of new torrents, oldest first
+        '''
+        torrents = self._client.list(**self._kwargs)
+        now = time.monotonic()
+        new = [] if getattr(torrents, 'unchanged', False) else [
+            torrent for torrent in reversed(torrents)
+            if self._is_new(torrent)
+        ]
+        for torrent in new:
+            self._seen.add(torrent.infohash)
+            if torrent.pubdate and \
+                    (not self._pubdate or torrent.pubdate > self._pubdate):
+                self._pubdate = torrent.pubdate
+
+        if torrents and len(new) == len(torrents) and self._last_poll:
+            self._log.warning(
+                'Every torrent is new, some may be missed between polls')
+        self._adapt(len(new), now)
+        self._save()
+        return new
+
+    def _adapt(self, count, now):
+        limit = self._kwargs['limit']
+        if self._last_poll is not None:
+            rate = count / max(now - self._last_poll, 1e-3)
+            self._rate = rate if self._rate is None else \
+                0.7 * self._rate + 0.3 * rate
+        self._last_poll = now
+
+        if count >= limit:
+            # saturated, torrents may have been missed
+            interval = self._min_interval
+        elif count >= limit * 0.8:
+            interval = self._interval / 2
+        elif not self._rate:
+            interval = self._interval * 1.5
+        else:
+            # aim at half of limit per poll
+            interval = (limit / 2) / self._rate
+        self._interval = min(
+            self._max_interval, max(self._min_interval, interval))
+
+    def __iter__(self):
+        while True:
+            yield from self.poll()
+            time.sleep(self._interval)
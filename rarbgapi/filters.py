@@ -0,0 +1,264 @@
+import re
+import collections
+
+from .categories import CATEGORY_NAMES
+
+
+Tags = collections.namedtuple(
+    'Tags',
+    ['resolution', 'codec', 'source', 'hdr', 'group', 'season', 'episode'])
+
+_RESOLUTION = re.compile(r'\b(2160p|1080p|720p|576p|480p)\b', re.I)
+_CODEC = re.compile(r'\b(x264|h\.?264|avc|x265|h\.?265|hevc|xvid)\b', re.I)
+_SOURCE = re.compile(
+    r'\b(blu-?ray|bdrip|brrip|web-?dl|webrip|web|hdtv|dvdrip)\b', re.I)
+_HDR = re.compile(r'\b(hdr|hdr10|dv|dovi)\b', re.I)
+_GROUP = re.compile(r'-(\w+)(?:\[\w+\])?$')
+_EPISODE = re.compile(r'\bS(\d{1,2})(?:E(\d{1,3}))?\b', re.I)
+
+_CODECS = {
+    'x264': 'h264', 'h264': 'h264', 'h.264': 'h264', 'avc': 'h264',
+    'x265': 'h265', 'h265': 'h265', 'h.265': 'h265', 'hevc': 'h265',
+    'xvid': 'xvid',
+}
+_SOURCES = {
+    'bluray': 'bluray', 'blu-ray': 'bluray', 'bdrip': 'bluray',
+    'brrip': 'bluray', 'web-dl': 'web', 'webdl': 'web', 'webrip': 'web',
+    'web': 'web', 'hdtv': 'hdtv', 'dvdrip': 'dvd',
+}
+
+
+def parse_tags(name):
+    '''
+    Release tags of a scene filename.
+
+    >>> parse_tags('Show.S01E02.1080p.WEB.H264-GRP')
+    Tags(resolution='1080p', codec='h264', source='web', hdr=False,
+         group='GRP', season=1, episode=2)
+    '''
+    match = _RESOLUTION.search(name)
+    found_resolution = match.group(1).lower() if match else None
+    match = _CODEC.search(name)
+    found_codec = _CODECS[match.group(1).lower()] if match else None
+    match = _SOURCE.search(name)
+    found_source = _SOURCES[match.group(1).lower()] if match else None
+    match = _GROUP.search(name)
+    found_group = match.group(1) if match else None
+    match = _EPISODE.search(name)
+    season = episode = None
+    if match:
+        season = int(match.group(1))
+        episode = int(match.group(2)) if match.group(2) else None
+    return Tags(found_resolution, found_codec, found_source,
+                bool(_HDR.search(name)), found_group, season, episode)
+
+
+def get_tags(torrent):
+    '''
+    Tags of torrent.filename, parsed once per Torrent.
+    '''
+    try:
+        return torrent._tags  # pylint: disable=protected-access
+    except AttributeError:
+        tags = torrent._tags = parse_tags(torrent.filename or '')
+        return tags
+
+
+class Filter(object):
+    '''
+    A predicate on Torrent, filters combine with &, | and ~.
+
+    hints are request arguments which make the server return more
+    torrents passing the filter, they survive & but not | or ~.
+    '''
+    __slots__ = ('_func', 'hints')
+
+    def __init__(self, func, **hints):
+        self._func = func
+        self.hints = hints
+
+    def __call__(self, torrent):
+        return self._func(torrent)
+
+    def __and__(self, other):
+        first, second = self._func, other._func
+        hints = dict(other.hints)
+        hints.update(self.hints)
+        if 'categories' in self.hints and 'categories' in other.hints:
+            hints['categories'] = [
+                c for c in self.hints['categories']
+                if c in other.hints['categories']
+            ]
+        return Filter(lambda t: first(t) and second(t), **hints)
+
+    def __or__(self, other):
+        first, second = self._func, other._func
+        return Filter(lambda t: first(t) or second(t))
+
+    def __invert__(self):
+        func = self._func
+        return Filter(lambda t: not func(t))
+
+
+def where(func):
+    '''
+    Filter from any callable taking a Torrent.
+    '''
+    return Filter(func)
+
+
+def _between(attr, minimum, maximum):
+    def check(torrent):
+        value = getattr(torrent, attr, None)
+        if value is None:
+            return False
+        if minimum is not None and value < minimum:
+            return False
+        return maximum is None or value <= maximum
+    return check
+
+
+def seeders(minimum=None, maximum=None):
+    '''
+    Seeders within [minimum, maximum], brief torrents never pass. With a
+    minimum the server is asked for the most seeded torrents.
+    '''
+    hints = {'sort': 'seeders'} if minimum is not None else {}
+    return Filter(_between('seeders', minimum, maximum), **hints)
+
+
+def leechers(minimum=None, maximum=None):
+    return Filter(_between('leechers', minimum, maximum))
+
+
+def size(minimum=None, maximum=None):
+    '''
+    Size in bytes within [minimum, maximum], brief torrents never pass.
+    '''
+    return Filter(_between('size', minimum, maximum))
+
+
+def categories(*values):
+    '''
+    Torrents in one of the categories, values are ids like
+    RarbgAPI.CATEGORY_TV_EPISODES_HD or names like 'TV HD Episodes'. The
+    request only asks for categories given as ids.
+    '''
+    names = frozenset(
+        CATEGORY_NAMES.get(value, str(value)).lower() for value in values)
+    ids = [value for value in values if isinstance(value, int)]
+    hints = {'categories': ids} if ids and len(ids) == len(values) else {}
+    return Filter(lambda t: t.category.lower() in names, **hints)
+
+
+def _tag(name, values, normalize):
+    allowed = frozenset(normalize(value) for value in values)
+    return Filter(lambda t: getattr(get_tags(t), name) in allowed)
+
+
+def resolution(*values):
+    return _tag('resolution', values, str.lower)
+
+
+def codec(*values):
+    '''
+    Codecs are normalized, x264 and avc match h264, x265 and hevc match
+    h265.
+    '''
+    return _tag('codec', values, lambda v: _CODECS.get(v.lower(), v.lower()))
+
+
+def source(*values):
+    return _tag(
+        'source', values, lambda v: _SOURCES.get(v.lower(), v.lower()))
+
+
+def hdr(value=True):
+    return Filter(lambda t: get_tags(t).hdr == value)
+
+
+def group(pattern):
+    '''
+    Release group matching the regular expression, case insensitive.
+    '''
+    regex = re.compile(pattern, re.I)
+    return Filter(
+        lambda t: regex.fullmatch(get_tags(t).group or '') is not None)
+
+
+def filename(pattern):
+    '''
+    Filename containing a match of the regular expression, case
+    insensitive.
+    '''
+    regex = re.compile(pattern, re.I)
+    return Filter(lambda t: regex.search(t.filename or '') is not None)
+
+
+# sort names accepted by TorrentList.sort_by to their key functions
+SORT_KEYS = {
+    'seeders': lambda t: t.seeders or 0,
+    'leechers': lambda t: t.leechers or 0,
+    'size': lambda t: t.size or 0,
+    'last': lambda t: t.pubdate or '',
+    'pubdate': lambda t: t.pubdate or '',
+    'filename': lambda t: t.filename or '',
+}
+
+
+class TorrentList(list):
+    '''
+    The list returned by list and search.
+
+    >>> torrents.filter(seeders(10), resolution('1080p')).sort_by('size')
+
+    unchanged is True when the server sent the same body as for the
+    previous identical query, the torrents are the ones decoded back then.
+    '''
+    unchanged = False
+
+    def filter(self, *predicates):
+        '''
+        :returns: a TorrentList of torrents passing every predicate
+        '''
+        if len(predicates) == 1:
+            predicate = predicates[0]
+        else:
+            def predicate(torrent):
+                return all(check(torrent) for check in predicates)
+        return TorrentList(t for t in self if predicate(t))
+
+    def sort_by(self, key, reverse=None):
+        '''
+        :param key: 'seeders', 'leechers', 'size', 'last', 'pubdate',
+                'filename' or a callable
+        :param reverse: (optional) default is descending for named keys
+                except filename, ascending for callables
+
+        :returns: a sorted TorrentList
+        '''
+        if callable(key):
+            func = key
+            reverse = bool(reverse)
+        else:
+            if key not in SORT_KEYS:
+                raise ValueError(f'unsupported sort key {key}')
+            func = SORT_KEYS[key]
+            if reverse is None:
+                reverse = key != 'filename'
+        return TorrentList(sorted(self, key=func, reverse=reverse))
+
+
+def apply_hints(predicate, kwargs):
+    '''
+    Add the hints of predicate to request kwargs the caller didn't set, a
+    filtered request always asks for the largest page.
+    '''
+    hints = getattr(predicate, 'hints', {})
+    if 'categories' in hints and hints['categories'] and \
+            'categories' not in kwargs and 'category' not in kwargs:
+        kwargs['categories'] = list(hints['categories'])
+    if 'sort' in hints:
+        kwargs.setdefault('sort', hints['sort'])
+    kwargs.setdefault('limit', 100)
+    return kwargs
@@ -0,0 +1,231 @@
+import re
+import json
+import time
+import sqlite3
+import threading
+
+from .rarbgapi import Torrent
+from .categories import CATEGORY_NAMES
+
+
+_SORT = {
+    'last': 'pubdate IS NULL, pubdate DESC, id DESC',
+    'seeders': 'seeders IS NULL, seeders DESC, id DESC',
+    'leechers': 'leechers IS NULL, leechers DESC, id DESC',
+}
+
+_WORD = re.compile(r'\w+')
+
+
+class TorrentIndex(object):
+    '''
+    Searchable copy of torrents in a SQLite database, filenames are full
+    text indexed and ids, category, pubdate and seeders have indexes.
+
+    >>> index = TorrentIndex('torrents.db')
+    >>> client = RarbgAPI(index=index)
+    >>> client.list(limit=100)
+    >>> index.search(search_string='walking dead', sort='seeders')
+
+    A torrent seen again is updated, brief torrents don't overwrite what
+    an extended one stored.
+    '''
+    def __init__(self, path=':memory:'):
+        self._path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS torrents ('
+            'id INTEGER PRIMARY KEY, infohash TEXT UNIQUE NOT NULL, '
+            'filename TEXT, category TEXT, size INTEGER, pubdate TEXT, '
+            'seeders INTEGER, leechers INTEGER, imdb TEXT, tvdb TEXT, '
+            'themoviedb TEXT, extended INTEGER, indexed_at REAL, data TEXT)')
+        for column in ('category', 'imdb', 'tvdb', 'themoviedb', 'pubdate',
+                       'seeders'):
+            self._conn.execute(
+                f'CREATE INDEX IF NOT EXISTS torrents_{column} '
+                f'ON torrents ({column})')
+        self._fts = self._create_fts()
+
+    def _create_fts(self):
+        try:
+            self._conn.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS torrents_fts USING fts5('
+                "filename, content='torrents', content_rowid='id')")
+        except sqlite3.OperationalError:
+            # sqlite built without fts5, search_string falls back to LIKE
+            return False
+        self._conn.executescript('''
+            CREATE TRIGGER IF NOT EXISTS torrents_ai AFTER INSERT ON torrents
+            BEGIN
+                INSERT INTO torrents_fts (rowid, filename)
+                VALUES (new.id, new.filename);
+            END;
+            CREATE TRIGGER IF NOT EXISTS torrents_ad AFTER DELETE ON torrents
+            BEGIN
+                INSERT INTO torrents_fts (torrents_fts, rowid, filename)
+                VALUES ('delete', old.id, old.filename);
+            END;
+            CREATE TRIGGER IF NOT EXISTS torrents_au AFTER UPDATE ON torrents
+            BEGIN
+                INSERT INTO torrents_fts (torrents_fts, rowid, filename)
+                VALUES ('delete', old.id, old.filename);
+                INSERT INTO torrents_fts (rowid, filename)
+                VALUES (new.id, new.filename);
+            END;
+        ''')
+        return True
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        with self._lock:  # pylint: disable=not-context-manager
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM torrents').fetchone()[0]
+
+    def ingest(self, torrents):
+        '''
+        Add or update torrents in one transaction.
+
+        :returns: how many torrents were written
+        '''
+        now = time.time()
+        rows = [_to_row(torrent, now) for torrent in torrents]
+        if not rows:
+            return 0
+        with self._lock:  # pylint: disable=not-context-manager
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany(
+                    'INSERT INTO torrents (infohash, filename, category, '
+                    'size, pubdate, seeders, leechers, imdb, tvdb, '
+                    'themoviedb, extended, indexed_at, data) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (infohash) DO UPDATE SET '
+                    'filename = excluded.filename, '
+                    'category = excluded.category, '
+                    'size = coalesce(excluded.size, size), '
+                    'pubdate = coalesce(excluded.pubdate, pubdate), '
+                    'seeders = coalesce(excluded.seeders, seeders), '
+                    'leechers = coalesce(excluded.leechers, leechers), '
+                    'imdb = coalesce(excluded.imdb, imdb), '
+                    'tvdb = coalesce(excluded.tvdb, tvdb), '
+                    'themoviedb = coalesce(excluded.themoviedb, themoviedb), '
+                    'indexed_at = excluded.indexed_at, '
+                    'data = CASE WHEN excluded.extended OR NOT extended '
+                    'THEN excluded.data ELSE data END, '
+                    'extended = max(extended, excluded.extended)', rows)
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+        return len(rows)
+
+    def search(self, **kwargs):
+        '''
+        Query the index like RarbgAPI.search.
+
+        :param search_string: (optional) every word has to be in the
+                filename
+        :param search_imdb: (optional)
+        :param search_tvdb: (optional)
+        :param search_themoviedb: (optional)
+        :param categories: (optional) category ids or names
+        :param sort: (optional) 'last', 'seeders' or 'leechers', default is
+                'last'
+        :param limit: (optional) how many torrents are returned, default is
+                25, None returns all of them
+
+        :returns: a list of Torrents
+
+        :raises: ValueError
+        '''
+        clauses, args = self._where(kwargs)
+        sort = kwargs.pop('sort', None) or 'last'
+        limit = kwargs.pop('limit', 25)
+        for key in ('extended_response', 'mode'):
+            kwargs.pop(key, None)
+        if kwargs:
+            raise ValueError(f'unsupported parameter {next(iter(kwargs))}')
+        if sort not in _SORT:
+            raise ValueError(f'unsupported sort {sort}')
+
+        sql = 'SELECT data FROM torrents'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY ' + _SORT[sort]
+        if limit is not None:
+            sql += ' LIMIT ?'
+            args.append(int(limit))
+        with self._lock:  # pylint: disable=not-context-manager
+            rows = self._conn.execute(sql, args).fetchall()
+        return [Torrent(json.loads(row[0])) for row in rows]
+
+    def _where(self, kwargs):
+        clauses = []
+        args = []
+
+        search_string = kwargs.pop('search_string', None)
+        if search_string:
+            words = _WORD.findall(search_string)
+            if self._fts and words:
+                clauses.append(
+                    'id IN (SELECT rowid FROM torrents_fts '
+                    'WHERE torrents_fts MATCH ?)')
+                args.append(' '.join(f'"{word}"' for word in words))
+            elif words:
+                clauses.extend(['filename LIKE ?'] * len(words))
+                args.extend(f'%{word}%' for word in words)
+
+        for key, column in (('search_imdb', 'imdb'),
+                            ('search_tvdb', 'tvdb'),
+                            ('search_themoviedb', 'themoviedb')):
+            value = kwargs.pop(key, None)
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                args.append(str(value))
+
+        categories = kwargs.pop('categories', None)
+        category = kwargs.pop('category', None)
+        if category is not None:
+            categories = [category]
+        if categories:
+            names = [
+                CATEGORY_NAMES.get(int(c), str(c))
+                if str(c).isdigit() else str(c)
+                for c in categories
+            ]
+            marks = ', '.join('?' * len(names))
+            clauses.append(f'lower(category) IN ({marks})')
+            args.extend(name.lower() for name in names)
+
+        return clauses, args
+
+
+def _to_row(torrent, now):
+    episode_info = getattr(torrent, 'episode_info', None)
+    ids = [
+        episode_info.get(key) if episode_info else None
+        for key in ('imdb', 'tvdb', 'themoviedb')
+    ]
+    return (
+        torrent.infohash, torrent.filename, torrent.category, torrent.size,
+        _sortable_pubdate(torrent.pubdate), torrent.seeders,
+        torrent.leechers, *[str(i) if i is not None else None for i in ids],
+        int(torrent.is_extended), now, json.dumps(torrent.to_dict()),
+    )
+
+
+def _sortable_pubdate(pubdate):
+    '''
+    pubdate is always +0000, the text sorts like the time
+    '''
+    return pubdate[:19] if pubdate else None
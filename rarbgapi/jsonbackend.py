@@ -0,0 +1,31 @@
+import json
+
+
+BACKENDS = ('orjson', 'ujson', 'json')
+
+
+def get_loads(name='auto'):
+    '''
+    :param name: 'orjson', 'ujson', 'json' or 'auto' for the fastest one
+            installed
+
+    :returns: a loads function accepting bytes
+
+    :raises: ImportError if the backend isn't installed
+    '''
+    if name == 'auto':
+        for backend in BACKENDS:
+            try:
+                return get_loads(backend)
+            except ImportError:
+                continue
+
+    if name == 'json':
+        return json.loads
+    if name == 'orjson':
+        import orjson  # pylint: disable=import-outside-toplevel
+        return orjson.loads
+    if name == 'ujson':
+        import ujson  # pylint: disable=import-outside-toplevel
+        return ujson.loads
+    raise ValueError(f'unsupported json backend {name}')
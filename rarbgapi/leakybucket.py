@@ -1,29 +1,304 @@
+import os
+import json
 import time
+import asyncio
+import tempfile
 import threading
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
 
-class LeakyBucket(object):  # pylint: disable=too-few-public-methods
-    def __init__(self, rate):
+from .utils import write_json
+
+
+class LeakyBucket(object):
+    '''
+    Tokens are refilled continuously at `rate` per second and kept up to
+    `capacity`, which is how many requests may burst after being idle.
+    Waiting is computed from the missing tokens instead of polling.
+    '''
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError('rate should be positive')
         self._rate = rate
+        self._capacity = capacity if capacity is not None else max(1, rate)
         self._lock = threading.Lock()
-        self._last_time = int(time.time())
+        self._last_time = time.monotonic()
         self._token = 0
 
+    @property
+    def rate(self):
+        return self._rate
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def try_acquire(self, token):
+        '''
+        Take tokens without blocking.
+
+        :returns: 0 if tokens are taken, otherwise how many seconds to wait
+                until enough tokens exist, inf if it is never possible
+        '''
+        if token > self._capacity:
+            return float('inf')
+
+        with self._lock:  # pylint: disable=not-context-manager
+            return self._take(token, time.monotonic())
+
+    def on_success(self):
+        '''
+        Called after a request the server answered, adaptive buckets
+        speed up.
+        '''
+
+    def on_throttle(self):
+        '''
+        Called after the server rejected a request for going too fast,
+        adaptive buckets slow down.
+        '''
+
+    def _take(self, token, now):
+        elapsed = max(0, now - self._last_time)
+        self._token = min(self._capacity, self._token + self._rate * elapsed)
+        self._last_time = now
+        if token <= self._token:
+            self._token -= token
+            return 0
+        return (token - self._token) / self._rate
+
+    def _next_delay(self, token, deadline):
+        '''
+        :returns: (acquired, delay) delay is None once deadline can't be met
+        '''
+        delay = self.try_acquire(token)
+        if not delay:
+            return True, 0
+
+        if deadline is None:
+            if delay == float('inf'):
+                raise ValueError(
+                    f'{token} tokens exceed capacity {self._capacity}')
+            return False, delay
+
+        remaining = deadline - time.monotonic()
+        if delay > remaining:
+            return False, None
+        return False, delay
+
     def acquire(self, token, timeout=None):
-        delay = 1
+        '''
+        Block until tokens are taken.
+
+        :param timeout: (optional) seconds to wait at most, fail immediately
+                if the tokens can't be refilled in time
+
+        :returns: True if tokens are taken, False on timeout
+        '''
+        deadline = None if timeout is None else time.monotonic() + timeout
         while True:
-            with self._lock:  # pylint: disable=not-context-manager
-                now = time.time()
-                diff = now - self._last_time
-                if diff:
-                    self._token += self._rate * diff
-                    self._last_time = now
-                    if token <= self._token:
-                        self._token -= token
-                        return True
-
-                    if isinstance(timeout, (int, float)):
-                        if timeout <= 0:
-                            return False
-                        timeout -= delay
+            acquired, delay = self._next_delay(token, deadline)
+            if acquired:
+                return True
+            if delay is None:
+                return False
             time.sleep(delay)
+
+
+class UnlimitedBucket(LeakyBucket):
+    '''
+    Never waits, for a client whose requests are rate limited elsewhere,
+    like one sending to a rarbgapi serve daemon.
+    '''
+    def __init__(self):
+        super().__init__(float('inf'))
+
+    def try_acquire(self, token):
+        return 0
+
+
+class FileLeakyBucket(LeakyBucket):
+    '''
+    LeakyBucket whose state lives in a file guarded by flock, every process
+    and client on the host using the same path shares one budget.
+    '''
+    DEFAULT_PATH = os.path.join(tempfile.gettempdir(), 'rarbgapi.bucket')
+
+    def __init__(self, rate, capacity=None, path=None):
+        if fcntl is None:
+            raise ImportError('FileLeakyBucket requires fcntl')
+        super().__init__(rate, capacity)
+        self._path = path or self.DEFAULT_PATH
+
+    @property
+    def path(self):
+        return self._path
+
+    def try_acquire(self, token):
+        if token > self._capacity:
+            return float('inf')
+
+        # pylint: disable=not-context-manager
+        with self._lock, open(self._path, 'a+', encoding='ascii') as fobj:
+            fcntl.flock(fobj, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                fobj.seek(0)
+                self._load(fobj.read(), now)
+                delay = self._take(token, now)
+                fobj.seek(0)
+                fobj.truncate()
+                fobj.write(f'{self._token!r} {self._last_time!r}')
+                fobj.flush()
+            finally:
+                fcntl.flock(fobj, fcntl.LOCK_UN)
+        return delay
+
+    def _load(self, content, now):
+        try:
+            token, last_time = content.split()
+            self._token, self._last_time = float(token), float(last_time)
+        except ValueError:
+            # new or corrupted state, start with an empty bucket
+            self._token, self._last_time = 0, now
+
+
+# pylint: disable=too-many-instance-attributes
+class AdaptiveLeakyBucket(LeakyBucket):
+    '''
+    LeakyBucket which learns the rate the server tolerates, additive
+    increase on success and multiplicative decrease on throttle.
+
+    :param rate: (optional) starting rate, a rate saved in state_path
+            takes precedence
+    :param min_rate: (optional) lowest rate
+    :param max_rate: (optional) highest rate
+    :param increase: (optional) requests per second added by a success
+    :param decrease: (optional) factor applied to the rate by a throttle
+    :param capacity: (optional) burst size, default is 1
+    :param state_path: (optional) file the learned rate is saved to and
+            restored from
+    :param save_interval: (optional) seconds between saves on success,
+            throttles are saved immediately
+
+    Successes only speed up while requests wait for the bucket. A
+    throttle only slows down once per interval at the new rate, several
+    requests rejected by the same congestion count once.
+    '''
+    def __init__(self, rate=0.5, min_rate=0.1, max_rate=10.0,
+                 increase=0.01, decrease=0.5, capacity=1, state_path=None,
+                 save_interval=10.0):
+        # pylint: disable=too-many-arguments
+        if not 0 < decrease < 1:
+            raise ValueError('decrease should be between 0 and 1')
+        super().__init__(rate, capacity)
+        self._min_rate = min_rate
+        self._max_rate = max_rate
+        self._increase = increase
+        self._decrease = decrease
+        self._state_path = state_path
+        self._save_interval = save_interval
+        self._saved_at = time.monotonic()
+        self._decreased_at = None
+        self._limited = False
+        self._load()
+        self._rate = self._clamp(self._rate)
+
+    @property
+    def min_rate(self):
+        return self._min_rate
+
+    @property
+    def max_rate(self):
+        return self._max_rate
+
+    def _clamp(self, rate):
+        return min(self._max_rate, max(self._min_rate, rate))
+
+    def _take(self, token, now):
+        delay = super()._take(token, now)
+        if delay:
+            self._limited = True
+        return delay
+
+    def on_success(self):
+        with self._lock:  # pylint: disable=not-context-manager
+            # only probe a higher rate when the rate is what holds
+            # requests back
+            if self._limited:
+                self._limited = False
+                self._rate = self._clamp(self._rate + self._increase)
+            due = time.monotonic() - self._saved_at >= self._save_interval
+        if due:
+            self.save()
+
+    def on_throttle(self):
+        with self._lock:  # pylint: disable=not-context-manager
+            now = time.monotonic()
+            if self._decreased_at is not None and \
+                    now - self._decreased_at < 1 / self._rate:
+                return
+            self._decreased_at = now
+            self._rate = self._clamp(self._rate * self._decrease)
+            # the burst allowance is what got throttled
+            self._token = 0
+        self.save()
+
+    def _load(self):
+        if not self._state_path or not os.path.exists(self._state_path):
+            return
+        try:
+            with open(self._state_path, 'r', encoding='utf-8') as fobj:
+                self._rate = float(json.load(fobj)['rate'])
+        except (IOError, ValueError, KeyError, TypeError):
+            # corrupted state, keep the starting rate
+            pass
+
+    def save(self):
+        '''
+        Write the current rate to state_path.
+        '''
+        if not self._state_path:
+            return
+        with self._lock:  # pylint: disable=not-context-manager
+            self._saved_at = time.monotonic()
+            rate = self._rate
+        write_json(self._state_path, {'rate': rate})
+
+
+class AsyncLeakyBucket(LeakyBucket):
+    '''
+    LeakyBucket for asyncio, waiting for tokens suspends the calling task
+    instead of blocking the event loop.
+    '''
+    # pylint: disable=invalid-overridden-method
+    async def acquire(self, token, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            acquired, delay = self._next_delay(token, deadline)
+            if acquired:
+                return True
+            if delay is None:
+                return False
+            await asyncio.sleep(delay)
+
+
+class AsyncUnlimitedBucket(UnlimitedBucket, AsyncLeakyBucket):
+    '''
+    UnlimitedBucket for AsyncRarbgAPI.
+    '''
+
+
+class AsyncFileLeakyBucket(FileLeakyBucket, AsyncLeakyBucket):
+    '''
+    FileLeakyBucket for AsyncRarbgAPI.
+    '''
+
+
+class AsyncAdaptiveLeakyBucket(AdaptiveLeakyBucket, AsyncLeakyBucket):
+    '''
+    AdaptiveLeakyBucket for AsyncRarbgAPI.
+    '''
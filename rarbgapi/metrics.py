@@ -0,0 +1,119 @@
+import bisect
+import threading
+
+
+class Histogram(object):
+    '''
+    Cumulative histogram with fixed upper bounds, in seconds by default.
+    '''
+    DEFAULT_BUCKETS = (
+        0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+    )
+
+    def __init__(self, buckets=None):
+        self.buckets = tuple(sorted(buckets or self.DEFAULT_BUCKETS))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, fraction):
+        '''
+        :returns: upper bound of the bucket holding the quantile, inf if it
+                is above the last bucket and None without observation
+        '''
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'), ), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'buckets': dict(zip(self.buckets + (float('inf'), ),
+                                self.counts)),
+        }
+
+
+class MetricsCollector(object):
+    '''
+    Collects counters and latency histograms from client hooks.
+
+    >>> metrics = MetricsCollector()
+    >>> metrics.install(client)
+    >>> client.list()
+    >>> metrics.snapshot()
+
+    Counters are requests, errors, cache_hits, throttles, token_refreshes,
+    retries and retries by error class as retries.<kind>. Histograms are
+    request, rate_wait, token_refresh, http and decode durations.
+    '''
+    def __init__(self, buckets=None):
+        self._buckets = buckets
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def install(self, client):
+        for event in ('request_end', 'rate_wait', 'token_refresh', 'http',
+                      'decode', 'retry', 'throttle'):
+            client.add_hook(event, self)
+
+    def uninstall(self, client):
+        for event in ('request_end', 'rate_wait', 'token_refresh', 'http',
+                      'decode', 'retry', 'throttle'):
+            client.remove_hook(event, self)
+
+    def increment(self, name, value=1):
+        with self._lock:  # pylint: disable=not-context-manager
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        with self._lock:  # pylint: disable=not-context-manager
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(self._buckets)
+            histogram.observe(value)
+
+    def __call__(self, event, **info):
+        if event == 'request_end':
+            self.increment('requests')
+            if info['error'] is not None:
+                self.increment('errors')
+            if info['cached']:
+                self.increment('cache_hits')
+            self.observe('request', info['duration'])
+        elif event == 'retry':
+            self.increment('retries')
+            self.increment(f'retries.{info["kind"]}')
+        elif event == 'throttle':
+            self.increment('throttles')
+        else:
+            if event == 'token_refresh':
+                self.increment('token_refreshes')
+            self.observe(event, info['duration'])
+
+    def snapshot(self):
+        with self._lock:  # pylint: disable=not-context-manager
+            return {
+                'counters': dict(self.counters),
+                'histograms': {
+                    name: histogram.snapshot()
+                    for name, histogram in self.histograms.items()
+                },
+            }
+
+    def reset(self):
+        with self._lock:  # pylint: disable=not-context-manager
+            self.counters = {}
+            self.histograms = {}
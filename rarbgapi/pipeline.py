@@ -0,0 +1,257 @@
+'''
+What list and search do, shared by RarbgAPI and AsyncRarbgAPI.
+
+The pipeline is written as generators that yield actions (wait for the
+rate limiter, send a query, sleep, ...) and get their result back. They
+never do I/O themselves: a client drives them with run or run_async and
+its _perform method, which is the only part that differs between the
+blocking and the asyncio client.
+'''
+# pylint: disable=protected-access
+import time
+import functools
+import collections
+
+from . import fanout
+from .cache import cache_key
+from .filters import TorrentList, apply_hints
+from .retry import Deadline, DeadlineExceeded
+
+
+class TokenExpireException(Exception):
+    pass
+
+
+class ThrottleException(Exception):
+    pass
+
+
+# take a token from the rate limiter, result is whether it was acquired
+Acquire = collections.namedtuple('Acquire', ['timeout'])
+# refresh the token the server rejected
+RefreshToken = collections.namedtuple('RefreshToken', ['stale', 'deadline'])
+# send a list or search query, result is the response body
+Send = collections.namedtuple('Send', ['params', 'deadline'])
+Sleep = collections.namedtuple('Sleep', ['seconds'])
+# run steps unless an identical query is in flight, result is what the
+# steps of whichever query ran returned
+Coalesce = collections.namedtuple('Coalesce', ['key', 'steps', 'timeout'])
+# run several steps, concurrently if the client can, result is the list
+# of what they returned
+Gather = collections.namedtuple('Gather', ['steps'])
+
+
+def run(steps, perform):
+    '''
+    Drive steps, perform(action) does the I/O of every yielded action.
+
+    :returns: what steps returned
+    '''
+    try:
+        result = error = None
+        while True:
+            try:
+                action = steps.send(result) if error is None \
+                    else steps.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            try:
+                result, error = perform(action), None
+            except Exception as exp:  # pylint: disable=broad-except
+                result, error = None, exp
+    finally:
+        steps.close()
+
+
+async def run_async(steps, perform):
+    '''
+    run for a coroutine perform.
+    '''
+    try:
+        result = error = None
+        while True:
+            try:
+                action = steps.send(result) if error is None \
+                    else steps.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            try:
+                result, error = await perform(action), None
+            except Exception as exp:  # pylint: disable=broad-except
+                result, error = None, exp
+    finally:
+        steps.close()
+
+
+def request(func):
+    '''
+    Turn a method returning query parameters into list or search, what the
+    client's _run returns is returned, a coroutine for AsyncRarbgAPI.
+    '''
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        return self._run(request_steps(self, func, args, kwargs))
+    return wrapper
+
+
+def request_steps(client, func, args, kwargs):
+    deadline = Deadline(kwargs.pop('timeout', client._options['timeout']))
+    predicate = kwargs.pop('where', None)
+    if predicate is not None:
+        apply_hints(predicate, kwargs)
+    fetch = fan_out_steps if kwargs.pop('fan_out', False) else fetch_steps
+    upgrade = kwargs.pop('upgrade', None)
+    if upgrade is not None:
+        kwargs['extended_response'] = False
+    params = func(client, *args, **kwargs)
+    started = time.monotonic()
+    client._emit('request_start', params=params)
+    torrents = error = None
+    cached = False
+    try:
+        fetch = functools.partial(fetch, client, deadline=deadline)
+        torrents, cached = yield from fetch(params)
+        if upgrade is not None:
+            torrents = yield from upgrade_steps(
+                fetch, params, torrents, upgrade)
+        result = TorrentList(torrents)
+        if predicate is not None:
+            result = result.filter(predicate)
+        result.unchanged = getattr(torrents, 'unchanged', False)
+        return result
+    except Exception as exp:
+        error = exp
+        raise
+    finally:
+        client._emit(
+            'request_end', params=params,
+            duration=time.monotonic() - started, error=error,
+            cached=cached, count=len(torrents) if torrents else 0)
+
+
+def fetch_steps(client, params, deadline):
+    '''
+    :returns: (torrents, whether they came from the cache)
+    '''
+    cache = client._options['cache']
+    if cache is not None:
+        torrents = cache.get(params)
+        if torrents is not None:
+            return torrents, True
+    if not client._options['coalesce']:
+        return (yield from load_steps(client, params, deadline)), False
+    # identical queries in flight share one request
+    torrents, _ = yield Coalesce(
+        cache_key(params), load_steps(client, params, deadline),
+        deadline.remaining())
+    return torrents, False
+
+
+def load_steps(client, params, deadline):
+    torrents = yield from send_steps(client, params, deadline)
+    cache = client._options['cache']
+    if cache is not None:
+        cache.set(params, torrents)
+    if client._options['index'] is not None and \
+            not getattr(torrents, 'unchanged', False):
+        client._options['index'].ingest(torrents)
+    return torrents
+
+
+def fan_out_steps(client, params, deadline):
+    '''
+    Query halves of the categories while they fill the limit and merge
+    what they return.
+    '''
+    torrents, cached = yield from fetch_steps(client, params, deadline)
+    queries = fanout.split(params, torrents)
+    if not queries:
+        return torrents, cached
+    results = yield Gather([
+        fan_out_steps(client, query, deadline) for query in queries
+    ])
+    return (fanout.merge([torrents for torrents, _ in results],
+                         params.get('sort')),
+            all(cached for _, cached in results))
+
+
+def upgrade_steps(fetch, params, torrents, predicate):
+    '''
+    Fetch the extended format only if a brief torrent passes predicate,
+    and only those torrents are replaced by their extended version.
+
+    :param fetch: fetch(params) steps returning (torrents, cached)
+    '''
+    wanted = {t.infohash for t in torrents if predicate(t)}
+    if not wanted:
+        return torrents
+    extended, _ = yield from fetch(dict(params, format='json_extended'))
+    return upgrade_torrents(torrents, extended, wanted)
+
+
+def upgrade_torrents(torrents, extended, wanted):
+    '''
+    :returns: torrents with the ones whose infohash is in wanted replaced
+            by their version in extended
+    '''
+    found = {t.infohash: t for t in extended if t.infohash in wanted}
+    return [found.get(t.infohash, t) for t in torrents]
+
+
+def send_steps(client, params, deadline):
+    state = client._retry_policy.start(client._options['retries'], deadline)
+    deadline = state.deadline
+    token = None
+    refresh = False
+    while True:
+        try:
+            if refresh:
+                started = time.monotonic()
+                yield RefreshToken(token, deadline)
+                client._emit('token_refresh', params=params,
+                             duration=time.monotonic() - started)
+                refresh = False
+
+            started = time.monotonic()
+            acquired = yield Acquire(deadline.remaining())
+            client._emit('rate_wait', params=params,
+                         duration=time.monotonic() - started)
+            if not acquired:
+                raise DeadlineExceeded('deadline exceeded by rate limiter')
+
+            token = client._token
+            if not token:
+                raise TokenExpireException('Empty token')
+
+            started = time.monotonic()
+            content = yield Send(params, deadline)
+            client._emit('http', params=params,
+                         duration=time.monotonic() - started,
+                         size=len(content))
+            torrents = client._parse_response(params, content)
+        except ThrottleException as exp:
+            client._log.debug('Retry due to throttle')
+            _notify(client._bucket, 'on_throttle')
+            client._emit('throttle', params=params)
+            yield Sleep(client._retry(state, params, 'throttle', exp))
+        except (ValueError, DeadlineExceeded):
+            # bad arguments or out of time, not necessary to retry
+            raise
+        except TokenExpireException as exp:
+            client._retry(state, params, 'token', exp)
+            refresh = True
+        except Exception as exp:  # pylint: disable=broad-except
+            client._log.exception('Unexpected exception %s', exp)
+            yield Sleep(client._retry(
+                state, params, client._classify_error(exp), exp))
+        else:
+            state.success()
+            _notify(client._bucket, 'on_success')
+            return torrents
+
+
+def _notify(limiter, hook):
+    # a rate_limiter only needs acquire, adaptive ones have the hooks
+    callback = getattr(limiter, hook, None)
+    if callback is not None:
+        callback()
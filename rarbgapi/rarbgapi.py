@@ -1,10 +1,27 @@
+import re
+import sys
+import json
 import time
+import hashlib
+import inspect
 import logging
+import datetime
+import functools
 import platform
 
-import requests
-
+from .categories import Categories
+from .transport import RequestsTransport
 from .leakybucket import LeakyBucket
+from .tokenstore import MemoryTokenStore
+from .batch import Query, BatchScheduler
+from .utils import BoundedSet, BoundedDict
+from .cache import cache_key
+from .coalesce import Coalescer
+from .jsonbackend import get_loads
+from . import pipeline
+from .pipeline import request, TokenExpireException, ThrottleException
+from .filters import TorrentList
+from .retry import RetryPolicy, Deadline
 from .__version__ import __version__
 
 
@@ -37,34 +54,183 @@ class Torrent(object):
         "info_page":"https://torrentapi.org/...."
     }
     '''
+    __slots__ = (
+        'is_extended', 'category', 'download', 'filename', 'size',
+        'pubdate', 'page', 'seeders', 'leechers', 'ranked', 'episode_info',
+        '_extra', '_tags',
+    )
+
+    _FIELDS = {
+        'title': 'filename',
+        'filename': 'filename',
+        'category': 'category',
+        'download': 'download',
+        'size': 'size',
+        'pubdate': 'pubdate',
+        'info_page': 'page',
+        'seeders': 'seeders',
+        'leechers': 'leechers',
+        'ranked': 'ranked',
+        'episode_info': 'episode_info',
+    }
+
     def __init__(self, mapping):
-        self._raw = mapping
-        self.is_extended = 'title' in self._raw
-        self.category = self._raw['category']
-        self.download = self._raw['download']
-        self.filename = self._raw.get('filename') or self._raw.get('title')
-        self.size = self._raw.get('size')
-        self.pubdate = self._raw.get('pubdate')
-        self.page = self._raw.get('info_page')
-        self.seeders = self._raw.get('seeders')
-        self.leechers = self._raw.get('leechers')
+        self.is_extended = 'title' in mapping
+        self.category = sys.intern(mapping['category'])
+        self.download = mapping['download']
+        self.filename = mapping.get('filename') or mapping.get('title')
+        self.size = _to_int(mapping.get('size'))
+        self.pubdate = mapping.get('pubdate')
+        self.page = mapping.get('info_page')
+        self.seeders = _to_int(mapping.get('seeders'))
+        self.leechers = _to_int(mapping.get('leechers'))
+        # optional fields are left unset so they raise AttributeError
+        ranked = mapping.get('ranked')
+        if ranked is not None:
+            self.ranked = _to_int(ranked)
+        episode_info = mapping.get('episode_info')
+        if episode_info is not None:
+            self.episode_info = EpisodeInfo(episode_info)
+        extra = {
+            key: value for key, value in mapping.items()
+            if key not in self._FIELDS and value is not None
+        }
+        self._extra = extra or None
 
     def __str__(self):
-        return f'{self.filename}(self.category)'
+        return f'{self.filename}({self.category})'
+
+    def __repr__(self):
+        return f'Torrent({self.filename!r}, {self.category!r})'
+
+    @property
+    def infohash(self):
+        '''
+        btih of the magnet link in lower case, the link itself if it isn't
+        a magnet
+        '''
+        match = _BTIH.search(self.download)
+        return match.group(1).lower() if match else self.download
+
+    @property
+    def published(self):
+        '''
+        pubdate parsed to an aware datetime, None for brief torrents
+        '''
+        if not self.pubdate:
+            return None
+        return datetime.datetime.strptime(self.pubdate, '%Y-%m-%d %H:%M:%S %z')
+
+    def to_dict(self):
+        mapping = {
+            'title' if self.is_extended else 'filename': self.filename,
+            'category': self.category,
+            'download': self.download,
+        }
+        for key, attr in self._FIELDS.items():
+            if key in mapping or key in ('title', 'filename'):
+                continue
+            value = getattr(self, attr, None)
+            if value is not None:
+                mapping[key] = value
+        if 'episode_info' in mapping:
+            mapping['episode_info'] = mapping['episode_info'].to_dict()
+        if self._extra:
+            mapping.update(self._extra)
+        return mapping
 
     def __getattr__(self, key):
-        value = self._raw.get(key)
+        if key.startswith('_'):
+            raise AttributeError(key)
+        if key == 'title' and self.is_extended:
+            return self.filename
+        if key == 'info_page' and self.page is not None:
+            return self.page
+        value = self._extra.get(key) if self._extra else None
         if value is None:
             raise AttributeError(f'{key} not exists')
         return value
 
 
+class EpisodeInfo(object):
+    '''
+    {
+        "imdb":"tt4443856",
+        "tvrage":null,
+        "tvdb":null,
+        "themoviedb":"430293"
+    }
+
+    Also readable as a mapping, episode_info['imdb'].
+    '''
+    __slots__ = ('imdb', 'tvrage', 'tvdb', 'themoviedb')
+
+    def __init__(self, mapping):
+        self.imdb = mapping.get('imdb')
+        self.tvrage = mapping.get('tvrage')
+        self.tvdb = mapping.get('tvdb')
+        self.themoviedb = mapping.get('themoviedb')
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def __eq__(self, other):
+        if isinstance(other, EpisodeInfo):
+            other = other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(tuple(self.to_dict().items()))
+
+    def items(self):
+        return self.to_dict().items()
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __repr__(self):
+        return f'EpisodeInfo({self.to_dict()})'
+
+
+_BTIH = re.compile(r'urn:btih:([0-9a-zA-Z]+)')
+
+
+def _to_int(value):
+    if value is None or isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
 def json_hook(dct):
     if 'download' in dct:
         return Torrent(dct)
     return dct
 
 
+def decode_torrents(content, loads):
+    '''
+    Decode a response body and build Torrents from torrent_results in one
+    pass, no callback runs for other objects.
+    '''
+    body = loads(content)
+    if isinstance(body, dict):
+        results = body.get('torrent_results')
+        if results:
+            body['torrent_results'] = [Torrent(item) for item in results]
+    return body
+
+
 class _RarbgAPIv2(object):
     '''
     API reference
@@ -73,29 +239,75 @@ class _RarbgAPIv2(object):
     ENDPOINT = 'http://torrentapi.org/pubapi_v2.php'
     APP_ID = 'rarbgapi'
 
-    def __init__(self):
+    def __init__(self, **options):
         super().__init__()
-        self._token = None
-        self._endpoint = self.ENDPOINT
+        default_options = {
+            'endpoint': None,
+            'transport': None,
+            'pool_connections': 1,
+            'pool_maxsize': 10,
+            'pool_block': False,
+            'keep_alive': True,
+            'token_store': None,
+            'connect_timeout': 10,
+            'read_timeout': 30,
+        }
+        default_options.update(options)
+        self._options = default_options
+        self._endpoint = self._options['endpoint'] or self.ENDPOINT
+        self._tokens = self._options['token_store'] or \
+            MemoryTokenStore.shared()
+        self._transport = self._options['transport'] or \
+            self._create_transport()
+
+    def _create_transport(self):
+        return RequestsTransport(
+            pool_connections=self._options['pool_connections'],
+            pool_maxsize=self._options['pool_maxsize'],
+            pool_block=self._options['pool_block'],
+            keep_alive=self._options['keep_alive'])
+
+    def _token_key(self):
+        return self._endpoint
+
+    @property
+    def _token(self):
+        return self._tokens.get(self._token_key())
+
+    @_token.setter
+    def _token(self, token):
+        self._tokens.set(self._token_key(), token)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        '''
+        Release the pooled connections, a new pool will be created
+        if the client is used again.
+        '''
+        self._transport.close()
 
     def _get_user_agent(self):
         uname = '; '.join(platform.uname())
         pyver = platform.python_version()
         return f'{self.APP_ID}/{__version__} ({uname}) python {pyver}'
 
-    def _get_token(self):
+    def _get_token(self, deadline=None):
         '''
         {"token":"xxxxx"}
         '''
         params = {
             'get_token': 'get_token'
         }
-        return self._requests('GET', self._endpoint, params)
+        return self._requests('GET', self._endpoint, params, deadline)
 
-    def _query(self, mode, **kwargs):
+    def _query_params(self, mode, **kwargs):  # pylint: disable=no-self-use
         params = {
             'mode': mode,
-            'token': self._token
         }
 
         if 'extended_response' in kwargs:
@@ -121,128 +333,265 @@ class _RarbgAPIv2(object):
 
             params[key] = value
 
-        return self._requests('GET', self._endpoint, params)
+        return params
+
+    def _query(self, params, deadline=None):
+        params = dict(params, token=self._token)
+        return self._requests('GET', self._endpoint, params, deadline)
+
+    def _get_timeout(self, deadline):
+        '''
+        :returns: (connect, read) timeouts capped by the deadline
+        '''
+        deadline = deadline or Deadline()
+        deadline.check('request')
+        return (deadline.cap(self._options['connect_timeout']),
+                deadline.cap(self._options['read_timeout']))
 
-    # pylint: disable=no-self-use
-    def _requests(self, method, url, params=None):
+    def _requests(self, method, url, params=None, deadline=None):
         if not params:
             params = {}
         params.update({
             'app_id': self.APP_ID
         })
+        headers = self._transport.headers
+        if 'user-agent' not in headers:
+            # before the first request opens the session
+            headers['user-agent'] = self._get_user_agent()
 
-        headers = {
-            'user-agent': self._get_user_agent()
-        }
-        sess = requests.Session()
-        req = requests.Request(method, url, params=params, headers=headers)
-        preq = req.prepare()
-        resp = sess.send(preq)
-        resp.raise_for_status()
-        return resp
+        # a coroutine when the transport is asynchronous
+        return self._transport.request(
+            method, url, params, self._get_timeout(deadline),
+            total=deadline.remaining() if deadline else None)
 
 
-class TokenExpireException(Exception):
-    pass
+HOOK_EVENTS = (
+    'request_start', 'request_end', 'rate_wait', 'token_refresh', 'http',
+    'decode', 'retry', 'throttle',
+)
 
 
-def request(func):
-    # pylint: disable=protected-access, too-many-branches
-    def wrapper(self, *args, **kwargs):
-        max_retries = retries = self._options['retries']
-        while retries > 0:
-            try:
-                if max_retries != retries:
-                    backoff = 2**(max_retries - retries)
-                    time.sleep(backoff)
-
-                if not self._bucket.acquire(1, timeout=2):
-                    raise ValueError('accquire token timeout')
-
-                if not self._token:
-                    raise TokenExpireException('Empty token')
-
-                resp = func(self, *args, **kwargs)
-                body = resp.json(object_hook=json_hook)
-                error_code = body.get('error_code')
-                if error_code:  # pylint: disable=no-else-raise
-                    if error_code in [2, 4]:  # pylint: disable=no-else-raise
-                        raise TokenExpireException('Token expired')
-                    elif error_code == 5:
-                        # {
-                        #     u'error_code': 5,
-                        #     u'error': u'Too many requests per second.
-                        #            Maximum requests allowed are 1req/2sec
-                        #            Please try again later!'
-                        # }
-                        self._log.debug('Retry due to throttle')
-                        continue
-                    elif error_code == 20:
-                        return []
-
-                    self._log.warn('error %s', body)
-                    raise ValueError('error')
-                elif 'torrent_results' not in body:
-                    self._log.info('Bad response %s', body)
-                return body['torrent_results']
-            except ValueError:
-                # bad arguments, not necessary to retry
-                raise
-            except TokenExpireException:
-                resp = self._get_token()
-                content = resp.json()
-                self._token = content['token']
-                self._log.debug('token=%s', self._token)
-            except Exception as exp:  # pylint: disable=broad-except
-                self._log.exception('Unexpected exception %s', exp)
-                retries -= 1
-                if not retries:
-                    raise
-            else:
-                retries -= 1
-
-        assert 0, 'Unexpected response'
-    return wrapper
-
-
-class RarbgAPI(_RarbgAPIv2):
-
-    CATEGORY_ADULT = 4
-    CATEGORY_MOVIE_XVID = 14
-    CATEGORY_MOVIE_XVID_720P = 48
-    CATEGORY_MOVIE_H264 = 17
-    CATEGORY_MOVIE_H264_1080P = 44
-    CATEGORY_MOVIE_H264_720P = 45
-    CATEGORY_MOVIE_H264_3D = 47
-    CATEGORY_MOVIE_H264_4K = 50
-    CATEGORY_MOVIE_H265_4K = 51
-    CATEGORY_MOVIE_H265_4K_HDR = 52
-    CATEGORY_MOVIE_H265_1080P = 54
-    CATEGORY_MOVIE_FULL_BD = 42
-    CATEGORY_MOVIE_BD_REMUX = 46
-    CATEGORY_TV_EPISODES = 18
-    CATEGORY_TV_EPISODES_HD = 41
-    CATEGORY_TV_EPISODES_UHD = 49
-    CATEGORY_MUSIC_MP3 = 23
-    CATEGORY_MUSIC_FLAC = 25
-    CATEGORY_GAMES_PC_ISO = 27
-    CATEGORY_GAMES_PC_RIP = 28
-    CATEGORY_GAMES_PS3 = 40
-    CATEGORY_GAMES_PS4 = 53
-    CATEGORY_GAMES_XBOX = 32
-    CATEGORY_SOFTWARE = 33
-    CATEGORY_EBOOK = 35
+class _RarbgAPIBase(_RarbgAPIv2, Categories):
+    RATE_LIMITER = LeakyBucket
+    COALESCER = Coalescer
 
     def __init__(self, **options):
-        super().__init__()
-        self._bucket = LeakyBucket(0.5)
-        self._log = logging.getLogger(__name__)
         default_options = {
             'retries': 5,
+            'rate_limiter': None,
+            'cache': None,
+            'index': None,
+            'fingerprints': 64,
+            'coalesce': True,
+            'fast_decode': False,
+            'json_backend': 'auto',
+            'retry_policy': None,
+            'timeout': None,
+            'hooks': None,
         }
         if options:
             default_options.update(options)
-        self._options = default_options
+        super().__init__(**default_options)
+        self._log = logging.getLogger(__name__)
+        self._loads = get_loads(self._options['json_backend']) \
+            if self._options['fast_decode'] else None
+        self._retry_policy = self._options['retry_policy'] or RetryPolicy()
+        self._fingerprints = BoundedDict(self._options['fingerprints'])
+        self._bucket = self._get_rate_limiter(self.RATE_LIMITER)
+        self._inflight = self.COALESCER()
+        self._hooks = {}
+        for event, callback in (self._options['hooks'] or {}).items():
+            self.add_hook(event, callback)
+
+    @property
+    def cache(self):
+        '''
+        The response cache, None if responses aren't cached.
+        '''
+        return self._options['cache']
+
+    @property
+    def rate_limiter(self):
+        '''
+        The rate limiter acquired before every request.
+        '''
+        return self._bucket
+
+    @property
+    def in_flight(self):
+        '''
+        How many distinct queries are being sent.
+        '''
+        return len(self._inflight)
+
+    def _get_rate_limiter(self, default):
+        '''
+        :returns: the rate_limiter option or default(0.5)
+
+        :raises: TypeError if the limiter is blocking and the client async
+                or the opposite
+        '''
+        bucket = self._options['rate_limiter']
+        if bucket is None:
+            return default(0.5)
+        if inspect.iscoroutinefunction(bucket.acquire) != \
+                inspect.iscoroutinefunction(default.acquire):
+            raise TypeError(
+                f'{type(self).__name__} can\'t use {type(bucket).__name__}, '
+                f'the rate limiter should be like {default.__name__}')
+        return bucket
+
+    def add_hook(self, event, callback):
+        '''
+        Call callback(event, **info) on a request lifecycle event.
+
+        request_start: params
+        request_end: params, duration, error, cached, count
+        rate_wait: params, duration
+        token_refresh: params, duration
+        http: params, duration, size
+        decode: params, duration
+        retry: params, kind, delay, error
+        throttle: params
+
+        :raises: ValueError for unknown events
+        '''
+        event = event[3:] if event.startswith('on_') else event
+        if event not in HOOK_EVENTS:
+            raise ValueError(f'unsupported event {event}')
+        # copy on write, requests in other threads may be emitting
+        self._hooks[event] = self._hooks.get(event, []) + [callback]
+
+    def remove_hook(self, event, callback):
+        event = event[3:] if event.startswith('on_') else event
+        callbacks = list(self._hooks.get(event, []))
+        callbacks.remove(callback)
+        self._hooks[event] = callbacks
+
+    def _emit(self, event, **info):
+        for callback in self._hooks.get(event, ()):
+            try:
+                callback(event, **info)
+            except Exception:  # pylint: disable=broad-except
+                self._log.exception('Hook %s failed', callback)
+
+    def _retry(self, state, params, kind, exp):
+        try:
+            delay = state.retry(kind, exp)
+        except Exception:
+            self._emit('retry', params=params, kind=kind, delay=None,
+                       error=exp)
+            raise
+        self._emit('retry', params=params, kind=kind, delay=delay, error=exp)
+        return delay
+
+    def _classify_error(self, exp):  # pylint: disable=no-self-use
+        if isinstance(exp, self._transport.connection_errors):
+            return 'connection'
+        return 'server'
+
+    def _decode(self, content):
+        if self._loads:
+            return decode_torrents(content, self._loads)
+        return json.loads(content, object_hook=json_hook)
+
+    def _parse_response(self, params, content):
+        '''
+        Decode content unless it is the body the same query got last time,
+        then the torrents decoded back then are returned as a TorrentList
+        with unchanged set.
+        '''
+        digest = None
+        if self._options['fingerprints']:
+            key = cache_key(params)
+            digest = hashlib.blake2b(content, digest_size=16).digest()
+            previous = self._fingerprints.get(key)
+            if previous is not None and previous[0] == digest:
+                torrents = TorrentList(previous[1])
+                torrents.unchanged = True
+                return torrents
+
+        started = time.monotonic()
+        body = self._decode(content)
+        self._emit('decode', params=params,
+                   duration=time.monotonic() - started)
+        torrents = self._parse_body(body)
+        if digest is not None:
+            self._fingerprints[key] = (digest, torrents)
+        return torrents
+
+    def _parse_token(self, content):
+        '''
+        {"token":"xxxxx"}
+        '''
+        token = content['token']
+        self._log.debug('token=%s', token)
+        return token
+
+    def _parse_body(self, body):
+        error_code = body.get('error_code')
+        if error_code:  # pylint: disable=no-else-raise
+            if error_code in [2, 4]:  # pylint: disable=no-else-raise
+                raise TokenExpireException('Token expired')
+            elif error_code == 5:
+                # {
+                #     u'error_code': 5,
+                #     u'error': u'Too many requests per second.
+                #            Maximum requests allowed are 1req/2sec
+                #            Please try again later!'
+                # }
+                raise ThrottleException('Too many requests')
+            elif error_code == 20:
+                return []
+
+            self._log.warning('error %s', body)
+            raise ValueError('error')
+        elif 'torrent_results' not in body:
+            self._log.info('Bad response %s', body)
+        return body['torrent_results']
+
+    def backward_compability(self, kwargs):  # pylint: disable=no-self-use
+        value = kwargs.pop('format_', None)
+        if value:
+            kwargs['extended_response'] = (value == 'json_extended')
+
+        value = kwargs.pop('category', None)
+        if value:
+            kwargs['categories'] = [value, ]
+
+        return kwargs
+
+
+class RarbgAPI(_RarbgAPIBase):
+
+    def _refresh_token(self, stale, deadline=None):
+        self._tokens.refresh(
+            self._token_key(), stale,
+            lambda: self._parse_token(json.loads(self._get_token(deadline))))
+
+    def _run(self, steps):
+        return pipeline.run(steps, self._perform)
+
+    def _perform(self, action):
+        '''
+        Do the I/O of a pipeline action.
+        '''
+        kind = type(action)
+        if kind is pipeline.Send:
+            return self._query(action.params, action.deadline)
+        if kind is pipeline.Acquire:
+            return self._bucket.acquire(1, timeout=action.timeout)
+        if kind is pipeline.Sleep:
+            return time.sleep(action.seconds)
+        if kind is pipeline.RefreshToken:
+            return self._refresh_token(action.stale, action.deadline)
+        if kind is pipeline.Coalesce:
+            return self._inflight.run(
+                action.key, functools.partial(self._run, action.steps),
+                action.timeout)
+        if kind is pipeline.Gather:
+            return [self._run(steps) for steps in action.steps]
+        raise TypeError(f'unsupported action {action}')
 
     @request
     def list(self, **kwargs):
@@ -261,15 +610,26 @@ class RarbgAPI(_RarbgAPIv2):
         :param search_themoviedb: (optional)
         :param extended_response: (optional) return full context of torrent,
                 default is False
+        :param where: (optional) a rarbgapi.filters.Filter torrents have to
+                pass, it can also set sort, limit and categories
+        :param fan_out: (optional) query halves of categories again while
+                they fill the limit, to get up to limit torrents of every
+                category, default is False
+        :param upgrade: (optional) a predicate on brief torrents, the
+                extended format is fetched only if some pass and only they
+                are returned extended
         :param category: (optional) DEPRECATED, please use categories instead
         :param format_: (optional) DEPRECATED, please use extended_response
                 instead
 
-        :returns: a list of Torrents
+        :returns: a TorrentList of Torrents, unchanged is True when the
+                server sent the same body as for the previous identical
+                query
 
         :raises: ValueError
         """
-        return self._query('list', **self.backward_compability(kwargs))
+        return self._query_params(
+            'list', **self.backward_compability(kwargs))
 
     @request
     def search(self, **kwargs):
@@ -288,23 +648,120 @@ class RarbgAPI(_RarbgAPIv2):
         :param search_themoviedb: (optional)
         :param extended_response: (optional) return full context of torrent,
                 default is False
+        :param where: (optional) a rarbgapi.filters.Filter torrents have to
+                pass, it can also set sort, limit and categories
+        :param fan_out: (optional) query halves of categories again while
+                they fill the limit, to get up to limit torrents of every
+                category, default is False
+        :param upgrade: (optional) a predicate on brief torrents, the
+                extended format is fetched only if some pass and only they
+                are returned extended
         :param category: (optional) DEPRECATED, please use categories instead
         :param format_: (optional) DEPRECATED, please use extended_response
                 instead
 
-        :returns: a list of Torrents
+        :returns: a TorrentList of Torrents, unchanged is True when the
+                server sent the same body as for the previous identical
+                query
 
         :raises: ValueError
         """
-        return self._query('search', **self.backward_compability(kwargs))
+        return self._query_params(
+            'search', **self.backward_compability(kwargs))
 
-    def backward_compability(self, kwargs):  # pylint: disable=no-self-use
-        value = kwargs.pop('format_', None)
-        if value:
-            kwargs['extended_response'] = (value == 'json_extended')
+    def batch(self, queries, workers=1):
+        """
+        Run many queries through the rate limiter, highest priority first.
 
-        value = kwargs.pop('category', None)
-        if value:
-            kwargs['categories'] = [value, ]
+        :param queries: Query objects, dicts of Query arguments like
+                {'mode': 'search', 'priority': 0, 'search_imdb': 'tt...'}
+                or search strings
+        :param workers: (optional) how many queries can be in flight
 
-        return kwargs
+        :returns: a generator of BatchResult(query, torrents, error) in
+                completion order, identical queries are sent once. Results
+                are yielded while queries is still being read, which is
+                read at most a few queries ahead of the results consumed
+
+        :raises: ValueError once the results of the queries before an
+                invalid one are yielded
+        """
+        scheduler = BatchScheduler(self, workers)
+        try:
+            scheduler.feed(Query.from_spec(query) for query in queries)
+            yield from scheduler.results()
+        finally:
+            scheduler.close()
+
+    def batch_search(self, queries, workers=1, **kwargs):
+        """
+        Like batch, every query is a search and kwargs are shared by all
+        of them.
+        """
+        return self.batch(
+            (Query.from_spec(query, mode='search', **kwargs)
+             for query in queries),
+            workers=workers)
+
+    def iter_list(self, categories, workers=1, dedup_size=10000, **kwargs):
+        """
+        List every category with its own request and yield torrents as
+        soon as each request completes.
+
+        :param categories: a list of categories, an item can also be a
+                list of categories listed together
+        :param workers: (optional) how many requests can be in flight
+        :param dedup_size: (optional) how many infohashes are remembered to
+                skip torrents already yielded
+
+        :returns: a generator of Torrents
+
+        :raises: ValueError
+        """
+        queries = [
+            Query('list', categories=_as_list(category), **kwargs)
+            for category in categories
+        ]
+        return self._iter_batch(queries, workers, dedup_size)
+
+    def iter_search(self, queries, categories=None, workers=1,
+                    dedup_size=10000, **kwargs):
+        """
+        Search every query, in every category if given, with its own
+        request and yield torrents as soon as each request completes.
+
+        :param queries: search strings or dicts of search arguments
+        :param categories: (optional) a list of categories, an item can
+                also be a list of categories searched together
+        :param workers: (optional) how many requests can be in flight
+        :param dedup_size: (optional) how many infohashes are remembered to
+                skip torrents already yielded
+
+        :returns: a generator of Torrents
+
+        :raises: ValueError
+        """
+        # pylint: disable=too-many-arguments
+        specs = []
+        for query in queries:
+            if categories is None:
+                specs.append(Query.from_spec(query, mode='search', **kwargs))
+                continue
+            for category in categories:
+                specs.append(Query.from_spec(
+                    query, mode='search', categories=_as_list(category),
+                    **kwargs))
+        return self._iter_batch(specs, workers, dedup_size)
+
+    def _iter_batch(self, queries, workers, dedup_size):
+        seen = BoundedSet(dedup_size)
+        for result in self.batch(queries, workers=workers):
+            if result.error:
+                raise result.error
+            for torrent in result.torrents:
+                if seen.add(torrent.infohash):
+                    yield torrent
+
+
+def _as_list(value):
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
@@ -0,0 +1,183 @@
+import time
+import random
+import threading
+
+
+class CircuitOpenException(Exception):
+    pass
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline(object):
+    '''
+    Point in time a call has to finish by, None timeout never expires.
+    '''
+    def __init__(self, timeout=None):
+        self.expires_at = None if timeout is None \
+            else time.monotonic() + timeout
+
+    @classmethod
+    def earliest(cls, *deadlines):
+        deadline = cls()
+        expires = [
+            d.expires_at for d in deadlines
+            if d is not None and d.expires_at is not None
+        ]
+        deadline.expires_at = min(expires) if expires else None
+        return deadline
+
+    def remaining(self):
+        '''
+        :returns: seconds left, None without deadline
+        '''
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def cap(self, timeout):
+        '''
+        :returns: timeout limited to the remaining seconds
+        '''
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if timeout is None:
+            return remaining
+        return min(timeout, remaining)
+
+    def check(self, stage):
+        '''
+        :raises: DeadlineExceeded if no time is left
+        '''
+        if self.remaining() == 0.0:
+            raise DeadlineExceeded(f'deadline exceeded before {stage}')
+
+
+class RetryPolicy(object):  # pylint: disable=too-many-instance-attributes
+    '''
+    Decide whether and when a failed request is retried.
+
+    :param retries: (optional) attempts for connection and server errors,
+            None uses the client's retries option
+    :param backoff: (optional) first backoff in seconds, doubled on every
+            retry up to max_backoff
+    :param max_backoff: (optional) longest backoff in seconds
+    :param jitter: (optional) fraction of the backoff randomized away so
+            clients don't retry in lockstep
+    :param deadline: (optional) seconds a call may spend retrying
+    :param budgets: (optional) retries allowed per error class, classes are
+            'connection', 'server', 'throttle' and 'token'
+    :param breaker_threshold: (optional) consecutive connection errors,
+            across calls, which open the circuit
+    :param breaker_cooldown: (optional) seconds calls fail fast with
+            CircuitOpenException once the circuit is open
+
+    Throttled calls aren't slept on the first time, the rate limiter already
+    spaces the next attempt, repeated throttles back off like errors.
+    '''
+    DEFAULT_BUDGETS = {
+        'throttle': 10,
+        'token': 3,
+    }
+
+    def __init__(self, retries=None, backoff=1.0, max_backoff=30.0,
+                 jitter=0.5, deadline=None, budgets=None,
+                 breaker_threshold=5, breaker_cooldown=30.0):
+        # pylint: disable=too-many-arguments
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.deadline = deadline
+        self.budgets = dict(self.DEFAULT_BUDGETS)
+        self.budgets.update(budgets or {})
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+
+    def start(self, retries, deadline=None):
+        '''
+        :param retries: attempts used when the policy doesn't set retries
+        :param deadline: (optional) Deadline of the call, the earliest of
+                it and the policy deadline applies
+
+        :returns: a RetryState tracking one call
+
+        :raises: CircuitOpenException
+        '''
+        with self._lock:  # pylint: disable=not-context-manager
+            if self._opened_at is not None:
+                if time.monotonic() - self._opened_at < self.breaker_cooldown:
+                    raise CircuitOpenException(
+                        f'{self._failures} consecutive connection errors')
+                # half open, let calls probe the server
+                self._opened_at = None
+                self._failures = self.breaker_threshold - 1
+        return RetryState(
+            self, self.retries if self.retries is not None else retries,
+            Deadline.earliest(deadline, Deadline(self.deadline)))
+
+    def get_backoff(self, attempt):
+        delay = min(self.max_backoff, self.backoff * 2**(attempt - 1))
+        return delay * (1 - self.jitter * random.random())
+
+    def record(self, kind):
+        '''
+        Feed the circuit breaker, kind is None on success.
+        '''
+        with self._lock:  # pylint: disable=not-context-manager
+            if kind is None:
+                self._failures = 0
+            elif kind == 'connection':
+                self._failures += 1
+                if self._failures >= self.breaker_threshold:
+                    self._opened_at = time.monotonic()
+
+
+class RetryState(object):
+    '''
+    Retries of one call.
+    '''
+    def __init__(self, policy, retries, deadline):
+        self._policy = policy
+        self._retries = retries
+        self._errors = 0
+        self._counts = {}
+        self.deadline = deadline
+
+    def success(self):
+        self._policy.record(None)
+
+    def retry(self, kind, exp):
+        '''
+        :returns: seconds to sleep before the next attempt
+
+        :raises: exp once retries, the budget of kind or the deadline
+                are exhausted
+        '''
+        policy = self._policy
+        policy.record(kind)
+        count = self._counts[kind] = self._counts.get(kind, 0) + 1
+        budget = policy.budgets.get(kind)
+        if budget is not None and count > budget:
+            raise exp
+
+        if kind in ('connection', 'server'):
+            self._errors += 1
+            if self._errors >= self._retries:
+                raise exp
+            delay = policy.get_backoff(self._errors)
+        elif kind == 'throttle':
+            delay = policy.get_backoff(count - 1) if count > 1 else 0
+        else:
+            delay = 0
+
+        remaining = self.deadline.remaining()
+        if remaining is not None and delay >= remaining:
+            raise exp
+        return delay
@@ -0,0 +1,131 @@
+import json
+import logging
+import urllib.parse
+import http.server
+
+from .cache import MemoryCache
+from .rarbgapi import RarbgAPI
+
+
+_log = logging.getLogger(__name__)
+
+
+def query_to_kwargs(query):
+    '''
+    Turn torrentapi query parameters into list/search keyword arguments.
+
+    :returns: (mode, kwargs)
+    '''
+    query = dict(query)
+    mode = query.pop('mode', None)
+    for key in ('token', 'app_id'):
+        query.pop(key, None)
+
+    kwargs = {}
+    fmt = query.pop('format', None)
+    if fmt:
+        kwargs['extended_response'] = fmt == 'json_extended'
+    category = query.pop('category', None)
+    if category:
+        kwargs['categories'] = category.split(';')
+    kwargs.update(query)
+    return mode, kwargs
+
+
+class RarbgAPIServer(http.server.ThreadingHTTPServer):
+    '''
+    HTTP daemon answering list and search from one shared client, so
+    every application on the host shares its token, rate limiter, cache
+    and in-flight coalescing.
+
+        GET /list?category=41;49&limit=100&format=json_extended
+        GET /search?search_imdb=tt0944947
+        GET /stats
+
+    The path can also be torrentapi's, /pubapi_v2.php?mode=list, so a
+    RarbgAPI created with endpoint=server.url + 'pubapi_v2.php' works
+    against the daemon. The daemon already limits the rate, such a client
+    should use an UnlimitedBucket as rate_limiter. Responses have
+    torrentapi's format, {"torrent_results": [...]}.
+    '''
+    daemon_threads = True
+
+    def __init__(self, client, address=('127.0.0.1', 8080)):
+        self.client = client
+        super().__init__(address, _Handler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def handle_query(self, path, query):
+        '''
+        :returns: (status, body)
+        '''
+        if 'get_token' in query:
+            # the daemon holds the real token
+            return 200, {'token': 'rarbgapi-server'}
+
+        name = path.strip('/').rsplit('/', 1)[-1]
+        if name == 'stats':
+            return 200, self.stats()
+
+        mode, kwargs = query_to_kwargs(query)
+        mode = mode or name
+        if mode not in ('list', 'search'):
+            return 404, {'error': f'unsupported mode {mode}'}
+        try:
+            torrents = getattr(self.client, mode)(**kwargs)
+        except ValueError as exp:
+            return 400, {'error': str(exp)}
+        except Exception as exp:  # pylint: disable=broad-except
+            _log.exception('Upstream %s failed', mode)
+            return 502, {'error': f'{type(exp).__name__}: {exp}'}
+        return 200, {
+            'torrent_results': [torrent.to_dict() for torrent in torrents],
+        }
+
+    def stats(self):
+        cache = self.client.cache
+        return {
+            'cache': cache.stats() if cache is not None else None,
+            'in_flight': self.client.in_flight,
+            'rate': getattr(self.client.rate_limiter, 'rate', None),
+        }
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        status, body = self.server.handle_query(url.path, query)
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('content-type', 'application/json')
+        self.send_header('content-length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        _log.debug(*args)
+
+
+def serve(client=None, host='127.0.0.1', port=8080):
+    '''
+    Run the daemon until interrupted, the default client caches
+    responses in memory.
+    '''
+    if client is None:
+        client = RarbgAPI(cache=MemoryCache())
+    with RarbgAPIServer(client, (host, port)) as server:
+        _log.info('Serving on %s', server.url)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            client.close()
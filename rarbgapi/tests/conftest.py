@@ -0,0 +1,43 @@
+from rarbgapi import RarbgAPI
+from rarbgapi.leakybucket import LeakyBucket
+from rarbgapi.tokenstore import MemoryTokenStore
+
+
+def make_torrent(index, title=None, category='TV HD Episodes',
+                 extended=True, **fields):
+    '''
+    A torrent as torrentapi returns it, in json_extended format unless
+    extended is False. Its infohash is index in hex, a higher index has
+    more seeders and is published later, fields override the generated
+    values.
+    '''
+    mapping = {
+        'title' if extended else 'filename':
+            title or f'Some.Show.S01E{index:02d}.1080p',
+        'category': category,
+        'download': f'magnet:?xt=urn:btih:{index:040x}',
+    }
+    if extended:
+        mapping.update({
+            'seeders': index,
+            'leechers': 0,
+            'size': 100,
+            'pubdate': f'2020-01-01 00:{index // 60 % 60:02d}:'
+                       f'{index % 60:02d} +0000',
+            'episode_info': {'imdb': f'tt{index:07d}', 'tvrage': None,
+                             'tvdb': None, 'themoviedb': None},
+        })
+    mapping.update(fields)
+    return mapping
+
+
+def make_client(server=None, cls=RarbgAPI, bucket=LeakyBucket, **options):
+    '''
+    A client which isn't rate limited and doesn't share its token, sending
+    its requests to server when given.
+    '''
+    options.setdefault('retries', 1)
+    if server is not None:
+        options['endpoint'] = server.url_for('/')
+    return cls(rate_limiter=bucket(1000), token_store=MemoryTokenStore(),
+               **options)
@@ -0,0 +1,226 @@
+import os
+import json
+import asyncio
+
+import pytest
+import pytest_httpserver
+import werkzeug
+
+from rarbgapi import AsyncRarbgAPI
+from rarbgapi.leakybucket import LeakyBucket, AsyncLeakyBucket, \
+    AsyncUnlimitedBucket
+from rarbgapi.tokenstore import MemoryTokenStore, FileTokenStore
+
+
+DUMMY_APP_ID = 'test_app_id'
+DUMMY_TOKEN = 'test_token'
+
+
+@pytest.fixture
+def client(httpserver):
+    client = AsyncRarbgAPI(**{'retries': 1})
+    client._bucket = AsyncLeakyBucket(1000)
+    client._endpoint = httpserver.url_for("/")
+    client._token = DUMMY_TOKEN
+    client.APP_ID = DUMMY_APP_ID
+    return client
+
+
+@pytest.fixture
+def expected_headers(client):
+    return {
+        'user-agent': client._get_user_agent(),
+    }
+
+
+@pytest.fixture
+def empty_response():
+    return {
+        'torrent_results': [],
+    }
+
+
+def run(client, mode, **kwargs):
+    async def _run():
+        async with client:
+            return await getattr(client, mode)(**kwargs)
+    return asyncio.run(_run())
+
+
+@pytest.mark.parametrize('mode', ['list', 'search'])
+def test_arg_categories(
+        httpserver, client, expected_headers, empty_response, mode):
+    httpserver.expect_request(
+        "/",
+        headers=expected_headers,
+        query_string={
+            'app_id': DUMMY_APP_ID, 'token': DUMMY_TOKEN,
+            'mode': mode, 'category': '1;2;3', 'limit': '25',
+        },
+        handler_type=pytest_httpserver.httpserver.HandlerType.PERMANENT,
+    ).respond_with_json(empty_response)
+
+    assert run(client, mode, categories=[1, 2, 3], limit=25) == []
+
+
+@pytest.mark.parametrize('mode', ['list', 'search'])
+def test_unsupported_arg(client, mode):
+    with pytest.raises(ValueError):
+        run(client, mode, foo='bar')
+
+
+@pytest.mark.parametrize('mode', ['list', 'search'])
+@pytest.mark.parametrize('expired_code', [2, 4])
+def test_refresh_token(
+        httpserver, client, empty_response, mode, expired_code):
+    token = 'mytoken123'
+    httpserver.expect_ordered_request(
+        "/",
+        query_string={
+            'token': DUMMY_TOKEN, 'app_id': DUMMY_APP_ID, 'mode': mode,
+        },
+    ).respond_with_json({'error_code': expired_code})
+    httpserver.expect_ordered_request(
+        "/",
+        query_string={'get_token': 'get_token', 'app_id': DUMMY_APP_ID},
+    ).respond_with_json({'token': token})
+    httpserver.expect_ordered_request(
+        "/",
+        query_string={
+            'token': token, 'app_id': DUMMY_APP_ID, 'mode': mode,
+        },
+    ).respond_with_json(empty_response)
+
+    assert run(client, mode) == []
+    assert client._token == token
+
+
+def test_refresh_shared_between_clients(httpserver, tmp_path):
+    '''
+    Clients sharing a token store refresh a rejected token once.
+    '''
+    tokens = []
+
+    def handle(request):
+        if 'get_token' in request.args:
+            tokens.append(1)
+            body = {'token': 'fresh'}
+        elif request.args['token'] != 'fresh':
+            body = {'error_code': 4}
+        else:
+            body = {'torrent_results': []}
+        return werkzeug.Response(json.dumps(body))
+    httpserver.expect_request('/').respond_with_handler(handle)
+
+    store = FileTokenStore(path=str(tmp_path / 'tokens'))
+    clients = [
+        AsyncRarbgAPI(token_store=store, rate_limiter=AsyncLeakyBucket(1000),
+                      coalesce=False)
+        for _ in range(4)
+    ]
+    for client in clients:
+        client._endpoint = httpserver.url_for('/')
+    clients[0]._token = 'stale'
+
+    async def run_all():
+        results = await asyncio.gather(*[c.list() for c in clients])
+        for client in clients:
+            await client.close()
+        return results
+    assert asyncio.run(run_all()) == [[]] * 4
+    assert len(tokens) == 1
+
+
+def test_refresh_more_tasks_than_executor_threads(httpserver):
+    httpserver.expect_request('/').respond_with_handler(
+        lambda request: werkzeug.Response(json.dumps(
+            {'token': 'token'} if 'get_token' in request.args
+            else {'torrent_results': []})))
+    # a hostname is resolved in the default executor, which the waiting
+    # refreshes must not use up
+    endpoint = httpserver.url_for('/').replace('127.0.0.1', 'localhost')
+    client = AsyncRarbgAPI(endpoint=endpoint, token_store=MemoryTokenStore(),
+                           rate_limiter=AsyncUnlimitedBucket())
+    count = min(32, (os.cpu_count() or 1) + 4) + 8
+
+    async def run_all():
+        async with client:
+            return await asyncio.wait_for(asyncio.gather(*[
+                client.search(search_string=str(index))
+                for index in range(count)
+            ]), 10)
+    assert asyncio.run(run_all()) == [[]] * count
+
+
+@pytest.mark.parametrize('mode', ['list', 'search'])
+def test_throttle_error(httpserver, client, empty_response, mode):
+    httpserver.expect_ordered_request(
+        "/",
+    ).respond_with_json({'error_code': 5})
+    httpserver.expect_ordered_request(
+        "/",
+    ).respond_with_json(empty_response)
+
+    assert run(client, mode) == []
+
+
+@pytest.mark.parametrize('mode', ['list', 'search'])
+def test_torrents(httpserver, client, mode):
+    torrent_json = {
+        'filename': 'torrent',
+        'category': 'movies/x264',
+        'download': 'download_link',
+    }
+    httpserver.expect_request(
+        "/",
+    ).respond_with_json({
+        'torrent_results': [
+            torrent_json,
+            torrent_json,
+        ]
+    })
+
+    torrents = run(client, mode)
+    assert len(torrents) == 2
+    for torrent in torrents:
+        assert torrent.download == 'download_link'
+        assert torrent.filename == 'torrent'
+
+
+def test_concurrent_queries_share_loop(httpserver, client, empty_response):
+    httpserver.expect_request(
+        "/",
+        handler_type=pytest_httpserver.httpserver.HandlerType.PERMANENT,
+    ).respond_with_json(empty_response)
+
+    async def _run():
+        async with client:
+            return await asyncio.gather(
+                *[client.search(search_string=str(i)) for i in range(5)])
+
+    assert asyncio.run(_run()) == [[]] * 5
+
+
+def test_async_bucket_waits():
+    bucket = AsyncLeakyBucket(10)
+    loop_time = asyncio.run(_timed_acquire(bucket, 1))
+    assert loop_time < 0.5
+
+
+def test_async_bucket_timeout():
+    bucket = AsyncLeakyBucket(1)
+    assert asyncio.run(bucket.acquire(3000, timeout=0.1)) is False
+
+
+async def _timed_acquire(bucket, token):
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    assert await bucket.acquire(token) is True
+    return loop.time() - start
+
+
+def test_blocking_rate_limiter_rejected():
+    with pytest.raises(TypeError):
+        AsyncRarbgAPI(rate_limiter=LeakyBucket(100))
+    bucket = AsyncLeakyBucket(100)
+    assert AsyncRarbgAPI(rate_limiter=bucket)._bucket is bucket
@@ -0,0 +1,227 @@
+import threading
+
+import pytest
+
+from rarbgapi import RarbgAPI, Torrent
+from rarbgapi.batch import Query, BatchScheduler, \
+    PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+
+
+class RecordingClient(RarbgAPI):
+    def __init__(self, gate=None):
+        super().__init__()
+        self.calls = []
+        self.gate = gate
+        self.started = threading.Event()
+
+    def search(self, **kwargs):
+        self.started.set()
+        if self.gate:
+            self.gate.wait()
+        self.calls.append(kwargs)
+        if kwargs.get('search_string') == 'boom':
+            raise IOError('boom')
+        return [kwargs.get('search_string') or kwargs.get('search_imdb')]
+
+    def list(self, **kwargs):
+        self.calls.append(kwargs)
+        return []
+
+
+def test_batch_results():
+    client = RecordingClient()
+    results = list(client.batch_search(['a', 'b', {'search_imdb': 'tt1'}]))
+    assert sorted(r.torrents[0] for r in results) == ['a', 'b', 'tt1']
+    assert all(r.error is None for r in results)
+
+
+def test_batch_deduplicated():
+    gate = threading.Event()
+    client = RecordingClient(gate)
+    scheduler = BatchScheduler(client)
+    scheduler.submit(Query(search_string='first'))
+    client.started.wait()
+    for spec in [
+            {'search_string': 'a', 'categories': [1, 2]},
+            {'search_string': 'a', 'categories': [2, 1]},
+            {'search_string': 'a', 'category': 1},
+    ]:
+        scheduler.submit(Query(**spec))
+    gate.set()
+    results = list(scheduler.results())
+    scheduler.close()
+    assert len(results) == 4
+    assert len(client.calls) == 3
+
+
+def test_batch_priority():
+    gate = threading.Event()
+    client = RecordingClient(gate)
+    scheduler = BatchScheduler(client)
+    scheduler.submit(Query(search_string='first'))
+    client.started.wait()
+    scheduler.submit(Query(search_string='background',
+                           priority=PRIORITY_BACKGROUND))
+    scheduler.submit(Query(search_string='normal'))
+    scheduler.submit(Query(search_string='interactive',
+                           priority=PRIORITY_INTERACTIVE))
+    gate.set()
+    results = [r.torrents[0] for r in scheduler.results()]
+    scheduler.close()
+    assert results == ['first', 'interactive', 'normal', 'background']
+
+
+def test_batch_error():
+    client = RecordingClient()
+    results = {
+        r.query.kwargs['search_string']: r
+        for r in client.batch_search(['ok', 'boom'])
+    }
+    assert results['ok'].torrents == ['ok']
+    assert isinstance(results['boom'].error, IOError)
+    assert results['boom'].torrents is None
+
+
+def test_batch_mixed_modes():
+    client = RecordingClient()
+    results = list(client.batch([
+        {'mode': 'list', 'limit': 25},
+        'search string',
+    ], workers=2))
+    assert len(results) == 2
+
+
+def test_batch_invalid_query():
+    client = RecordingClient()
+    with pytest.raises(ValueError):
+        list(client.batch_search([{'foo': 'bar'}]))
+    with pytest.raises(ValueError):
+        Query(mode='unknown')
+
+    # results of the queries before the invalid one are still delivered
+    results = client.batch_search(['a', {'foo': 'bar'}, 'b'])
+    assert next(results).torrents == ['a']
+    with pytest.raises(ValueError):
+        next(results)
+
+
+def test_batch_feed_on_error():
+    client = RecordingClient()
+    rejected = []
+    scheduler = BatchScheduler(client)
+    scheduler.feed([Query(search_string='a'), Query(foo='bar'),
+                    Query(search_string='b')],
+                   on_error=lambda query, error: rejected.append(query))
+    results = list(scheduler.results())
+    scheduler.close()
+    assert sorted(r.torrents[0] for r in results) == ['a', 'b']
+    assert [q.kwargs for q in rejected] == [{'foo': 'bar'}]
+    with pytest.raises(ValueError):
+        Query(priority='high')
+
+
+def test_batch_upgrade():
+    client = RecordingClient()
+
+    def wanted(torrent):
+        return True
+    results = list(client.batch_search([
+        {'search_string': 'a', 'upgrade': wanted},
+        {'search_string': 'a', 'upgrade': wanted},
+        {'search_string': 'a'},
+    ]))
+    assert [r.error for r in results] == [None] * 3
+    # the same predicate shares a call, without upgrade it is another query
+    assert sorted(c.get('upgrade') is wanted for c in client.calls) == [
+        False, True]
+
+
+def test_batch_streams_input():
+    client = RecordingClient()
+    release = threading.Event()
+    read = []
+
+    def queries():
+        read.append('a')
+        yield 'a'
+        release.wait(5)
+        read.append('b')
+        yield 'b'
+    results = client.batch_search(queries())
+    # the first result arrives while the input is still being read
+    assert next(results).torrents == ['a']
+    assert read == ['a']
+    release.set()
+    assert [r.torrents for r in results] == [['b']]
+
+
+def test_batch_feed_window():
+    client = RecordingClient()
+    read = []
+
+    def queries():
+        while True:
+            read.append(len(read))
+            yield Query(search_string=str(len(read)))
+    scheduler = BatchScheduler(client)
+    scheduler.feed(queries(), window=4)
+    results = scheduler.results()
+    next(results)
+    next(results)
+    scheduler.close()
+    assert len(read) <= 4 + 2 + 1
+
+
+class TorrentClient(RarbgAPI):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def _torrents(self, kwargs):
+        self.calls.append(kwargs)
+        category = kwargs['categories'][0] if 'categories' in kwargs else 0
+        return [
+            Torrent({
+                'filename': f'{category}-{index}',
+                'category': str(category),
+                'download': f'magnet:?xt=urn:btih:{index:040x}',
+            })
+            for index in (category, 100)
+        ]
+
+    def list(self, **kwargs):
+        return self._torrents(kwargs)
+
+    def search(self, **kwargs):
+        return self._torrents(kwargs)
+
+
+def test_iter_list():
+    client = TorrentClient()
+    torrents = list(client.iter_list([1, [2, 3]], limit=25))
+    assert sorted(t.filename for t in torrents) == ['1-1', '1-100', '2-2']
+    assert client.calls == [
+        {'categories': [1], 'limit': 25},
+        {'categories': [2, 3], 'limit': 25},
+    ]
+
+
+def test_iter_search():
+    client = TorrentClient()
+    torrents = list(client.iter_search(
+        ['a', {'search_imdb': 'tt1'}], categories=[1, 2]))
+    assert len(client.calls) == 4
+    assert sorted(t.filename for t in torrents) == ['1-1', '1-100', '2-2']
+
+
+def test_iter_search_lazy():
+    client = TorrentClient()
+    torrents = client.iter_search(['a', 'b'], sort='seeders')
+    assert next(torrents).filename == '0-0'
+    torrents.close()
+
+
+def test_iter_search_error():
+    client = RecordingClient()
+    with pytest.raises(IOError):
+        list(client.iter_search(['boom']))
@@ -0,0 +1,101 @@
+import json
+import time
+import pickle
+import sqlite3
+
+import pytest
+from rarbgapi.rarbgapi import Torrent
+from rarbgapi.cache import cache_key, MemoryCache, SQLiteCache
+
+
+TORRENT_JSON = {
+    'filename': 'torrent',
+    'category': 'movies/x264',
+    'download': 'download_link',
+}
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cache_factory(request, tmp_path):
+    def factory(**kwargs):
+        if request.param == 'memory':
+            return MemoryCache(**kwargs)
+        return SQLiteCache(str(tmp_path / 'cache.db'), **kwargs)
+    return factory
+
+
+def test_cache_key_normalized():
+    assert cache_key({'mode': 'list', 'category': '3;1;2'}) == \
+        cache_key({'category': '1;2;3', 'mode': 'list', 'format': 'json'})
+    assert cache_key({'mode': 'list', 'limit': 25}) == \
+        cache_key({'mode': 'list', 'limit': '25', 'token': 'xxx'})
+    assert cache_key({'mode': 'list'}) != cache_key({'mode': 'search'})
+    assert cache_key({'mode': 'list'}) != \
+        cache_key({'mode': 'list', 'format': 'json_extended'})
+
+
+def test_hit_miss(cache_factory):
+    cache = cache_factory()
+    params = {'mode': 'search', 'search_imdb': 'tt123'}
+    assert cache.get(params) is None
+    cache.set(params, [Torrent(dict(TORRENT_JSON))])
+    torrents = cache.get(params)
+    assert len(torrents) == 1
+    assert torrents[0].download == 'download_link'
+    assert cache.stats() == {
+        'hits': 1, 'misses': 1, 'hit_ratio': 0.5, 'size': 1,
+    }
+
+
+def test_empty_result_cached(cache_factory):
+    cache = cache_factory()
+    params = {'mode': 'search', 'search_imdb': 'tt123'}
+    cache.set(params, [])
+    assert cache.get(params) == []
+
+
+def test_ttl_per_mode(cache_factory):
+    cache = cache_factory(ttl={'list': 0.1, 'search': 10})
+    list_params = {'mode': 'list'}
+    search_params = {'mode': 'search'}
+    cache.set(list_params, [])
+    cache.set(search_params, [])
+    time.sleep(0.2)
+    assert cache.get(list_params) is None
+    assert cache.get(search_params) == []
+
+
+def test_lru_eviction(cache_factory):
+    cache = cache_factory(maxsize=2)
+    cache.set({'mode': 'list', 'limit': 25}, [])
+    cache.set({'mode': 'list', 'limit': 50}, [])
+    assert cache.get({'mode': 'list', 'limit': 25}) == []
+    cache.set({'mode': 'list', 'limit': 100}, [])
+    assert len(cache) == 2
+    assert cache.get({'mode': 'list', 'limit': 50}) is None
+    assert cache.get({'mode': 'list', 'limit': 25}) == []
+
+
+def test_clear(cache_factory):
+    cache = cache_factory()
+    cache.set({'mode': 'list'}, [])
+    cache.clear()
+    assert cache.get({'mode': 'list'}) is None
+
+
+def test_sqlite_stores_json(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = SQLiteCache(path)
+    params = {'mode': 'search', 'search_imdb': 'tt123'}
+    cache.set(params, [Torrent(dict(TORRENT_JSON))])
+    conn = sqlite3.connect(path)
+    stored, = conn.execute('SELECT torrents FROM responses').fetchone()
+    assert json.loads(stored) == [TORRENT_JSON]
+
+    # a row json can't read is a miss, not an error
+    conn.execute('UPDATE responses SET torrents = ?',
+                 (pickle.dumps([TORRENT_JSON]), ))
+    conn.commit()
+    conn.close()
+    assert cache.get(params) is None
+    assert len(cache) == 0
@@ -0,0 +1,193 @@
+import json
+import time
+import asyncio
+import threading
+import concurrent.futures
+
+import pytest
+import werkzeug
+from rarbgapi import AsyncRarbgAPI
+from rarbgapi.leakybucket import AsyncLeakyBucket
+from rarbgapi.coalesce import Coalescer, AsyncCoalescer
+from rarbgapi.retry import DeadlineExceeded
+
+from conftest import make_client
+
+
+THREADS = 16
+
+
+def run_threads(count, func):
+    barrier = threading.Barrier(count)
+
+    def target(index):
+        barrier.wait()
+        return func(index)
+
+    with concurrent.futures.ThreadPoolExecutor(count) as executor:
+        return list(executor.map(target, range(count)))
+
+
+def test_coalescer_single_call():
+    calls = []
+
+    def func():
+        calls.append(1)
+        time.sleep(0.2)
+        return object()
+
+    coalescer = Coalescer()
+    results = run_threads(THREADS, lambda _: coalescer.run('key', func))
+    assert len(calls) == 1
+    assert len({id(result) for result, _ in results}) == 1
+    assert sorted(shared for _, shared in results) == \
+        [False] + [True] * (THREADS - 1)
+    assert len(coalescer) == 0
+
+
+def test_coalescer_shares_error():
+    def func():
+        time.sleep(0.2)
+        raise KeyError('boom')
+
+    coalescer = Coalescer()
+
+    def call(_):
+        with pytest.raises(KeyError):
+            coalescer.run('key', func)
+    run_threads(4, call)
+    assert len(coalescer) == 0
+
+
+def test_coalescer_follower_timeout():
+    coalescer = Coalescer()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.5)
+
+    leader = threading.Thread(target=coalescer.run, args=('key', slow))
+    leader.start()
+    started.wait()
+    with pytest.raises(DeadlineExceeded):
+        coalescer.run('key', slow, timeout=0.1)
+    leader.join()
+
+
+def test_async_coalescer_leader_cancelled():
+    coalescer = AsyncCoalescer()
+    calls = []
+
+    def call(name):
+        async def func():
+            calls.append(name)
+            await asyncio.sleep(0.2)
+            return name
+        return func
+
+    async def run():
+        leader = asyncio.ensure_future(coalescer.run('key', call('leader')))
+        await asyncio.sleep(0.05)
+        followers = [
+            asyncio.ensure_future(coalescer.run('key', call(name), 5))
+            for name in ('first', 'second')
+        ]
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+    # the first follower runs again, the second one shares its result
+    assert asyncio.run(run()) == [('first', False), ('first', True)]
+    assert calls == ['leader', 'first']
+    assert len(coalescer) == 0
+
+
+@pytest.fixture
+def server(httpserver):
+    '''
+    Echo search_string back as the filename, count every request.
+    '''
+    requests = []
+    lock = threading.Lock()
+
+    def handle(request):
+        with lock:
+            requests.append(dict(request.args))
+        time.sleep(0.1)
+        if 'get_token' in request.args:
+            body = {'token': 'token'}
+        else:
+            body = {'torrent_results': [{
+                'filename': request.args['search_string'],
+                'category': 'Movies/x264',
+                'download': f'magnet:?xt=urn:btih:{time.monotonic()}',
+            }]}
+        return werkzeug.Response(
+            json.dumps(body), content_type='application/json')
+
+    httpserver.expect_request('/').respond_with_handler(handle)
+    httpserver.requests = requests
+    return httpserver
+
+
+def test_identical_queries_coalesced(server):
+    client = make_client(server)
+    results = run_threads(
+        THREADS, lambda _: client.search(search_string='same'))
+    assert len(server.requests) == 2  # token and search
+    assert len({result[0].download for result in results}) == 1
+
+
+def test_mixed_queries_under_contention(server):
+    client = make_client(server)
+    results = run_threads(
+        THREADS, lambda i: (i % 4, client.search(search_string=f'q{i % 4}')))
+    for query, torrents in results:
+        assert [t.filename for t in torrents] == [f'q{query}']
+    searches = [r for r in server.requests if 'get_token' not in r]
+    tokens = [r for r in server.requests if 'get_token' in r]
+    assert sorted(r['search_string'] for r in searches) == \
+        ['q0', 'q1', 'q2', 'q3']
+    assert len(tokens) == 1
+
+
+def test_coalesce_disabled(server):
+    client = make_client(server, coalesce=False)
+    run_threads(4, lambda _: client.search(search_string='same'))
+    assert len([r for r in server.requests if 'get_token' not in r]) == 4
+
+
+def test_hooks_changed_while_requests_run(server):
+    client = make_client(server, coalesce=False)
+    stop = threading.Event()
+
+    def churn():
+        def callback(event, **info):
+            pass
+
+        while not stop.is_set():
+            client.add_hook('decode', callback)
+            client.remove_hook('decode', callback)
+
+    thread = threading.Thread(target=churn)
+    thread.start()
+    try:
+        run_threads(4, lambda i: client.search(search_string=f'q{i}'))
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_async_identical_queries_coalesced(server):
+    client = make_client(server, AsyncRarbgAPI, AsyncLeakyBucket)
+
+    async def run():
+        async with client:
+            return await asyncio.gather(*[
+                client.search(search_string='same') for _ in range(THREADS)
+            ])
+    results = asyncio.run(run())
+    assert len(server.requests) == 2
+    assert len({result[0].download for result in results}) == 1
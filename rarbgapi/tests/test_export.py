@@ -0,0 +1,89 @@
+import csv
+import json
+
+import pytest
+from rarbgapi import Torrent
+from rarbgapi.export import COLUMNS, flatten, export
+
+
+EXTENDED_JSON = {
+    'title': 'Show.S01E01.1080p',
+    'category': 'TV HD Episodes',
+    'download': 'magnet:?xt=urn:btih:ABCDEF',
+    'seeders': 12,
+    'leechers': 6,
+    'size': 504519520,
+    'pubdate': '2017-05-21 02:13:49 +0000',
+    'episode_info': {
+        'imdb': 'tt4443856',
+        'tvrage': None,
+        'tvdb': None,
+        'themoviedb': '430293',
+    },
+    'ranked': 1,
+    'info_page': 'https://torrentapi.org/info',
+}
+
+BRIEF_JSON = {
+    'filename': 'Movie.2016.BDRip',
+    'category': 'Movies/x264',
+    'download': 'magnet:?xt=urn:btih:123456',
+}
+
+
+def generate(count):
+    for index in range(count):
+        yield Torrent(dict(BRIEF_JSON, filename=f'torrent{index}'))
+
+
+def test_flatten():
+    row = flatten(Torrent(dict(EXTENDED_JSON)))
+    assert tuple(row) == COLUMNS
+    assert row['filename'] == 'Show.S01E01.1080p'
+    assert row['infohash'] == 'abcdef'
+    assert row['imdb'] == 'tt4443856'
+    assert row['themoviedb'] == '430293'
+    assert row['ranked'] == 1
+
+    row = flatten(Torrent(dict(BRIEF_JSON)))
+    assert row['seeders'] is None
+    assert row['imdb'] is None
+    assert row['ranked'] is None
+
+
+def test_jsonl(tmp_path):
+    path = tmp_path / 'torrents.jsonl'
+    torrents = [Torrent(dict(EXTENDED_JSON)), Torrent(dict(BRIEF_JSON))]
+    assert export(torrents, path) == 2
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert rows == [flatten(torrent) for torrent in torrents]
+
+
+def test_csv_streams_in_batches(tmp_path):
+    path = tmp_path / 'torrents.csv'
+    assert export(generate(25), path, batch_size=10) == 25
+    with open(path, newline='', encoding='utf-8') as fobj:
+        rows = list(csv.DictReader(fobj))
+    assert len(rows) == 25
+    assert rows[24]['filename'] == 'torrent24'
+    assert rows[24]['seeders'] == ''
+
+
+def test_empty(tmp_path):
+    path = tmp_path / 'torrents.csv'
+    assert export([], path) == 0
+    assert path.read_text().strip() == ','.join(COLUMNS)
+
+
+def test_parquet(tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    path = tmp_path / 'torrents.parquet'
+    assert export(generate(5), path, batch_size=2) == 5
+    table = parquet.read_table(path)
+    assert table.num_rows == 5
+    assert table.column_names == list(COLUMNS)
+
+
+def test_unsupported_format(tmp_path):
+    with pytest.raises(ValueError):
+        export([], tmp_path / 'torrents.xml')
@@ -0,0 +1,119 @@
+import json
+import asyncio
+
+import werkzeug
+from rarbgapi import RarbgAPI, AsyncRarbgAPI, Torrent
+from rarbgapi.leakybucket import LeakyBucket, AsyncLeakyBucket
+from rarbgapi.fanout import split, merge
+
+from conftest import make_torrent
+
+
+def category_torrent(category, index, seeders):
+    # more seeders is also newer
+    return make_torrent(
+        int(category) * 100 + index, category=category, seeders=seeders,
+        pubdate=f'2020-01-01 00:00:{seeders:02d} +0000')
+
+
+# category 1 has plenty of torrents, the others a few
+CATALOG = {
+    '1': [category_torrent('1', i, 50 - i) for i in range(30)],
+    '2': [category_torrent('2', i, 45 - i * 10) for i in range(3)],
+    '3': [category_torrent('3', i, 44 - i * 10) for i in range(3)],
+}
+
+
+def handler(requests):
+    def handle(request):
+        categories = request.args['category'].split(';')
+        requests.append(categories)
+        torrents = sorted(
+            (t for c in categories for t in CATALOG[c]),
+            key=lambda t: t['seeders'], reverse=True)
+        return werkzeug.Response(json.dumps({
+            'torrent_results': torrents[:int(request.args['limit'])],
+        }), content_type='application/json')
+    return handle
+
+
+def setup_client(client, httpserver):
+    client._endpoint = httpserver.url_for('/')
+    client._token = 'token'
+    return client
+
+
+def torrents_of(torrents, category):
+    return [t for t in torrents if t.category == category]
+
+
+def test_split():
+    params = {'mode': 'list', 'category': '1;2;3', 'limit': 2}
+    assert split(params, [None]) is None
+    assert split(params, [None, None]) == [
+        {'mode': 'list', 'category': '1', 'limit': 2},
+        {'mode': 'list', 'category': '2;3', 'limit': 2},
+    ]
+    assert split({'mode': 'list', 'category': '1'}, [None] * 25) is None
+    assert split({'mode': 'list'}, [None] * 25) is None
+
+
+def test_merge_keeps_sort_and_dedups():
+    first = [Torrent(category_torrent('1', i, s))
+             for i, s in enumerate([9, 5])]
+    second = [Torrent(category_torrent('2', i, s))
+              for i, s in enumerate([7, 1])]
+    merged = merge([first, second, first[:1]], 'seeders')
+    assert [t.seeders for t in merged] == [9, 7, 5, 1]
+    assert [t.seeders for t in merge([first, second])] == [9, 7, 5, 1]
+
+
+def test_list_fan_out(httpserver):
+    requests = []
+    httpserver.expect_request('/').respond_with_handler(handler(requests))
+    client = setup_client(
+        RarbgAPI(retries=1, rate_limiter=LeakyBucket(1000)), httpserver)
+
+    torrents = client.list(categories=[1, 2, 3], limit=10, sort='seeders')
+    assert len(torrents) == 10
+    assert len(torrents_of(torrents, '2')) == 1
+
+    torrents = client.list(categories=[1, 2, 3], limit=10, sort='seeders',
+                           extended_response=True, fan_out=True)
+    assert requests[1:] == [['1', '2', '3'], ['1'], ['2', '3']]
+    assert len(torrents_of(torrents, '1')) == 10
+    assert len(torrents_of(torrents, '2')) == 3
+    assert len(torrents_of(torrents, '3')) == 3
+    seeders = [t.seeders for t in torrents]
+    assert seeders == sorted(seeders, reverse=True)
+
+
+def test_fan_out_not_saturated(httpserver):
+    requests = []
+    httpserver.expect_request('/').respond_with_handler(handler(requests))
+    client = setup_client(
+        RarbgAPI(retries=1, rate_limiter=LeakyBucket(1000)), httpserver)
+
+    torrents = client.list(categories=[2, 3], limit=25, fan_out=True)
+    assert len(torrents) == 6
+    assert requests == [['2', '3']]
+
+
+def test_async_fan_out(httpserver):
+    requests = []
+    httpserver.expect_request('/').respond_with_handler(handler(requests))
+    client = setup_client(
+        AsyncRarbgAPI(retries=1, rate_limiter=AsyncLeakyBucket(1000)),
+        httpserver)
+
+    async def run():
+        async with client:
+            return await client.list(
+                categories=[1, 2, 3], limit=5, sort='seeders',
+                extended_response=True, fan_out=True)
+    torrents = asyncio.run(run())
+    assert sorted(requests) == [['1'], ['1', '2', '3'], ['2'], ['2', '3'],
+                                ['3']]
+    assert len(torrents) == 11
+    seeders = [t.seeders for t in torrents]
+    assert seeders == sorted(seeders, reverse=True)
@@ -0,0 +1,83 @@
+import json
+
+from rarbgapi import Torrent
+from rarbgapi.feed import Feed
+
+from conftest import make_torrent
+
+
+def torrent(index, **fields):
+    # published at second index unless pubdate is given
+    return Torrent(make_torrent(index, f'torrent{index}', **fields))
+
+
+class FakeClient(object):
+    def __init__(self):
+        self.responses = []
+        self.kwargs = []
+
+    def list(self, **kwargs):
+        self.kwargs.append(kwargs)
+        return self.responses.pop(0)
+
+
+def test_infohash():
+    assert torrent(10, download=(
+        f'magnet:?xt=urn:btih:{10:040X}&dn=torrent10')).infohash == \
+        f'{10:040x}'
+    assert Torrent({
+        'filename': 'x', 'category': 'c', 'download': 'http://x',
+    }).infohash == 'http://x'
+
+
+def test_poll_only_new():
+    client = FakeClient()
+    client.responses = [
+        [torrent(2), torrent(1)],
+        # published at the same second as the cursor
+        [torrent(3, pubdate='2020-01-01 00:00:02 +0000'), torrent(2),
+         torrent(1)],
+    ]
+    feed = Feed(client)
+    assert [t.filename for t in feed.poll()] == ['torrent1', 'torrent2']
+    assert [t.filename for t in feed.poll()] == ['torrent3']
+    assert client.kwargs[0] == {
+        'sort': 'last', 'limit': 100, 'extended_response': True,
+    }
+
+
+def test_poll_skips_older_than_cursor():
+    client = FakeClient()
+    client.responses = [
+        [torrent(2)],
+        [torrent(1)],
+    ]
+    feed = Feed(client, seen_size=0)
+    assert len(feed.poll()) == 1
+    assert feed.poll() == []
+
+
+def test_cursor_persisted(tmp_path):
+    path = str(tmp_path / 'feed.json')
+    client = FakeClient()
+    client.responses = [[torrent(1)], [torrent(1), torrent(2)]]
+    assert len(Feed(client, state_path=path).poll()) == 1
+    with open(path, encoding='utf-8') as fobj:
+        assert json.load(fobj)['pubdate'] == '2020-01-01 00:00:01 +0000'
+    new = Feed(client, state_path=path).poll()
+    assert [t.filename for t in new] == ['torrent2']
+
+
+def test_interval_adapts():
+    client = FakeClient()
+    client.responses = [[torrent(1)], [], []]
+    feed = Feed(client, min_interval=1, max_interval=10, limit=25)
+    feed.poll()
+    first = feed.interval
+    feed.poll()
+    feed.poll()
+    assert feed.interval > first
+
+    client.responses = [[torrent(i) for i in range(100, 125)]]
+    feed.poll()
+    assert feed.interval == 1
@@ -0,0 +1,105 @@
+import pytest
+from rarbgapi import RarbgAPI, Torrent
+from rarbgapi.leakybucket import LeakyBucket
+from rarbgapi.filters import Tags, parse_tags, get_tags, TorrentList, \
+    where, seeders, size, categories, resolution, codec, source, hdr, \
+    group, filename, apply_hints
+
+from conftest import make_torrent
+
+
+TORRENTS = TorrentList(Torrent(mapping) for mapping in [
+    make_torrent(1, 'Movie.2019.1080p.BluRay.x264-SPARKS', 'Movies/x264',
+                 seeders=50, size=8 << 30),
+    make_torrent(2, 'Movie.2019.2160p.WEB-DL.HDR.HEVC-FLUX', 'Movies/x264',
+                 seeders=20, size=20 << 30),
+    make_torrent(3, 'Show.S01E02.720p.HDTV.x264-KILLERS', seeders=5,
+                 size=1 << 30),
+    make_torrent(4, 'Brief.1080p.WEBRip.x265-RARBG', 'Movies/x264',
+                 extended=False),
+])
+
+
+def test_parse_tags():
+    assert parse_tags('Show.S01E02.1080p.WEB.H264-GRP') == Tags(
+        '1080p', 'h264', 'web', False, 'GRP', 1, 2)
+    assert parse_tags('Movie.2019.2160p.UHD.BluRay.HDR.x265-TERMiNAL') == \
+        Tags('2160p', 'h265', 'bluray', True, 'TERMiNAL', None, None)
+    assert parse_tags('something') == Tags(
+        None, None, None, False, None, None, None)
+
+
+def test_tags_parsed_once():
+    torrent = Torrent(make_torrent(1, 'Show.S01E02.1080p.WEB.H264-GRP'))
+    assert get_tags(torrent) is get_tags(torrent)
+
+
+def test_predicates():
+    assert len(TORRENTS.filter(seeders(10))) == 2
+    assert len(TORRENTS.filter(seeders(maximum=10))) == 1
+    assert len(TORRENTS.filter(size(2 << 30, 10 << 30))) == 1
+    assert len(TORRENTS.filter(resolution('1080p'))) == 2
+    assert len(TORRENTS.filter(codec('x265'))) == 2
+    assert len(TORRENTS.filter(source('web-dl'))) == 2
+    assert len(TORRENTS.filter(hdr())) == 1
+    assert len(TORRENTS.filter(group('sparks|flux'))) == 2
+    assert len(TORRENTS.filter(filename(r'\.S\d+E\d+\.'))) == 1
+    assert len(TORRENTS.filter(
+        categories(RarbgAPI.CATEGORY_TV_EPISODES_HD))) == 1
+    assert len(TORRENTS.filter(categories('movies/x264'))) == 3
+    assert len(TORRENTS.filter(where(lambda t: 'Brief' in t.filename))) == 1
+
+
+def test_combine():
+    assert len(TORRENTS.filter(resolution('1080p') & seeders(1))) == 1
+    assert len(TORRENTS.filter(resolution('1080p'), seeders(1))) == 1
+    assert len(TORRENTS.filter(resolution('720p') | hdr())) == 2
+    assert len(TORRENTS.filter(~resolution('1080p'))) == 2
+
+
+def test_sort_by():
+    assert [t.seeders for t in TORRENTS.sort_by('seeders')] == \
+        [50, 20, 5, None]
+    assert [t.seeders for t in TORRENTS.sort_by('seeders', reverse=False)] \
+        == [None, 5, 20, 50]
+    assert TORRENTS.sort_by('filename')[0].filename.startswith('Brief')
+    assert isinstance(TORRENTS.filter(hdr()).sort_by('size'), TorrentList)
+    with pytest.raises(ValueError):
+        TORRENTS.sort_by('ratio')
+
+
+def test_hints():
+    predicate = seeders(10) & categories(RarbgAPI.CATEGORY_MOVIE_H264,
+                                         RarbgAPI.CATEGORY_TV_EPISODES_HD)
+    assert apply_hints(predicate, {}) == {
+        'sort': 'seeders', 'limit': 100,
+        'categories': [RarbgAPI.CATEGORY_MOVIE_H264,
+                       RarbgAPI.CATEGORY_TV_EPISODES_HD],
+    }
+    assert apply_hints(predicate, {'sort': 'last', 'limit': 25,
+                                   'categories': [1]}) == {
+        'sort': 'last', 'limit': 25, 'categories': [1],
+    }
+    assert apply_hints(seeders(10) | hdr(), {}) == {'limit': 100}
+    assert apply_hints(seeders(maximum=10), {}) == {'limit': 100}
+
+
+def test_client_where(httpserver):
+    httpserver.expect_request('/', query_string={
+        'app_id': RarbgAPI.APP_ID, 'token': 'token', 'mode': 'search',
+        'search_string': 'movie', 'sort': 'seeders', 'limit': '100',
+        'format': 'json_extended',
+    }).respond_with_json({
+        'torrent_results': [t.to_dict() for t in TORRENTS],
+    })
+    client = RarbgAPI(retries=1)
+    client._bucket = LeakyBucket(1000)
+    client._endpoint = httpserver.url_for('/')
+    client._token = 'token'
+
+    torrents = client.search(
+        search_string='movie', extended_response=True,
+        where=seeders(10) & resolution('2160p'))
+    assert isinstance(torrents, TorrentList)
+    assert [t.filename for t in torrents] == [
+        'Movie.2019.2160p.WEB-DL.HDR.HEVC-FLUX']
@@ -0,0 +1,89 @@
+import pytest
+from rarbgapi import RarbgAPI, Torrent
+from rarbgapi.leakybucket import LeakyBucket
+from rarbgapi.index import TorrentIndex
+
+from conftest import make_torrent
+
+
+def new_torrent(index, name, **fields):
+    return Torrent(make_torrent(index, name, **fields))
+
+
+@pytest.fixture(params=['memory', 'file'])
+def index(request, tmp_path):
+    path = ':memory:' if request.param == 'memory' \
+        else str(tmp_path / 'index.db')
+    with TorrentIndex(path) as index:
+        yield index
+
+
+def filenames(torrents):
+    return [torrent.filename for torrent in torrents]
+
+
+def test_search_string(index):
+    index.ingest([
+        new_torrent(1, 'The.Walking.Dead.S01E01.720p'),
+        new_torrent(2, 'Fear.The.Walking.Dead.S01E01.1080p'),
+        new_torrent(3, 'Dead.Man.1995.1080p'),
+    ])
+    assert len(index) == 3
+    assert filenames(index.search(search_string='walking dead')) == [
+        'Fear.The.Walking.Dead.S01E01.1080p',
+        'The.Walking.Dead.S01E01.720p',
+    ]
+    assert filenames(index.search(search_string='dead 1080p')) == [
+        'Dead.Man.1995.1080p',
+        'Fear.The.Walking.Dead.S01E01.1080p',
+    ]
+    assert index.search(search_string='missing') == []
+
+
+def test_ids_categories_sort_limit(index):
+    index.ingest([
+        new_torrent(1, 'a'),
+        new_torrent(2, 'b', seeders=50),
+        new_torrent(3, 'c', category='Movies/x264'),
+    ])
+    assert filenames(index.search(search_imdb='tt0000002')) == ['b']
+    assert filenames(index.search(
+        categories=[RarbgAPI.CATEGORY_TV_EPISODES_HD])) == ['b', 'a']
+    assert filenames(index.search(categories=['movies/x264'])) == ['c']
+    assert filenames(index.search(sort='seeders')) == ['b', 'c', 'a']
+    assert filenames(index.search(limit=1)) == ['c']
+
+    with pytest.raises(ValueError):
+        index.search(sort='size')
+    with pytest.raises(ValueError):
+        index.search(min_seeders=1)
+
+
+def test_update_keeps_extended(index):
+    index.ingest([new_torrent(1, 'a')])
+    index.ingest([new_torrent(1, 'a', extended=False)])
+    torrent, = index.search(search_string='a')
+    assert len(index) == 1
+    assert torrent.is_extended
+    assert torrent.seeders == 1
+    assert torrent.episode_info['imdb'] == 'tt0000001'
+
+    index.ingest([new_torrent(1, 'a', seeders=9)])
+    torrent, = index.search(search_string='a')
+    assert torrent.seeders == 9
+
+
+def test_client_ingests(httpserver):
+    httpserver.expect_request('/').respond_with_json({
+        'torrent_results': [new_torrent(1, 'a').to_dict()],
+    })
+    index = TorrentIndex()
+    client = RarbgAPI(retries=1, index=index)
+    client._bucket = LeakyBucket(1000)
+    client._endpoint = httpserver.url_for('/')
+    client._token = 'token'
+
+    client.list(extended_response=True)
+    torrent, = index.search()
+    assert torrent.filename == 'a'
+    assert torrent.download == 'magnet:?xt=urn:btih:' + '0' * 39 + '1'
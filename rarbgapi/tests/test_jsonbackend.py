@@ -0,0 +1,22 @@
+import json
+
+import pytest
+from rarbgapi.jsonbackend import get_loads
+
+
+def test_json_backend():
+    assert get_loads('json') is json.loads
+
+
+def test_auto_backend():
+    assert get_loads('auto')(b'{"a": 1}') == {'a': 1}
+
+
+def test_orjson_backend():
+    orjson = pytest.importorskip('orjson')
+    assert get_loads('orjson') is orjson.loads
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_loads('foo')
@@ -1,7 +1,9 @@
 import time
+import multiprocessing
 
 import pytest
-from rarbgapi.leakybucket import LeakyBucket
+from rarbgapi.leakybucket import LeakyBucket, FileLeakyBucket, \
+    AdaptiveLeakyBucket, UnlimitedBucket
 
 
 def test_acquire():
@@ -23,3 +25,136 @@ def test_acquire_immediate():
 def test_acquire_timeout():
     bucket = LeakyBucket(1)
     assert bucket.acquire(3000, timeout=1) is False
+
+
+def test_acquire_subsecond():
+    bucket = LeakyBucket(20)
+    assert bucket.acquire(1) is True
+    start = time.monotonic()
+    assert bucket.acquire(1) is True
+    end = time.monotonic()
+    assert 0.03 <= end-start < 0.2
+
+
+def test_try_acquire():
+    bucket = LeakyBucket(0.5)
+    wait = bucket.try_acquire(1)
+    assert 1.9 < wait <= 2.0
+    assert bucket.try_acquire(2) == float('inf')
+
+
+def test_capacity_burst():
+    bucket = LeakyBucket(1000, capacity=3)
+    time.sleep(0.01)
+    assert bucket.try_acquire(1) == 0
+    assert bucket.try_acquire(1) == 0
+    assert bucket.try_acquire(1) == 0
+    assert bucket.try_acquire(1) > 0
+
+
+def test_acquire_timeout_fail_fast():
+    bucket = LeakyBucket(0.5)
+    start = time.monotonic()
+    assert bucket.acquire(1, timeout=0.5) is False
+    assert time.monotonic() - start < 0.1
+
+
+def test_acquire_over_capacity():
+    bucket = LeakyBucket(1)
+    with pytest.raises(ValueError):
+        bucket.acquire(2)
+
+
+def test_invalid_rate():
+    with pytest.raises(ValueError):
+        LeakyBucket(0)
+
+
+def test_unlimited():
+    bucket = UnlimitedBucket()
+    start = time.monotonic()
+    assert all(bucket.acquire(1, timeout=0) for _ in range(1000))
+    assert bucket.try_acquire(100) == 0
+    assert time.monotonic() - start < 0.5
+
+
+def _acquire_many(path, count):
+    bucket = FileLeakyBucket(20, capacity=1, path=path)
+    for _ in range(count):
+        assert bucket.acquire(1) is True
+
+
+def test_file_bucket_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'bucket')
+    workers = [
+        multiprocessing.Process(target=_acquire_many, args=(path, 5))
+        for _ in range(3)
+    ]
+    start = time.monotonic()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    end = time.monotonic()
+    assert all(worker.exitcode == 0 for worker in workers)
+    # 15 tokens at 20/s, a private bucket per process would take ~0.25s
+    assert end-start >= 0.7
+
+
+def test_file_bucket_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'bucket')
+    first = FileLeakyBucket(10, capacity=1, path=path)
+    second = FileLeakyBucket(10, capacity=1, path=path)
+    assert first.try_acquire(1) > 0
+    time.sleep(0.15)
+    assert first.try_acquire(1) == 0
+    assert second.try_acquire(1) > 0
+
+
+def test_file_bucket_corrupted_state(tmp_path):
+    path = tmp_path / 'bucket'
+    path.write_text('garbage')
+    bucket = FileLeakyBucket(1000, path=str(path))
+    assert bucket.acquire(1, timeout=1) is True
+
+
+def test_adaptive_increase_only_when_limited():
+    bucket = AdaptiveLeakyBucket(10, increase=1, max_rate=12)
+    bucket.on_success()
+    assert bucket.rate == 10
+
+    for _ in range(3):
+        assert bucket.try_acquire(1) > 0
+        bucket.on_success()
+    assert bucket.rate == 12
+
+
+def test_adaptive_throttle_decreases_once():
+    bucket = AdaptiveLeakyBucket(1, decrease=0.5, min_rate=0.3)
+    bucket.on_throttle()
+    bucket.on_throttle()
+    assert bucket.rate == 0.5
+    bucket._decreased_at -= 10
+    bucket.on_throttle()
+    assert bucket.rate == 0.3
+
+
+def test_adaptive_throttle_drains_burst():
+    bucket = AdaptiveLeakyBucket(100, capacity=5)
+    time.sleep(0.1)
+    bucket.on_throttle()
+    assert bucket.try_acquire(1) > 0
+
+
+def test_adaptive_persisted(tmp_path):
+    path = str(tmp_path / 'rate.json')
+    bucket = AdaptiveLeakyBucket(2, state_path=path)
+    bucket.on_throttle()
+    assert AdaptiveLeakyBucket(5, state_path=path).rate == 1
+
+    path = tmp_path / 'bad.json'
+    path.write_text('garbage')
+    assert AdaptiveLeakyBucket(5, state_path=str(path)).rate == 5
+
+    with pytest.raises(ValueError):
+        AdaptiveLeakyBucket(decrease=1)
@@ -0,0 +1,143 @@
+import io
+import os
+import sys
+import json
+import queue
+import threading
+import subprocess
+
+import pytest
+import werkzeug
+from rarbgapi import RarbgAPI
+from rarbgapi.leakybucket import LeakyBucket
+from rarbgapi.__main__ import main
+
+
+@pytest.fixture
+def upstream(httpserver, monkeypatch):
+    requests = []
+
+    def handle(request):
+        requests.append(dict(request.args))
+        if 'get_token' in request.args:
+            body = {'token': 'token'}
+        elif request.args.get('search_string') == 'missing':
+            body = {'error': 'No results found', 'error_code': 20}
+        elif request.args.get('search_string') == 'broken':
+            body = {'error': 'Invalid token', 'error_code': 1}
+        else:
+            body = {'torrent_results': [{
+                'filename': request.args.get('search_string', 'listed'),
+                'category': request.args.get('category', 'Movies/x264'),
+                'download': 'magnet:?xt=urn:btih:abc',
+            }]}
+        return werkzeug.Response(
+            json.dumps(body), content_type='application/json')
+
+    httpserver.expect_request('/').respond_with_handler(handle)
+    httpserver.requests = requests
+    monkeypatch.setattr(RarbgAPI, 'ENDPOINT', httpserver.url_for('/'))
+    monkeypatch.setattr(RarbgAPI, 'RATE_LIMITER',
+                        staticmethod(lambda rate: LeakyBucket(1000)))
+    return httpserver
+
+
+def read_lines(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_batch_file(upstream, tmp_path, capsys):
+    path = tmp_path / 'queries'
+    path.write_text('dead\n\n{"mode": "list", "categories": [41]}\n'
+                    'dead\nmissing\n')
+    assert main(['--batch', str(path), '--limit', '50', '--workers', '2']) \
+        == 0
+
+    results = sorted(read_lines(capsys), key=lambda r: r['query']['mode'])
+    assert [r['query'] for r in results] == [
+        {'mode': 'list', 'categories': [41], 'limit': 50},
+        {'mode': 'search', 'search_string': 'dead', 'limit': 50},
+        {'mode': 'search', 'search_string': 'dead', 'limit': 50},
+        {'mode': 'search', 'search_string': 'missing', 'limit': 50},
+    ]
+    assert results[0]['torrents'][0]['category'] == '41'
+    assert results[1]['torrents'][0]['filename'] == 'dead'
+    assert results[3]['torrents'] == []
+    assert all(r['error'] is None for r in results)
+
+    # one token and one request per distinct query
+    assert len([r for r in upstream.requests if 'get_token' in r]) <= 1
+    assert len([r for r in upstream.requests if 'mode' in r]) == 3
+
+
+def test_batch_stdin_error(upstream, monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'stdin', io.StringIO('dead\nbroken\n'))
+    assert main(['--batch', '-', '--category', '4']) == 1
+
+    results = {r['query']['search_string']: r for r in read_lines(capsys)}
+    assert results['dead']['query']['categories'] == [4]
+    assert results['dead']['error'] is None
+    assert results['broken']['torrents'] == []
+    assert results['broken']['error']
+
+
+def test_batch_invalid_lines(upstream, monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'stdin', io.StringIO(
+        '{"foo": 1}\n{"mode"\n{"mode": "list", "priority": "x"}\ndead\n'))
+    assert main(['--batch', '-']) == 1
+    assert not sys.stdin.closed
+
+    results = read_lines(capsys)
+    assert sorted((r['error'] or '').split(':')[0] for r in results) == [
+        '', 'JSONDecodeError', 'ValueError', 'ValueError']
+    queries = [r['query'] for r in results]
+    # lines which aren't a query are printed as they were read
+    assert '{"mode"' in queries
+    assert '{"mode": "list", "priority": "x"}' in queries
+    assert {'foo': 1, 'mode': 'search'} in queries
+    assert {'search_string': 'dead', 'mode': 'search'} in queries
+
+
+def test_batch_stdin_streams(upstream, monkeypatch):
+    read_fd, write_fd = os.pipe()
+    monkeypatch.setattr(sys, 'stdin', os.fdopen(read_fd, encoding='utf-8'))
+    lines = queue.Queue()
+
+    class Output(io.StringIO):
+        def write(self, text):
+            if text.strip():
+                lines.put(json.loads(text))
+            return len(text)
+    monkeypatch.setattr(sys, 'stdout', Output())
+
+    thread = threading.Thread(target=main, args=(['--batch', '-'],))
+    thread.start()
+    with os.fdopen(write_fd, 'w', encoding='utf-8') as writer:
+        writer.write('dead\n')
+        writer.flush()
+        # printed before the input ends
+        assert lines.get(timeout=5)['query']['search_string'] == 'dead'
+        writer.write('alive\n')
+    thread.join(5)
+    assert not thread.is_alive()
+    assert lines.get(timeout=1)['query']['search_string'] == 'alive'
+    sys.stdin.close()
+
+
+def test_category_table_lazy_imports():
+    code = ('import sys\n'
+            'from rarbgapi.__main__ import main\n'
+            'main(["--category-table"])\n'
+            'assert "requests" not in sys.modules\n'
+            'assert "aiohttp" not in sys.modules\n')
+    result = subprocess.run([sys.executable, '-c', code],
+                            capture_output=True, text=True, check=True)
+    assert 'TV_EPISODES_HD -> 41' in result.stdout
+
+
+def test_lazy_package_attributes():
+    import rarbgapi  # pylint: disable=import-outside-toplevel
+    assert rarbgapi.RarbgAPI is RarbgAPI
+    assert 'AsyncRarbgAPI' in dir(rarbgapi)
+    with pytest.raises(AttributeError):
+        rarbgapi.Missing  # pylint: disable=pointless-statement
@@ -0,0 +1,105 @@
+import pytest
+
+from rarbgapi import RarbgAPI
+from rarbgapi.leakybucket import LeakyBucket
+from rarbgapi.retry import RetryPolicy
+from rarbgapi.metrics import Histogram, MetricsCollector
+
+
+DUMMY_TOKEN = 'test_token'
+
+
+@pytest.fixture
+def client(httpserver):
+    client = RarbgAPI(retries=1)
+    client._bucket = LeakyBucket(1000)
+    client._endpoint = httpserver.url_for("/")
+    client._token = DUMMY_TOKEN
+    return client
+
+
+def test_histogram():
+    histogram = Histogram(buckets=[1, 2, 3])
+    assert histogram.quantile(0.5) is None
+    for value in [0.5, 1.5, 1.6, 10]:
+        histogram.observe(value)
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(13.6)
+    assert histogram.quantile(0.5) == 2
+    assert histogram.quantile(1.0) == float('inf')
+    assert histogram.snapshot()['buckets'] == {
+        1: 1, 2: 2, 3: 0, float('inf'): 1,
+    }
+
+
+def test_hooks(httpserver, client):
+    httpserver.expect_request("/").respond_with_json({'torrent_results': []})
+    events = []
+    client.add_hook('on_request_start', lambda event, **info: events.append(
+        event))
+    client.add_hook('request_end', lambda event, **info: events.append(
+        (event, info['cached'], info['error'])))
+    assert client.list() == []
+    assert events == ['request_start', ('request_end', False, None)]
+
+
+def test_hooks_option():
+    events = []
+    RarbgAPI(hooks={'throttle': events.append})
+    with pytest.raises(ValueError):
+        RarbgAPI(hooks={'foo': events.append})
+
+
+def test_failing_hook_ignored(httpserver, client):
+    httpserver.expect_request("/").respond_with_json({'torrent_results': []})
+
+    def failing(event, **info):
+        raise RuntimeError('hook')
+
+    client.add_hook('http', failing)
+    assert client.list() == []
+    client.remove_hook('http', failing)
+
+
+def test_metrics_collector(httpserver, client):
+    httpserver.expect_ordered_request("/").respond_with_json(
+        {'error_code': 5})
+    httpserver.expect_ordered_request("/").respond_with_json(
+        {'error_code': 4})
+    httpserver.expect_ordered_request(
+        "/", query_string={'get_token': 'get_token',
+                           'app_id': RarbgAPI.APP_ID},
+    ).respond_with_json({'token': DUMMY_TOKEN})
+    httpserver.expect_ordered_request("/").respond_with_json(
+        {'torrent_results': []})
+    client._retry_policy = RetryPolicy(backoff=0)
+
+    metrics = MetricsCollector()
+    metrics.install(client)
+    assert client.search(search_string='x') == []
+    snapshot = metrics.snapshot()
+    assert snapshot['counters'] == {
+        'requests': 1, 'throttles': 1, 'retries': 2,
+        'retries.throttle': 1, 'retries.token': 1, 'token_refreshes': 1,
+    }
+    histograms = snapshot['histograms']
+    assert histograms['request']['count'] == 1
+    assert histograms['rate_wait']['count'] == 3
+    assert histograms['http']['count'] == 3
+    assert histograms['decode']['count'] == 3
+    assert histograms['token_refresh']['count'] == 1
+
+    metrics.uninstall(client)
+    metrics.reset()
+    assert metrics.snapshot() == {'counters': {}, 'histograms': {}}
+
+
+def test_metrics_errors(client):
+    client._endpoint = 'http://127.0.0.1:1/'
+    client._token = DUMMY_TOKEN
+    metrics = MetricsCollector()
+    metrics.install(client)
+    with pytest.raises(Exception):
+        client.list()
+    assert metrics.counters['errors'] == 1
+    assert metrics.counters['retries.connection'] == 1
@@ -0,0 +1,61 @@
+import pytest
+from rarbgapi import RarbgAPI
+from rarbgapi import pipeline
+from rarbgapi.leakybucket import LeakyBucket
+from rarbgapi.tokenstore import MemoryTokenStore
+
+
+def test_run_throws_errors_into_steps():
+    def steps():
+        try:
+            yield pipeline.Sleep(1)
+        except KeyError:
+            value = yield pipeline.Acquire(None)
+            return value
+        return None
+
+    def perform(action):
+        if isinstance(action, pipeline.Sleep):
+            raise KeyError('boom')
+        return 'acquired'
+    assert pipeline.run(steps(), perform) == 'acquired'
+
+
+def test_run_closes_steps_on_uncaught_error():
+    closed = []
+
+    def steps():
+        try:
+            yield pipeline.Sleep(1)
+        finally:
+            closed.append(True)
+
+    def perform(action):
+        raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        pipeline.run(steps(), perform)
+    assert closed == [True]
+
+
+def test_request_actions():
+    '''
+    A list is driven by actions only, any client performing them the same
+    way gets the same result.
+    '''
+    client = RarbgAPI(rate_limiter=LeakyBucket(1000),
+                      token_store=MemoryTokenStore(), coalesce=False)
+    client._token = 'token'
+    actions = []
+
+    def perform(action):
+        actions.append(type(action).__name__)
+        if isinstance(action, pipeline.Acquire):
+            return True
+        return b'{"torrent_results": [{"filename": "a", "category": "c",' \
+            b' "download": "magnet:?xt=urn:btih:abc"}]}'
+
+    steps = pipeline.request_steps(
+        client, RarbgAPI.list.__wrapped__, (), {'limit': 25})
+    torrents = pipeline.run(steps, perform)
+    assert [t.filename for t in torrents] == ['a']
+    assert actions == ['Acquire', 'Send']
@@ -1,9 +1,23 @@
+import json
+import time
+import pickle
+import datetime
+
 import requests
 import pytest
 import pytest_httpserver
+import werkzeug
 
-from rarbgapi import RarbgAPI
-from rarbgapi.leakybucket import LeakyBucket
+from rarbgapi import RarbgAPI, Torrent
+from rarbgapi.leakybucket import LeakyBucket, AsyncLeakyBucket, \
+    AdaptiveLeakyBucket
+from rarbgapi.tokenstore import MemoryTokenStore
+from rarbgapi.transport import FakeTransport
+from rarbgapi.cache import MemoryCache
+from rarbgapi.jsonbackend import get_loads
+from rarbgapi.retry import RetryPolicy, CircuitOpenException, \
+    Deadline, DeadlineExceeded
+from rarbgapi.rarbgapi import ThrottleException
 
 
 DUMMY_APP_ID = 'test_app_id'
@@ -294,3 +308,349 @@ def test_extended_torrents(
 
         with pytest.raises(AttributeError):
             torrent.foobar
+
+
+def test_session_reused(httpserver, client, empty_response):
+    httpserver.expect_request(
+        "/",
+        handler_type=pytest_httpserver.httpserver.HandlerType.PERMANENT,
+    ).respond_with_json(empty_response)
+
+    assert client.list() == []
+    session = client._transport._session
+    assert session is not None
+    assert client.search() == []
+    assert client._transport._session is session
+
+
+def test_session_close(httpserver, client, empty_response):
+    httpserver.expect_request(
+        "/",
+        handler_type=pytest_httpserver.httpserver.HandlerType.PERMANENT,
+    ).respond_with_json(empty_response)
+
+    with client:
+        assert client.list() == []
+        assert client._transport._session is not None
+    assert client._transport._session is None
+    assert client.list() == []
+
+
+def test_session_options():
+    client = RarbgAPI(pool_maxsize=3, keep_alive=False)
+    sess = client._transport.session
+    adapter = sess.get_adapter(RarbgAPI.ENDPOINT)
+    assert adapter._pool_maxsize == 3
+    assert sess.headers['connection'] == 'close'
+    client.close()
+
+
+def test_rate_limiter_option():
+    bucket = LeakyBucket(1)
+    client = RarbgAPI(rate_limiter=bucket)
+    assert client.rate_limiter is bucket
+    assert client.cache is None
+    with pytest.raises(AttributeError):
+        client.rate_limiter = LeakyBucket(2)
+
+
+def test_async_rate_limiter_rejected():
+    with pytest.raises(TypeError):
+        RarbgAPI(rate_limiter=AsyncLeakyBucket(1))
+
+
+def test_duck_typed_rate_limiter():
+    class Limiter(object):  # pylint: disable=too-few-public-methods
+        def __init__(self):
+            self.acquired = 0
+
+        def acquire(self, token, timeout=None):
+            self.acquired += token
+            return True
+
+    limiter = Limiter()
+    transport = FakeTransport()
+    client = RarbgAPI(rate_limiter=limiter, transport=transport,
+                      token_store=MemoryTokenStore())
+    assert client.search(search_string='missing') == []
+    assert transport.calls['search'] == 1
+    assert limiter.acquired == 2  # token and search
+
+
+def test_token_shared_between_clients(httpserver, client, empty_response):
+    httpserver.expect_request(
+        "/",
+        query_string={
+            'token': DUMMY_TOKEN, 'app_id': DUMMY_APP_ID, 'mode': 'list',
+        },
+    ).respond_with_json(empty_response)
+
+    other = RarbgAPI(retries=1)
+    other._bucket = LeakyBucket(1000)
+    other._endpoint = client._endpoint
+    other.APP_ID = DUMMY_APP_ID
+    assert other.list() == []
+
+
+def test_token_store_option(httpserver, empty_response):
+    store = MemoryTokenStore()
+    client = RarbgAPI(retries=1, token_store=store)
+    client._bucket = LeakyBucket(1000)
+    client._endpoint = httpserver.url_for("/")
+    httpserver.expect_ordered_request(
+        "/",
+        query_string={'get_token': 'get_token', 'app_id': RarbgAPI.APP_ID},
+    ).respond_with_json({'token': 'fresh'})
+    httpserver.expect_ordered_request(
+        "/",
+        query_string={
+            'token': 'fresh', 'app_id': RarbgAPI.APP_ID, 'mode': 'list',
+        },
+    ).respond_with_json(empty_response)
+
+    assert client.list() == []
+    assert store.get(client._endpoint) == 'fresh'
+
+
+@pytest.mark.parametrize('mode', ['list', 'search'])
+def test_cache_option(httpserver, client, mode):
+    httpserver.expect_oneshot_request("/").respond_with_json({
+        'torrent_results': [{
+            'filename': 'torrent',
+            'category': 'movies/x264',
+            'download': 'download_link',
+        }]
+    })
+
+    client._options['cache'] = MemoryCache()
+    func = getattr(client, mode)
+    first = func(categories=[2, 1])
+    second = func(categories=[1, 2])
+    assert len(first) == len(second) == 1
+    assert second[0].download == 'download_link'
+    assert client.cache.hits == 1
+
+
+EXTENDED_TORRENT_JSON = {
+    "title": "torrent",
+    "category": "Movies/x264",
+    "download": "download_link",
+    "seeders": 12,
+    "leechers": "6",
+    "size": 504519520,
+    "pubdate": "2017-05-21 02:13:49 +0000",
+    "episode_info": {
+        "imdb": "tt4443856",
+        "tvrage": None,
+        "tvdb": None,
+        "themoviedb": "430293"
+    },
+    "ranked": 1,
+    "info_page": "https://torrentapi.org/....",
+    "unknown": "value",
+}
+
+
+def test_torrent_slots():
+    torrent = Torrent(dict(EXTENDED_TORRENT_JSON))
+    assert not hasattr(torrent, '__dict__')
+    assert torrent.leechers == 6
+    assert torrent.title == 'torrent'
+    assert torrent.info_page == torrent.page
+    assert torrent.ranked == 1
+    assert torrent.unknown == 'value'
+    assert torrent.published == datetime.datetime(
+        2017, 5, 21, 2, 13, 49, tzinfo=datetime.timezone.utc)
+
+
+def test_torrent_episode_info():
+    torrent = Torrent(dict(EXTENDED_TORRENT_JSON))
+    assert torrent.episode_info.imdb == 'tt4443856'
+    assert torrent.episode_info['themoviedb'] == '430293'
+    assert torrent.episode_info.get('tvdb', 'missing') == 'missing'
+    assert torrent.episode_info == EXTENDED_TORRENT_JSON['episode_info']
+    with pytest.raises(KeyError):
+        torrent.episode_info['foobar']
+
+
+def test_torrent_brief_optional_fields():
+    torrent = Torrent({
+        'filename': 'torrent', 'category': 'movies/x264',
+        'download': 'download_link',
+    })
+    assert torrent.published is None
+    with pytest.raises(AttributeError):
+        torrent.episode_info
+    with pytest.raises(AttributeError):
+        torrent.title
+
+
+def test_torrent_round_trip():
+    torrent = Torrent(dict(EXTENDED_TORRENT_JSON))
+    mapping = dict(EXTENDED_TORRENT_JSON, leechers=6)
+    assert torrent.to_dict() == mapping
+    clone = pickle.loads(pickle.dumps(torrent))
+    assert clone.to_dict() == mapping
+    clone = Torrent(json.loads(json.dumps(torrent.to_dict())))
+    assert clone.to_dict() == mapping
+
+
+@pytest.mark.parametrize('backend', ['json', 'auto'])
+@pytest.mark.parametrize('mode', ['list', 'search'])
+def test_fast_decode(httpserver, client, mode, backend):
+    httpserver.expect_request("/").respond_with_json({
+        'torrent_results': [EXTENDED_TORRENT_JSON] * 2
+    })
+    client._loads = get_loads(backend)
+    torrents = getattr(client, mode)()
+    assert len(torrents) == 2
+    for torrent in torrents:
+        assert isinstance(torrent, Torrent)
+        assert torrent.to_dict() == dict(EXTENDED_TORRENT_JSON, leechers=6)
+
+
+def test_fast_decode_option():
+    assert RarbgAPI()._loads is None
+    assert RarbgAPI(fast_decode=True, json_backend='json')._loads is \
+        json.loads
+
+
+@pytest.mark.parametrize('mode', ['list', 'search'])
+def test_throttle_exhausted(httpserver, client, mode):
+    httpserver.expect_request("/").respond_with_json({'error_code': 5})
+    client._retry_policy = RetryPolicy(backoff=0, budgets={'throttle': 2})
+    with pytest.raises(ThrottleException):
+        getattr(client, mode)()
+    assert len(httpserver.log) == 3
+
+
+def test_connection_error_opens_circuit(client):
+    client._endpoint = 'http://127.0.0.1:1/'
+    client._token = DUMMY_TOKEN
+    client._retry_policy = RetryPolicy(
+        retries=2, backoff=0, breaker_threshold=2)
+    with pytest.raises(requests.ConnectionError):
+        client.list()
+    with pytest.raises(CircuitOpenException):
+        client.list()
+
+
+@pytest.mark.parametrize('mode', ['list', 'search'])
+def test_timeout_rate_limiter(client, mode):
+    client._bucket = LeakyBucket(0.5)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        getattr(client, mode)(timeout=0.5)
+    assert time.monotonic() - start < 0.5
+
+
+@pytest.mark.parametrize('mode', ['list', 'search'])
+def test_timeout_slow_response(httpserver, client, mode):
+    def slow(request):
+        time.sleep(1)
+        return werkzeug.Response('{"torrent_results": []}')
+
+    httpserver.expect_request("/").respond_with_handler(slow)
+    client._options['timeout'] = 0.3
+    start = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        getattr(client, mode)()
+    assert time.monotonic() - start < 0.9
+
+
+def test_timeout_options():
+    client = RarbgAPI(connect_timeout=1, read_timeout=2)
+    assert client._get_timeout(None) == (1, 2)
+    connect, read = client._get_timeout(Deadline(1.5))
+    assert connect == 1
+    assert 1.4 < read <= 1.5
+
+
+def count_decodes(client):
+    decodes = []
+    client.add_hook('decode', lambda event, **info: decodes.append(info))
+    return decodes
+
+
+@pytest.mark.parametrize('mode', ['list', 'search'])
+def test_unchanged_response(httpserver, client, mode):
+    httpserver.expect_request("/").respond_with_json({
+        'torrent_results': [EXTENDED_TORRENT_JSON],
+    })
+    decodes = count_decodes(client)
+    first = getattr(client, mode)(limit=25)
+    second = getattr(client, mode)(limit=25)
+    assert not first.unchanged
+    assert second.unchanged
+    assert len(decodes) == 1
+    assert second[0].filename == first[0].filename
+
+    # another query isn't compared with this one
+    assert not getattr(client, mode)(limit=50).unchanged
+
+
+def test_changed_response(httpserver, client):
+    for name in ('first', 'second'):
+        httpserver.expect_oneshot_request("/").respond_with_json({
+            'torrent_results': [dict(EXTENDED_TORRENT_JSON, title=name)],
+        })
+    assert not client.list().unchanged
+    torrents = client.list()
+    assert not torrents.unchanged
+    assert torrents[0].filename == 'second'
+
+
+def test_fingerprints_disabled(httpserver):
+    httpserver.expect_request("/").respond_with_json({
+        'torrent_results': [EXTENDED_TORRENT_JSON],
+    })
+    client = RarbgAPI(retries=1, fingerprints=0)
+    client._bucket = LeakyBucket(1000)
+    client._endpoint = httpserver.url_for("/")
+    client._token = DUMMY_TOKEN
+    decodes = count_decodes(client)
+    client.list()
+    assert not client.list().unchanged
+    assert len(decodes) == 2
+
+
+def test_upgrade(httpserver, client):
+    brief = [
+        {'filename': name, 'category': 'Movies/x264',
+         'download': f'magnet:?xt=urn:btih:{name}'}
+        for name in ('keep', 'skip')
+    ]
+    extended = [
+        dict(EXTENDED_TORRENT_JSON, title=t['filename'],
+             download=t['download'])
+        for t in brief
+    ]
+    httpserver.expect_request("/", query_string={
+        'app_id': DUMMY_APP_ID, 'token': DUMMY_TOKEN, 'mode': 'search',
+        'search_string': 'x', 'format': 'json',
+    }).respond_with_json({'torrent_results': brief})
+    httpserver.expect_request("/", query_string={
+        'app_id': DUMMY_APP_ID, 'token': DUMMY_TOKEN, 'mode': 'search',
+        'search_string': 'x', 'format': 'json_extended',
+    }).respond_with_json({'torrent_results': extended})
+
+    torrents = client.search(search_string='x', extended_response=True,
+                             upgrade=lambda t: t.filename == 'keep')
+    assert [t.is_extended for t in torrents] == [True, False]
+    assert len(httpserver.log) == 2
+
+    torrents = client.search(search_string='x', upgrade=lambda t: False)
+    assert [t.is_extended for t in torrents] == [False, False]
+    assert len(httpserver.log) == 3
+
+
+def test_adaptive_rate_limiter_feedback(httpserver, client):
+    httpserver.expect_oneshot_request("/").respond_with_json(
+        {'error_code': 5})
+    httpserver.expect_oneshot_request("/").respond_with_json(
+        {'torrent_results': []})
+    client._bucket = AdaptiveLeakyBucket(
+        1000, max_rate=1000, increase=1, decrease=0.5)
+    client._retry_policy = RetryPolicy(backoff=0)
+    assert client.list() == []
+    assert client._bucket.rate in (500, 501)
@@ -0,0 +1,104 @@
+import time
+
+import pytest
+from rarbgapi.retry import RetryPolicy, CircuitOpenException, \
+    Deadline, DeadlineExceeded
+
+
+def test_backoff_jitter():
+    policy = RetryPolicy(backoff=1.0, max_backoff=3.0, jitter=0.5)
+    for _ in range(100):
+        assert 0.5 <= policy.get_backoff(1) <= 1.0
+        assert 1.0 <= policy.get_backoff(2) <= 2.0
+        assert 1.5 <= policy.get_backoff(5) <= 3.0
+
+
+def test_retries_exhausted():
+    state = RetryPolicy(backoff=0).start(3)
+    exp = IOError('error')
+    assert state.retry('server', exp) == 0
+    assert state.retry('connection', exp) == 0
+    with pytest.raises(IOError):
+        state.retry('server', exp)
+
+
+def test_policy_retries_override_client():
+    state = RetryPolicy(retries=1).start(5)
+    with pytest.raises(IOError):
+        state.retry('server', IOError())
+
+
+def test_throttle_budget():
+    state = RetryPolicy(backoff=0.1, budgets={'throttle': 2}).start(1)
+    exp = Exception('throttle')
+    assert state.retry('throttle', exp) == 0
+    assert 0 < state.retry('throttle', exp) <= 0.1
+    with pytest.raises(Exception):
+        state.retry('throttle', exp)
+
+
+def test_token_budget():
+    state = RetryPolicy().start(1)
+    exp = Exception('token')
+    for _ in range(3):
+        assert state.retry('token', exp) == 0
+    with pytest.raises(Exception):
+        state.retry('token', exp)
+
+
+def test_deadline():
+    state = RetryPolicy(backoff=1.0, jitter=0, deadline=0.5).start(5)
+    with pytest.raises(IOError):
+        state.retry('server', IOError())
+
+
+def test_circuit_breaker():
+    policy = RetryPolicy(
+        backoff=0, breaker_threshold=2, breaker_cooldown=0.1)
+    state = policy.start(10)
+    state.retry('connection', IOError())
+    state.retry('connection', IOError())
+    with pytest.raises(CircuitOpenException):
+        policy.start(10)
+
+    time.sleep(0.15)
+    state = policy.start(10)
+    state.retry('connection', IOError())
+    with pytest.raises(CircuitOpenException):
+        policy.start(10)
+
+    time.sleep(0.15)
+    policy.start(10).success()
+    state = policy.start(10)
+    state.retry('connection', IOError())
+    policy.start(10)
+
+
+def test_server_errors_dont_open_circuit():
+    policy = RetryPolicy(backoff=0, breaker_threshold=1)
+    policy.start(10).retry('server', IOError())
+    policy.start(10)
+
+
+def test_deadline_remaining():
+    assert Deadline().remaining() is None
+    assert Deadline().cap(5) == 5
+    deadline = Deadline(1.0)
+    assert 0.9 < deadline.remaining() <= 1.0
+    assert deadline.cap(5) <= 1.0
+    assert deadline.cap(0.5) == 0.5
+    assert deadline.cap(None) <= 1.0
+
+
+def test_deadline_check():
+    Deadline().check('request')
+    Deadline(1.0).check('request')
+    with pytest.raises(DeadlineExceeded):
+        Deadline(0).check('request')
+    with pytest.raises(TimeoutError):
+        Deadline(-1).check('request')
+
+
+def test_deadline_earliest():
+    assert Deadline.earliest(None, Deadline()).remaining() is None
+    assert Deadline.earliest(Deadline(10), Deadline(1)).remaining() <= 1
@@ -0,0 +1,109 @@
+import json
+import time
+import threading
+import urllib.error
+import urllib.request
+import concurrent.futures
+
+import pytest
+import werkzeug
+from rarbgapi import RarbgAPI
+from rarbgapi.cache import MemoryCache
+from rarbgapi.leakybucket import LeakyBucket, UnlimitedBucket
+from rarbgapi.tokenstore import MemoryTokenStore
+from rarbgapi.server import RarbgAPIServer, query_to_kwargs
+
+
+@pytest.fixture
+def upstream(httpserver):
+    requests = []
+
+    def handle(request):
+        requests.append(dict(request.args))
+        if 'get_token' in request.args:
+            body = {'token': 'upstream'}
+        else:
+            time.sleep(0.1)
+            body = {'torrent_results': [{
+                'title': request.args.get('search_string', 'listed'),
+                'category': 'TV HD Episodes',
+                'download': 'magnet:?xt=urn:btih:abc',
+                'seeders': 1,
+            }]}
+        return werkzeug.Response(
+            json.dumps(body), content_type='application/json')
+
+    httpserver.expect_request('/').respond_with_handler(handle)
+    httpserver.requests = requests
+    return httpserver
+
+
+@pytest.fixture
+def server(upstream):
+    client = RarbgAPI(retries=1, cache=MemoryCache(),
+                      rate_limiter=LeakyBucket(1000),
+                      token_store=MemoryTokenStore())
+    client._endpoint = upstream.url_for('/')
+    server = RarbgAPIServer(client, ('127.0.0.1', 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def get(server, path):
+    try:
+        with urllib.request.urlopen(server.url + path) as resp:
+            return resp.status, json.load(resp)
+    except urllib.error.HTTPError as exp:
+        return exp.code, json.load(exp)
+
+
+def searches(upstream):
+    return [r for r in upstream.requests if 'get_token' not in r]
+
+
+def test_query_to_kwargs():
+    assert query_to_kwargs({
+        'mode': 'list', 'token': 'x', 'app_id': 'y', 'category': '41;49',
+        'format': 'json_extended', 'limit': '100',
+    }) == ('list', {
+        'categories': ['41', '49'], 'extended_response': True,
+        'limit': '100',
+    })
+
+
+def test_search_cached(server, upstream):
+    status, body = get(server, 'search?search_string=dead&limit=25')
+    assert status == 200
+    assert body['torrent_results'][0]['title'] == 'dead'
+    assert get(server, 'search?limit=25&search_string=dead') == (200, body)
+    assert len(searches(upstream)) == 1
+    stats = get(server, 'stats')[1]
+    assert stats['cache']['hits'] == 1
+    assert stats['in_flight'] == 0
+
+
+def test_concurrent_clients_coalesced(server, upstream):
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(
+            lambda _: get(server, 'list?category=41;49'), range(8)))
+    assert all(status == 200 for status, _ in results)
+    assert len(searches(upstream)) == 1
+
+
+def test_torrentapi_compatible(server, upstream):
+    client = RarbgAPI(retries=1, endpoint=server.url + 'pubapi_v2.php',
+                      rate_limiter=UnlimitedBucket(),
+                      token_store=MemoryTokenStore())
+    torrents = client.search(search_string='dead', extended_response=True)
+    assert torrents[0].filename == 'dead'
+    assert torrents[0].seeders == 1
+    assert searches(upstream)[0]['format'] == 'json_extended'
+
+
+def test_errors(server):
+    assert get(server, 'search?unknown=1')[0] == 400
+    assert get(server, 'download')[0] == 404
@@ -0,0 +1,101 @@
+import time
+import asyncio
+import threading
+
+import pytest
+from rarbgapi.tokenstore import MemoryTokenStore, FileTokenStore
+
+
+@pytest.fixture(params=['memory', 'file'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryTokenStore()
+    return FileTokenStore(path=str(tmp_path / 'tokens'))
+
+
+def test_get_set(store):
+    assert store.get('key') is None
+    store.set('key', 'token')
+    assert store.get('key') == 'token'
+    assert store.get('other') is None
+    store.set('key', None)
+    assert store.get('key') is None
+
+
+def test_clear(store):
+    store.set('key', 'token')
+    store.clear('key')
+    assert store.get('key') is None
+
+
+def test_expire_before_ttl():
+    store = MemoryTokenStore(ttl=1.0, margin=0.5)
+    store.set('key', 'token')
+    assert store.get('key') == 'token'
+    time.sleep(0.6)
+    assert store.get('key') is None
+
+
+def test_refresh_stale(store):
+    store.set('key', 'old')
+    assert store.refresh('key', 'old', lambda: 'new') == 'new'
+    assert store.get('key') == 'new'
+
+
+def test_refresh_already_refreshed(store):
+    store.set('key', 'new')
+    fetch_called = []
+    token = store.refresh('key', 'old', lambda: fetch_called.append(1))
+    assert token == 'new'
+    assert not fetch_called
+
+
+def test_refresh_deduplicated(store):
+    store.set('key', 'old')
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return 'new'
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(store.refresh('key', 'old', fetch)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == ['new'] * 8
+
+
+def test_refresh_async_deduplicated(store):
+    store.set('key', 'old')
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return 'new'
+
+    async def run():
+        return await asyncio.gather(*[
+            store.refresh_async('key', 'old', fetch) for _ in range(8)
+        ])
+    assert asyncio.run(run()) == ['new'] * 8
+    assert len(calls) == 1
+    assert store.get('key') == 'new'
+
+
+def test_file_store_shared(tmp_path):
+    path = str(tmp_path / 'tokens')
+    FileTokenStore(path=path).set('key', 'token')
+    assert FileTokenStore(path=path).get('key') == 'token'
+
+
+def test_shared_memory_store():
+    assert MemoryTokenStore.shared() is MemoryTokenStore.shared()
@@ -0,0 +1,145 @@
+import json
+import time
+import asyncio
+
+import pytest
+import requests
+import werkzeug
+from rarbgapi import RarbgAPI, AsyncRarbgAPI
+from rarbgapi.leakybucket import AsyncLeakyBucket
+from rarbgapi.retry import RetryPolicy
+from rarbgapi.transport import Transport, AsyncTransport, \
+    RequestsTransport, HTTPXTransport, FakeTransport, AsyncFakeTransport
+
+from conftest import make_torrent, make_client
+
+
+TORRENTS = [make_torrent(i, seeders=i) for i in range(30)] + \
+    [make_torrent(30, category='Movies/x264', seeders=100)]
+
+
+def test_fake_transport():
+    transport = FakeTransport(TORRENTS)
+    client = make_client(transport=transport)
+
+    torrents = client.list()
+    assert len(torrents) == 25
+    assert not torrents[0].is_extended
+    assert torrents[0].filename == 'Some.Show.S01E30.1080p'
+
+    torrents = client.list(categories=[41], sort='seeders', limit=100,
+                           extended_response=True)
+    assert len(torrents) == 30
+    assert [t.seeders for t in torrents[:2]] == [29, 28]
+
+    torrents = client.search(search_string='s01e03 1080P',
+                             extended_response=True)
+    assert [t.filename for t in torrents] == ['Some.Show.S01E03.1080p']
+    assert client.search(search_imdb='tt0000030')[0].category == \
+        'Movies/x264'
+    assert client.search(search_string='missing') == []
+    assert transport.calls == {'get_token': 1, 'list': 2, 'search': 3}
+
+
+def test_fake_transport_reuses_bodies():
+    transport = FakeTransport(TORRENTS)
+    params = {'mode': 'list', 'limit': 50, 'token': 'a'}
+    body = transport.handle(params)
+    assert transport.handle(dict(params, token='b')) is body
+    assert len(json.loads(body)['torrent_results']) == 31
+
+
+def test_custom_transport():
+    class Flaky(Transport):
+        def __init__(self):
+            super().__init__()
+            self.requests = []
+
+        def request(self, method, url, params, timeout, total=None):
+            self.requests.append((method, url, dict(params), timeout))
+            if 'get_token' in params:
+                return b'{"token": "token"}'
+            if len(self.requests) == 2:
+                raise ConnectionError('reset')
+            return b'{"torrent_results": []}'
+
+    transport = Flaky()
+    client = make_client(
+        transport=transport, retries=2,
+        retry_policy=RetryPolicy(backoff=0, jitter=0),
+        connect_timeout=1, read_timeout=2)
+    assert client.list() == []
+    assert len(transport.requests) == 3
+    method, url, params, timeout = transport.requests[-1]
+    assert (method, url, timeout) == ('GET', RarbgAPI.ENDPOINT, (1, 2))
+    assert params['token'] == 'token'
+    assert params['app_id'] == RarbgAPI.APP_ID
+    assert transport.headers['user-agent'] == client._get_user_agent()
+
+
+def test_requests_transport(httpserver):
+    httpserver.expect_request(
+        '/', headers={'x-test': '1', 'user-agent': 'agent'},
+    ).respond_with_handler(lambda request: werkzeug.Response(
+        json.dumps({'token': 'token'} if 'get_token' in request.args
+                   else {'torrent_results': []})))
+    transport = RequestsTransport(headers={'x-test': '1',
+                                           'user-agent': 'agent'})
+    with make_client(transport=transport) as client:
+        client._endpoint = httpserver.url_for('/')
+        assert client.list() == []
+        assert transport._session is not None
+    assert transport._session is None
+
+
+def test_requests_transport_total(httpserver):
+    def trickle():
+        for _ in range(5):
+            yield b' ' * 10
+            time.sleep(0.2)
+    httpserver.expect_request('/').respond_with_handler(
+        lambda request: werkzeug.Response(trickle()))
+    transport = RequestsTransport()
+    url = httpserver.url_for('/')
+    started = time.monotonic()
+    # every chunk arrives within the read timeout, the total cuts it
+    with pytest.raises(requests.Timeout):
+        transport.request('GET', url, {}, (1, 1), total=0.3)
+    assert time.monotonic() - started < 0.9
+    assert transport.request('GET', url, {}, (1, 1), total=5) == b' ' * 50
+    transport.close()
+
+
+def test_transports_abstract():
+    with pytest.raises(TypeError):
+        Transport()  # pylint: disable=abstract-class-instantiated
+    with pytest.raises(TypeError):
+        AsyncTransport()  # pylint: disable=abstract-class-instantiated
+    assert not isinstance(AsyncFakeTransport(), Transport)
+
+
+def test_httpx_transport(httpserver):
+    pytest.importorskip('httpx')
+    httpserver.expect_request('/').respond_with_handler(
+        lambda request: werkzeug.Response(json.dumps(
+            {'token': 'token'} if 'get_token' in request.args
+            else {'torrent_results': []})))
+    with make_client(transport=HTTPXTransport(http2=False)) as client:
+        client._endpoint = httpserver.url_for('/')
+        assert client.list() == []
+
+
+def test_async_fake_transport():
+    transport = AsyncFakeTransport(TORRENTS)
+    client = make_client(cls=AsyncRarbgAPI, bucket=AsyncLeakyBucket,
+                         transport=transport)
+
+    async def run():
+        async with client:
+            return await asyncio.gather(
+                client.list(limit=50),
+                client.search(search_string='S01E05'))
+    listed, found = asyncio.run(run())
+    assert len(listed) == 31
+    assert [t.filename for t in found] == ['Some.Show.S01E05.1080p']
+    assert transport.calls['get_token'] == 1
@@ -0,0 +1,216 @@
+import os
+import abc
+import json
+import time
+import asyncio
+import tempfile
+import weakref
+import threading
+import contextlib
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from .utils import write_json
+
+
+class TokenStore(abc.ABC):
+    '''
+    Keeps tokens with their expire time so clients can share them.
+
+    The server expires a token after 15 minutes, a token is considered
+    expired `margin` seconds before that so it is refreshed proactively.
+    Subclass and implement _load, _save and _delete to plug an external
+    store (redis, memcached...), _locked can be overridden to make refresh
+    exclusive across hosts.
+    '''
+    TTL = 15 * 60
+    MARGIN = 60
+
+    def __init__(self, ttl=None, margin=None):
+        self._ttl = self.TTL if ttl is None else ttl
+        self._margin = self.MARGIN if margin is None else margin
+        self._lock = threading.RLock()
+        # asyncio.Lock per event loop and key, see refresh_async
+        self._async_locks = weakref.WeakKeyDictionary()
+        self._async_locks_lock = threading.Lock()
+
+    def get(self, key):
+        '''
+        :returns: the token or None if it is missing or about to expire
+        '''
+        entry = self._load(key)
+        if not entry:
+            return None
+
+        token, expires_at = entry
+        if time.time() >= expires_at - self._margin:
+            return None
+        return token
+
+    def set(self, key, token):
+        if token is None:
+            self._delete(key)
+            return
+        self._save(key, token, time.time() + self._ttl)
+
+    def clear(self, key):
+        self._delete(key)
+
+    def refresh(self, key, stale, fetch):
+        '''
+        Replace the stale token by fetch(), when many callers refresh the
+        same stale token at once only the first one calls fetch and others
+        get its result.
+
+        :param stale: the token rejected by the server or None
+        :param fetch: callable returning a new token
+        '''
+        with self._locked(key):
+            token = self.get(key)
+            if token and token != stale:
+                return token
+
+            token = fetch()
+            self.set(key, token)
+            return token
+
+    async def refresh_async(self, key, stale, fetch):
+        '''
+        refresh for coroutines, fetch returns an awaitable.
+
+        The store's lock, which is a file lock for FileTokenStore, is taken
+        in a worker thread so the event loop keeps running while another
+        client or process refreshes. fetch runs on the event loop. Tasks of
+        one loop refreshing the same key wait on an asyncio.Lock first, so
+        they hold at most one executor thread, which fetch may need to
+        resolve the host.
+        '''
+        loop = asyncio.get_running_loop()
+
+        def run_fetch():
+            return asyncio.run_coroutine_threadsafe(fetch(), loop).result()
+        async with self._async_lock(loop, key):
+            return await loop.run_in_executor(
+                None, self.refresh, key, stale, run_fetch)
+
+    def _async_lock(self, loop, key):
+        with self._async_locks_lock:  # pylint: disable=not-context-manager
+            locks = self._async_locks.setdefault(loop, {})
+            if key not in locks:
+                locks[key] = asyncio.Lock()
+            return locks[key]
+
+    def _locked(self, key):  # pylint: disable=unused-argument
+        return self._lock
+
+    @abc.abstractmethod
+    def _load(self, key):
+        '''
+        :returns: (token, expires_at) or None
+        '''
+
+    @abc.abstractmethod
+    def _save(self, key, token, expires_at):
+        '''
+        Store the token of key, replacing what was there.
+        '''
+
+    @abc.abstractmethod
+    def _delete(self, key):
+        '''
+        Drop the token of key, missing keys are ignored.
+        '''
+
+
+class MemoryTokenStore(TokenStore):
+    '''
+    Tokens live in this process, shared() returns the store used by
+    default so every client in the process reuses the same token.
+    '''
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, ttl=None, margin=None):
+        super().__init__(ttl, margin)
+        self._entries = {}
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:  # pylint: disable=not-context-manager
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _load(self, key):
+        return self._entries.get(key)
+
+    def _save(self, key, token, expires_at):
+        self._entries[key] = (token, expires_at)
+
+    def _delete(self, key):
+        self._entries.pop(key, None)
+
+
+class FileTokenStore(TokenStore):
+    '''
+    Tokens live in a json file, processes using the same path share tokens
+    and a refresh in one process is reused by the others.
+    '''
+    DEFAULT_PATH = os.path.join(tempfile.gettempdir(), 'rarbgapi.tokens')
+
+    def __init__(self, path=None, ttl=None, margin=None):
+        if fcntl is None:
+            raise ImportError('FileTokenStore requires fcntl')
+        super().__init__(ttl, margin)
+        self._path = path or self.DEFAULT_PATH
+        self._holding = False
+
+    @property
+    def path(self):
+        return self._path
+
+    @contextlib.contextmanager
+    def _locked(self, key):
+        with self._lock:
+            if self._holding:
+                # flock isn't reentrant, the lock file is already held
+                yield
+                return
+
+            with open(self._path + '.lock', 'a', encoding='ascii') as fobj:
+                fcntl.flock(fobj, fcntl.LOCK_EX)
+                self._holding = True
+                try:
+                    yield
+                finally:
+                    self._holding = False
+                    fcntl.flock(fobj, fcntl.LOCK_UN)
+
+    def _read(self):
+        try:
+            with open(self._path, 'r', encoding='utf-8') as fobj:
+                return json.load(fobj)
+        except (IOError, ValueError):
+            return {}
+
+    def _write(self, entries):
+        write_json(self._path, entries)
+
+    def _load(self, key):
+        entry = self._read().get(key)
+        return tuple(entry) if entry else None
+
+    def _save(self, key, token, expires_at):
+        with self._locked(key):
+            entries = self._read()
+            entries[key] = [token, expires_at]
+            self._write(entries)
+
+    def _delete(self, key):
+        with self._locked(key):
+            entries = self._read()
+            if entries.pop(key, None):
+                self._write(entries)
@@ -0,0 +1,384 @@
+'''
+Transports send the client's HTTP requests, the client only builds
+parameters and decodes the bytes a transport returns.
+
+    client = RarbgAPI(transport=HTTPXTransport(http2=True))
+    client = RarbgAPI(transport=FakeTransport(torrents))
+'''
+import abc
+import json
+import time
+import asyncio
+import threading
+import collections
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .categories import CATEGORY_NAMES
+
+
+class _BaseTransport(abc.ABC):  # pylint: disable=too-few-public-methods
+    '''
+    :param headers: (optional) sent with every request, the client adds its
+            user-agent before the first request unless one is set
+
+    connection_errors are the exceptions retried as connection errors.
+    '''
+    connection_errors = (ConnectionError, TimeoutError)
+
+    def __init__(self, headers=None):
+        self.headers = dict(headers or {})
+
+
+class Transport(_BaseTransport):
+    '''
+    Sends requests for RarbgAPI.
+    '''
+    @abc.abstractmethod
+    def request(self, method, url, params, timeout, total=None):
+        '''
+        :param params: query string parameters
+        :param timeout: (connect, read) seconds
+        :param total: (optional) seconds the whole request may take
+
+        :returns: the response body as bytes
+
+        :raises: an exception for non 2xx responses, one of
+                connection_errors when total is exceeded
+        '''
+
+    def close(self):
+        '''
+        Release connections, they are opened again on the next request.
+        '''
+
+
+def _read_chunks(chunks, started, total, error):
+    '''
+    Join the chunks of a response body, raise error once more than total
+    seconds passed since started. A stalled read is still bounded by the
+    read timeout, which the client caps to the deadline.
+    '''
+    body = []
+    for chunk in chunks:
+        body.append(chunk)
+        if time.monotonic() - started > total:
+            raise error(f'response not read within {total:.2f} seconds')
+    return b''.join(body)
+
+
+class RequestsTransport(Transport):
+    '''
+    HTTP/1.1 with a pooled requests Session, the default transport.
+    '''
+    connection_errors = (requests.ConnectionError, requests.Timeout,
+                         ConnectionError, TimeoutError)
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, headers=None, pool_connections=1, pool_maxsize=10,
+                 pool_block=False, keep_alive=True):
+        # pylint: disable=too-many-arguments
+        super().__init__(headers)
+        self._pool = {
+            'pool_connections': pool_connections,
+            'pool_maxsize': pool_maxsize,
+            'pool_block': pool_block,
+        }
+        if not keep_alive:
+            self.headers['connection'] = 'close'
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._lock:  # pylint: disable=not-context-manager
+            if not self._session:
+                self._session = self._create_session()
+            return self._session
+
+    def _create_session(self):
+        adapter = HTTPAdapter(**self._pool)
+        sess = requests.Session()
+        sess.mount('http://', adapter)
+        sess.mount('https://', adapter)
+        sess.headers.update(self.headers)
+        return sess
+
+    def request(self, method, url, params, timeout, total=None):
+        if total is None:
+            resp = self.session.request(
+                method, url, params=params, timeout=timeout)
+            resp.raise_for_status()
+            return resp.content
+        # timeout only bounds every read, a slowly trickling body is cut
+        # when the total is exceeded
+        started = time.monotonic()
+        with self.session.request(method, url, params=params,
+                                  timeout=timeout, stream=True) as resp:
+            resp.raise_for_status()
+            return _read_chunks(self._iter_body(resp), started, total,
+                                requests.Timeout)
+
+    def _iter_body(self, resp):
+        if not hasattr(resp.raw, 'read1'):
+            # urllib3 < 2 waits for a full chunk, keep them small
+            yield from resp.iter_content(1024)
+            return
+        while True:
+            # what has arrived, up to CHUNK_SIZE
+            chunk = resp.raw.read1(self.CHUNK_SIZE, decode_content=True)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        with self._lock:  # pylint: disable=not-context-manager
+            if self._session:
+                self._session.close()
+                self._session = None
+
+
+def _import_httpx():
+    try:
+        import httpx  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        raise ImportError('HTTPXTransport requires httpx, '
+                          'please install rarbgapi[http2]') from None
+    return httpx
+
+
+class HTTPXTransport(Transport):
+    '''
+    httpx Client, with http2 one connection multiplexes concurrent
+    requests instead of opening one per thread.
+    '''
+    def __init__(self, headers=None, http2=True, pool_maxsize=10,
+                 keep_alive=True):
+        super().__init__(headers)
+        self._httpx = _import_httpx()
+        self.connection_errors = (self._httpx.TransportError,
+                                  ConnectionError, TimeoutError)
+        self._options = {
+            'http2': http2,
+            'limits': self._httpx.Limits(
+                max_connections=pool_maxsize,
+                max_keepalive_connections=pool_maxsize if keep_alive else 0),
+        }
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        with self._lock:  # pylint: disable=not-context-manager
+            if not self._client:
+                self._client = self._httpx.Client(
+                    headers=self.headers, **self._options)
+            return self._client
+
+    def request(self, method, url, params, timeout, total=None):
+        connect, read = timeout
+        # httpx has no total timeout, the body is cut when total is exceeded
+        started = time.monotonic()
+        with self._get_client().stream(
+                method, url, params=params,
+                timeout=self._httpx.Timeout(read, connect=connect)) as resp:
+            resp.raise_for_status()
+            if total is None:
+                return resp.read()
+            return _read_chunks(resp.iter_bytes(), started, total,
+                                self._httpx.ReadTimeout)
+
+    def close(self):
+        with self._lock:  # pylint: disable=not-context-manager
+            if self._client:
+                self._client.close()
+                self._client = None
+
+
+class _FakeAPI(object):  # pylint: disable=too-few-public-methods
+    '''
+    What FakeTransport and AsyncFakeTransport answer.
+    '''
+    def __init__(self, torrents=(), token='fake-token', headers=None):
+        super().__init__(headers)
+        self.torrents = list(torrents)
+        self.token = token
+        self.calls = collections.Counter()
+        self._bodies = {}
+
+    def handle(self, params):
+        '''
+        :returns: the response body for params as bytes
+        '''
+        if 'get_token' in params:
+            self.calls['get_token'] += 1
+            return json.dumps({'token': self.token}).encode('utf-8')
+
+        self.calls[params.get('mode')] += 1
+        key = tuple(str(params.get(name)) for name in (
+            'format', 'category', 'search_string', 'search_imdb', 'sort',
+            'limit'))
+        body = self._bodies.get(key)
+        if body is None:
+            body = self._bodies[key] = self._encode(params)
+        return body
+
+    def _encode(self, params):
+        torrents = [t for t in self.torrents if _matches(t, params)]
+        sort = params.get('sort', 'last')
+        field = 'pubdate' if sort == 'last' else sort
+        missing = '' if field == 'pubdate' else 0
+        torrents.sort(key=lambda t: t.get(field) or missing, reverse=True)
+        torrents = torrents[:int(params.get('limit', 25))]
+        if not torrents:
+            return b'{"error": "No results found", "error_code": 20}'
+        if params.get('format') != 'json_extended':
+            torrents = [{
+                'filename': t['title'],
+                'category': t['category'],
+                'download': t['download'],
+            } for t in torrents]
+        return json.dumps({'torrent_results': torrents}).encode('utf-8')
+
+
+class FakeTransport(_FakeAPI, Transport):
+    '''
+    Answers like torrentapi from torrents in memory without any I/O, to
+    test code using the client or to measure the client's own cost.
+
+    :param torrents: (optional) torrents in json_extended format, the json
+            format is derived from them
+    :param token: (optional) the token handed out
+
+    Queries are filtered by category, search_string and search_imdb, sorted
+    and limited like torrentapi does. Encoded bodies are kept per query, so
+    repeated queries cost the transport a dict lookup. calls counts
+    requests per mode, get_token included.
+    '''
+    def request(self, method, url, params, timeout, total=None):
+        return self.handle(params)
+
+
+def _matches(torrent, params):
+    if 'category' in params:
+        names = {CATEGORY_NAMES.get(int(c), c) if c.isdigit() else c
+                 for c in str(params['category']).split(';')}
+        if torrent['category'] not in names:
+            return False
+    if 'search_string' in params:
+        title = torrent['title'].lower()
+        if not all(word in title
+                   for word in params['search_string'].lower().split()):
+            return False
+    if 'search_imdb' in params:
+        info = torrent.get('episode_info') or {}
+        if info.get('imdb') != params['search_imdb']:
+            return False
+    return True
+
+
+class AsyncTransport(_BaseTransport):
+    '''
+    Transport of AsyncRarbgAPI, request and close are the coroutines of
+    Transport.
+    '''
+    @abc.abstractmethod
+    async def request(self, method, url, params, timeout, total=None):
+        '''
+        See Transport.request.
+        '''
+
+    async def close(self):
+        '''
+        See Transport.close.
+        '''
+
+
+class AiohttpTransport(AsyncTransport):
+    '''
+    aiohttp ClientSession, the default transport of AsyncRarbgAPI.
+    '''
+    def __init__(self, headers=None, pool_connections=1, pool_maxsize=10,
+                 keep_alive=True):
+        # pylint: disable=too-many-arguments
+        super().__init__(headers)
+        try:
+            import aiohttp  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            raise ImportError('AsyncRarbgAPI requires aiohttp, '
+                              'please install rarbgapi[async]') from None
+        self._aiohttp = aiohttp
+        self.connection_errors = (aiohttp.ClientConnectionError,
+                                  asyncio.TimeoutError)
+        self._limits = {
+            'limit': pool_connections * pool_maxsize,
+            'limit_per_host': pool_maxsize,
+            'force_close': not keep_alive,
+        }
+        self._session = None
+
+    def _get_session(self):
+        if not self._session:
+            self._session = self._aiohttp.ClientSession(
+                connector=self._aiohttp.TCPConnector(**self._limits),
+                headers=self.headers)
+        return self._session
+
+    async def request(self, method, url, params, timeout, total=None):
+        connect, read = timeout
+        timeout = self._aiohttp.ClientTimeout(
+            total=total, connect=connect, sock_read=read)
+        params = {key: str(value) for key, value in params.items()}
+        async with self._get_session().request(
+                method, url, params=params, timeout=timeout) as resp:
+            resp.raise_for_status()
+            return await resp.read()
+
+    async def close(self):
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+
+class AsyncHTTPXTransport(AsyncTransport):
+    '''
+    httpx AsyncClient, HTTP/2 for AsyncRarbgAPI.
+    '''
+    def __init__(self, headers=None, http2=True, pool_maxsize=10,
+                 keep_alive=True):
+        super().__init__(headers)
+        self._httpx = _import_httpx()
+        self.connection_errors = (self._httpx.TransportError,
+                                  ConnectionError, TimeoutError,
+                                  asyncio.TimeoutError)
+        self._options = {
+            'http2': http2,
+            'limits': self._httpx.Limits(
+                max_connections=pool_maxsize,
+                max_keepalive_connections=pool_maxsize if keep_alive else 0),
+        }
+        self._client = None
+
+    async def request(self, method, url, params, timeout, total=None):
+        if not self._client:
+            self._client = self._httpx.AsyncClient(
+                headers=self.headers, **self._options)
+        connect, read = timeout
+        resp = await asyncio.wait_for(self._client.request(
+            method, url, params=params,
+            timeout=self._httpx.Timeout(read, connect=connect)), total)
+        resp.raise_for_status()
+        return resp.content
+
+    async def close(self):
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+
+class AsyncFakeTransport(_FakeAPI, AsyncTransport):
+    '''
+    FakeTransport for AsyncRarbgAPI.
+    '''
+    async def request(self, method, url, params, timeout, total=None):
+        return self.handle(params)
@@ -0,0 +1,76 @@
+import os
+import json
+import threading
+import collections
+
+
+def write_json(path, data):
+    '''
+    Write data as json to path atomically, readers see the old or the new
+    content but never a partial file.
+    '''
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fobj:
+        json.dump(data, fobj)
+    os.replace(tmp_path, path)
+
+
+class BoundedSet(object):
+    '''
+    Set remembering at most `maxsize` items, the oldest ones are forgotten
+    first.
+    '''
+    def __init__(self, maxsize, items=()):
+        self._maxsize = maxsize
+        self._items = collections.OrderedDict()
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        '''
+        :returns: False if the item was already there
+        '''
+        if item in self._items:
+            self._items.move_to_end(item)
+            return False
+        self._items[item] = None
+        if len(self._items) > self._maxsize:
+            self._items.popitem(last=False)
+        return True
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+
+class BoundedDict(object):
+    '''
+    Dict keeping at most `maxsize` items, the least recently used ones are
+    dropped first. Safe to share between threads.
+    '''
+    def __init__(self, maxsize):
+        self._maxsize = maxsize
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:  # pylint: disable=not-context-manager
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:  # pylint: disable=not-context-manager
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self._maxsize:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
@@ -26,7 +26,11 @@ setup(
         'requests'
     ],
     extras_require={
-        'test': ['flake8', 'pycodestyle', 'pylint', 'pytest', 'pytest-cov', 'pytest-httpserver']
+        'async': ['aiohttp'],
+        'fast': ['orjson'],
+        'http2': ['httpx[http2]'],
+        'parquet': ['pyarrow'],
+        'test': ['flake8', 'pycodestyle', 'pylint', 'pytest', 'pytest-cov', 'pytest-httpserver', 'aiohttp']
     },
     url='https://github.com/verybada/rarbgapi/',
     entry_points={